@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import timeit
+from struct import pack
+
+import implib2
+from implib2.imp_crc import MaximCRC
+
+ROUNDS = 100000
+
+
+class LegacyCRC(MaximCRC):
+    """The byte by byte implementation before the fast path."""
+
+    def calc_crc(self, byte_str):
+        reg = 0x0
+        for char in byte_str:
+            if isinstance(char, str):
+                idx = (reg ^ ord(char)) & 0xff  # py27
+            else:
+                idx = (reg ^ char) & 0xff       # py33
+            reg = ((reg >> 8) ^ self.table[idx]) & 255
+        return pack('>B', reg)
+
+    def check_crc(self, byte_str):
+        data = byte_str[:-1]
+        crc = byte_str[-1:]
+        if not crc == self.calc_crc(data):
+            return False
+        return True
+
+
+def frame(crc):
+    # a get parameter reply: header and a 4 byte data block, both checked
+    # on reception.
+    package = implib2.imp_packages.Package().pack(
+        serno=33912, cmd=10, data=b'\x00\x00\x48\x41')
+    header, data = package[:7], package[7:]
+    return lambda: crc.check_crc(header) and crc.check_crc(data)
+
+
+print("crc;usec_per_frame")
+for name, crc in (('legacy', LegacyCRC()), ('fast', MaximCRC())):
+    seconds = timeit.timeit(frame(crc), number=ROUNDS) / ROUNDS
+    print("{};{:.3f}".format(name, seconds * 1e6))
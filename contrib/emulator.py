@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import time
+import random
+import implib2
+
+TABLE = 'MEASURE_PARAMETER_TABLE'
+PARAM = 'Moist'
+
+
+def bench(count):
+    sernos = random.sample(range(16777215), count)
+    emu = implib2.Emulator(sernos)
+
+    bus = implib2.Bus(emu.url, event_driven=True)
+    bus.cycle_wait = 0.0
+    bus.range_wait = 0.0
+    bus.dev.open_device()
+
+    tic = time.time()
+    probes = bus.scan()
+    scan_time = time.time() - tic
+    assert sorted(sernos) == list(probes)
+
+    tic = time.time()
+    for serno in probes:
+        bus.get(serno, TABLE, PARAM)
+    poll_time = time.time() - tic
+
+    return scan_time, poll_time
+
+
+print("probes;scan_time;scan_per_probe;poll_time;polls_per_second")
+for count in (1, 10, 100, 1000):
+    scan_time, poll_time = bench(count)
+    print("{:04};{:.6f};{:.6f};{:.6f};{:.1f}".format(
+        count, scan_time, scan_time / count, poll_time, count / poll_time))
@@ -1,8 +1,23 @@
 # -*- coding: UTF-8 -*-
 
+import sys
+
 from .__version__ import __version__  # noqa
 from .imp_eeprom import EEPROM
 from .imp_bus import Bus, BusError
 from .imp_modules import Module, ModuleError
+from .imp_manager import BusManager
+from .imp_scanner import Scanner, ScannerError, ScanReport
+from .imp_registry import Registry, RegistryError
+from .imp_planner import Planner, PlannerError
+from .imp_monitor import Monitor
+from .imp_emulator import Emulator, VirtualProbe
+
+__all__ = ["Bus", "BusError", "BusManager", "Module", "ModuleError", "EEPROM",
+           "Emulator", "VirtualProbe", "Scanner", "ScannerError", "ScanReport",
+           "Registry", "RegistryError", "Planner", "PlannerError",
+           "Monitor"]
 
-__all__ = ["Bus", "BusError", "Module", "ModuleError", "EEPROM"]
+if sys.version_info >= (3, 5):
+    from .imp_asyncio import AsyncBus, AsyncModule  # noqa
+    __all__ += ["AsyncBus", "AsyncModule"]
@@ -0,0 +1,657 @@
+# -*- coding: UTF-8 -*-
+
+import os
+import sys
+import struct
+import asyncio
+
+import serial
+
+from .imp_device import Device, DeviceError
+from .imp_datatypes import DataTypes
+from .imp_packages import Package
+from .imp_commands import Command
+from .imp_responces import Responce
+from .imp_tables import Tables
+from .imp_helper import _prefix_cover
+from .imp_crc import MaximCRC
+from .imp_bus import Bus, BusError, HEADER_LEN, SHORT_ACK_LEN, RANGE_ACK_LEN, \
+    NEGATIVE_ACK_LEN, EEPROM_PAGE_LEN, DEFAULT_TIMINGS
+from .imp_modules import ModuleError
+
+
+class AsyncDevice(Device):
+    """The asyncio counterpart of :class:`Device`. Instead of blocking in
+    `read` it registers the file descriptor of the serial port with the
+    event loop and collects the incoming bytes in a buffer. Reading is done
+    with coroutines which resume as soon as enough bytes arrived or the
+    timeout expired. This only works on POSIX systems, where the serial port
+    has a selectable file descriptor.
+    """
+
+    def __init__(self, port, loop=None):
+        Device.__init__(self, port)
+        self.loop = loop or asyncio.get_event_loop()
+        self._buffer = bytearray()
+        self._waiter = None
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.ser.fileno(), 1024)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+
+        if not data:
+            # end of file or an error, e.g. the adapter was unplugged: stop
+            # watching the port and fail the pending read.
+            self.loop.remove_reader(self.ser.fileno())
+            self.is_open = False
+            if self._waiter is not None and not self._waiter.done():
+                self._waiter.set_exception(DeviceError("Serial port closed!"))
+            return
+
+        self._buffer.extend(data)
+
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def _read(self, length, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+
+        deadline = self.loop.time() + timeout
+        while len(self._buffer) < length:
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+
+            self._waiter = self.loop.create_future()
+            try:
+                await asyncio.wait_for(self._waiter, remaining)
+            except asyncio.TimeoutError:
+                break
+            finally:
+                self._waiter = None
+
+        data = bytes(self._buffer[:length])
+        del self._buffer[:length]
+        return data
+
+    async def open_device(self, baudrate=9600):
+        self.baudrate = baudrate
+        self.ser.baudrate = baudrate
+        self.ser.open()
+        self.ser.flush()
+        del self._buffer[:]
+        self.loop.add_reader(self.ser.fileno(), self._on_readable)
+        await asyncio.sleep(0.05)  # 50ms
+        self.is_open = True
+
+    async def close_device(self):
+        try:
+            self.loop.remove_reader(self.ser.fileno())
+            self.ser.flush()
+            self.ser.close()
+        except serial.SerialException:
+            pass
+        finally:
+            await asyncio.sleep(0.05)  # 50ms
+            self.is_open = False
+
+    async def read_pkg(self, timeout=None):
+        if not self.is_open:
+            raise DeviceError("Couldn't read packet, device is closed!")
+
+        # read header, always 7 bytes
+        header = await self._read(7, timeout)
+
+        if len(header) < 7:
+            raise DeviceError('Timeout reading header!')
+
+        length = header[2]
+        if length == 0:
+            return header
+
+        timeout = self.timeout + length * self.BITS_PER_BYTE / float(self.baudrate)
+        data = await self._read(length, timeout)
+
+        if len(data) < length:
+            raise DeviceError('Timeout reading data!')
+
+        return header + data
+
+    async def read_bytes(self, length, timeout=None):
+        if not self.is_open:
+            raise DeviceError("Couldn't read bytes, device is closed!")
+
+        data = await self._read(length, timeout)
+
+        if len(data) < length:
+            raise DeviceError('Timeout reading bytes!')
+
+        return data
+
+    async def read(self, timeout=None, linger=0.0):
+        if not self.is_open:
+            raise DeviceError("Couldn't read byte, device is closed!")
+
+        byte = await self._read(1, timeout)
+
+        # let colliding answers of other probes die away before flushing.
+        if byte and linger:
+            await asyncio.sleep(linger)
+
+        del self._buffer[:]
+        self.ser.flushInput()
+
+        return byte
+
+
+class AsyncBus:
+    """The asyncio counterpart of :class:`Bus`. All bus commands are
+    coroutines, so a single event loop can drive many serial lines at once.
+    Reading always starts right after sending the request and the usual
+    waiting times only serve as deadlines::
+
+        >>> import asyncio
+        >>> from implib2 import AsyncBus
+        >>> async def main():
+        ...     bus = AsyncBus('/dev/ttyUSB0')
+        ...     await bus.sync()
+        ...     return await bus.scan()
+        >>> asyncio.get_event_loop().run_until_complete(main())
+        (10010, 10011)
+
+    Transactions of concurrent tasks on the same bus are serialized.
+
+    :param port: The serial port to use, defaults to `/dev/ttyUSB0`
+    :type  port: string
+
+    :param rs485: Set this to `True` in order to use the way more
+                  relaxed rs485 timings. Defaults to `False`.
+    :type  rs485: bool
+
+    :param loop: The event loop to use. Defaults to the current loop.
+    :type  loop: :class:`asyncio.AbstractEventLoop`
+
+    """
+    def __init__(self, port='/dev/ttyUSB0', rs485=False, loop=None):
+        self.tbl = Tables()
+        self.dts = DataTypes()
+        pkg = Package()
+
+        self.cmd = Command(self.tbl, pkg, self.dts)
+        self.res = Responce(self.tbl, pkg, self.dts)
+        self.dev = AsyncDevice(port, loop)
+        self.bus_synced = False
+        self.baudrate = 9600
+        self._lock = None
+
+        # timing magic, the same as of the synchronous bus
+        timings = DEFAULT_TIMINGS[bool(rs485)]
+        self.trans_wait = timings['trans_wait']
+        self.cycle_wait = timings['cycle_wait']
+        self.range_wait = timings['range_wait']
+
+    # same wire time model as the synchronous bus
+    _transit = Bus._transit
+    _timeout = Bus._timeout
+    _reply_len = Bus._reply_len
+
+    def _locked(self):
+        # the lock is created on first use, bound to the loop of the device
+        # (py34-py37 take it as argument, later ones bind to the running one)
+        if self._lock is None:
+            if sys.version_info < (3, 8):
+                self._lock = asyncio.Lock(loop=self.dev.loop)
+            else:
+                self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _transfer(self, package, reply_len, read, *args, **kwargs):
+        async with self._locked():
+            try:
+                self.dev.write_pkg(package)
+                timeout = self._timeout(len(package), reply_len)
+                return await read(*args, timeout=timeout, **kwargs)
+            finally:
+                await asyncio.sleep(self.cycle_wait)
+
+    async def _search(self, range_address, range_marker, found):
+        probes = len(found)
+        bcast_address = range_address + range_marker
+
+        if not await self.probe_range(bcast_address):
+            return False
+
+        if range_marker == 1:
+            if await self.probe_module_short(bcast_address):
+                found.append(bcast_address)
+
+            if await self.probe_module_short(bcast_address - 1):
+                found.append(bcast_address - 1)
+
+            return not probes == len(found)
+
+        # divide-and-conquer by splitting the range into two pices.
+        await self._search(bcast_address, range_marker >> 1, found)
+        await self._search(range_address, range_marker >> 1, found)
+        return True
+
+    async def wakeup(self):
+        """Coroutine version of :func:`Bus.wakeup`."""
+        address = 16777215  # 0xFFFFFF
+        table = 'ACTION_PARAMETER_TABLE'
+        param = 'EnterSleep'
+        value = 0
+        ad_param = 0
+
+        package = self.cmd.set_parameter(address, table, param,
+                                         [value], ad_param)
+
+        await self.dev.open_device()
+        self.baudrate = 9600
+        self.dev.write_pkg(package)
+        await asyncio.sleep(0.300)
+
+        return True
+
+    async def sync(self, baudrate=9600):
+        """Coroutine version of :func:`Bus.sync`.
+
+        :param baudrate: Baudrate to use (1200-2400-4800-9600).
+        :type  baudrate: int
+
+        :raises BusError: If baudrate is unknown.
+
+        :rtype: :const:`True`
+
+        """
+        address = 16777215
+        table = 'SYSTEM_PARAMETER_TABLE'
+        param = 'Baudrate'
+        value = baudrate//100
+        ad_param = 0
+
+        if value not in (12, 24, 48, 96):
+            raise BusError("Unknown baudrate!")
+
+        package = self.cmd.set_parameter(address, table, param,
+                                         [value], ad_param)
+
+        async with self._locked():
+            await self.dev.close_device()
+
+            for rate, wait in ((1200, 0.500), (2400, 0.420),
+                               (4800, 0.340), (9600, 0.260)):
+                await self.dev.open_device(baudrate=rate)
+                self.dev.write_pkg(package)
+                await asyncio.sleep(wait)
+                await self.dev.close_device()
+
+            await self.dev.open_device(baudrate=baudrate)
+            self.baudrate = baudrate
+            self.bus_synced = True
+            await asyncio.sleep(1.000)
+
+        return True
+
+    async def scan(self, minserial=0, maxserial=16777215):
+        """Coroutine version of :func:`Bus.scan`.
+
+        :param minserial: Start of the range to search (usually: 0).
+        :type  minserial: int
+
+        :param maxserial: End of the range to search (usually: 16777215).
+        :type  maxserial: int
+
+        :rtype: tuple
+
+        """
+        sernos = list()
+        for rng, mark in reversed(_prefix_cover(minserial, maxserial)):
+            if not mark:
+                if await self.probe_module_short(rng):
+                    sernos.append(rng)
+                continue
+            await self._search(rng, mark, sernos)
+
+        sernos = [x for x in sernos if x >= minserial and x <= maxserial]
+        sernos.sort()
+
+        return tuple(sernos)
+
+    async def find_single_module(self):
+        """Coroutine version of :func:`Bus.find_single_module`.
+
+        :rtype: :const:`False` or :const:`tuple` containing the serial number.
+
+        """
+        package = self.cmd.get_negative_ack()
+
+        try:
+            bytes_recv = await self._transfer(package, NEGATIVE_ACK_LEN, self.dev.read_pkg)
+        except DeviceError:
+            return False
+
+        return self.res.get_negative_ack(bytes_recv)
+
+    async def probe_module_long(self, serno):
+        """Coroutine version of :func:`Bus.probe_module_long`.
+
+        :param serno: Serial number of the probe do connect.
+        :type  serno: int
+
+        :rtype: :const:`bool`
+
+        """
+        package = self.cmd.get_long_ack(serno)
+
+        try:
+            bytes_recv = await self._transfer(package, HEADER_LEN, self.dev.read_pkg)
+        except DeviceError:
+            return False
+
+        return self.res.get_long_ack(bytes_recv, serno)
+
+    async def probe_module_short(self, serno):
+        """Coroutine version of :func:`Bus.probe_module_short`.
+
+        :param serno: Serial number of the probe do connect.
+        :type  serno: int
+
+        :rtype: :const:`bool`
+
+        """
+        package = self.cmd.get_short_ack(serno)
+
+        try:
+            bytes_recv = await self._transfer(package, SHORT_ACK_LEN, self.dev.read_bytes, 1)
+        except DeviceError:
+            return False
+
+        return self.res.get_short_ack(bytes_recv, serno)
+
+    async def probe_range(self, broadcast):
+        """Coroutine version of :func:`Bus.probe_range`.
+
+        :param serno: Broadcast address.
+        :type  serno: int
+
+        :rtype: :const:`bool`
+
+        """
+        package = self.cmd.get_range_ack(broadcast)
+        bytes_recv = await self._transfer(package, RANGE_ACK_LEN, self.dev.read,
+                                          linger=self.range_wait)
+        return self.res.get_range_ack(bytes_recv)
+
+    async def get(self, serno, table, param):
+        """Coroutine version of :func:`Bus.get`.
+
+        :param serno: Serial number of the probe to request.
+        :type  serno: int
+
+        :param table: System table containing the requested infomation.
+        :type  table: string
+
+        :param param: Parameter od row containing the requested infomation.
+        :type  param: string
+
+        :rtype: tuple
+
+        """
+        package = self.cmd.get_parameter(serno, table, param)
+        reply_len = self._reply_len(table, param)
+        bytes_recv = await self._transfer(package, reply_len, self.dev.read_pkg)
+        return self.res.get_parameter(bytes_recv, table, param)
+
+    async def set(self, serno, table, param, value, ad_param=0):
+        """Coroutine version of :func:`Bus.set`.
+
+        :param serno: Serial number of the probe to address.
+        :type  serno: int
+
+        :param table: System table to store the infomation.
+        :type  table: string
+
+        :param param: Parameter od row containing the requested infomation.
+        :type  param: string
+
+        :param value: Values to store.
+        :type  value: iterable
+
+        :rtype: :const:`bool`
+
+        """
+        # pylint: disable=too-many-arguments
+        package = self.cmd.set_parameter(serno, table, param,
+                                         value, ad_param)
+        bytes_recv = await self._transfer(package, HEADER_LEN, self.dev.read_pkg)
+        return self.res.set_parameter(bytes_recv, table, serno)
+
+    async def get_eeprom_page(self, serno, page_nr):
+        """Coroutine version of :func:`Bus.get_eeprom_page`.
+
+        :param serno: Serial number of the probe to address.
+        :type  serno: int
+
+        :param page_nr: EEPRom Page to get.
+        :type  page_nr: int
+
+        """
+        package = self.cmd.get_epr_page(serno, page_nr)
+        bytes_recv = await self._transfer(package, EEPROM_PAGE_LEN, self.dev.read_pkg)
+        return self.res.get_epr_page(bytes_recv)
+
+    async def set_eeprom_page(self, serno, page_nr, page):
+        """Coroutine version of :func:`Bus.set_eeprom_page`.
+
+        :param serno: Serial number of the probe to address.
+        :type  serno: int
+
+        :param page_nr: EEPRom Page to write.
+        :type  page_nr: int
+
+        :param page: EEPRom page data.
+        :type  page: bytes
+
+        """
+        package = self.cmd.set_epr_page(serno, page_nr, page)
+        bytes_recv = await self._transfer(package, HEADER_LEN, self.dev.read_pkg)
+        return self.res.set_epr_page(bytes_recv)
+
+
+class AsyncModule:
+    """The asyncio counterpart of :class:`Module`, to be used together with
+    an :class:`AsyncBus`. It provides coroutine versions of the commands
+    needed for reading measurements and updating the EEPROM::
+
+        >>> module = AsyncModule(bus, 10010)
+        >>> await module.get_moisture()
+        12.5
+
+    :param bus: An instaciated :class:`AsyncBus` object to use.
+    :type  bus: :class:`AsyncBus`
+
+    :param serno: The serial number of the probe to address.
+    :type  serno: int
+
+    """
+    def __init__(self, bus, serno):
+        self.crc = MaximCRC()
+        self.bus = bus
+        self._serno = serno
+
+        self.event_modes = {
+            "NormalMeasure":    0x00,
+            "TRDScan":          0x01,
+            "AnalogOut":        0x02,
+            "ACIC_TC":          0x03,
+            "SelfTest":         0x04,
+            "MatTempSensor":    0x05}
+
+        self.measure_modes = {
+            "ModeA":            0x00,
+            "ModeB":            0x01,
+            "ModeC":            0x02}
+
+    async def unlock(self):
+        """Coroutine version of :func:`Module.unlock`.
+
+        :rtype: bool
+
+        """
+        passwd = struct.pack('<I', self._serno)
+        passwd = self.crc.calc(passwd) + 0x8000
+
+        table = 'ACTION_PARAMETER_TABLE'
+        param = 'SupportPW'
+        value = passwd
+
+        return await self.bus.set(self._serno, table, param, [value])
+
+    async def get_serno(self):
+        """Coroutine version of :func:`Module.get_serno`.
+
+        :rtype: int
+
+        """
+        table = 'SYSTEM_PARAMETER_TABLE'
+        param = 'SerialNum'
+        return (await self.bus.get(self._serno, table, param))[0]
+
+    async def get_hw_version(self):
+        """Coroutine version of :func:`Module.get_hw_version`.
+
+        :rtype: float
+
+        """
+        table = 'SYSTEM_PARAMETER_TABLE'
+        param = 'HWVersion'
+        value = (await self.bus.get(self._serno, table, param))[0]
+        return '{0:.2f}'.format(value)
+
+    async def get_fw_version(self):
+        """Coroutine version of :func:`Module.get_fw_version`.
+
+        :rtype: float
+
+        """
+        table = 'SYSTEM_PARAMETER_TABLE'
+        param = 'FWVersion'
+        value = (await self.bus.get(self._serno, table, param))[0]
+        return '{0:.6f}'.format(value)
+
+    async def get_event_mode(self):
+        """Coroutine version of :func:`Module.get_event_mode`.
+
+        :raises : **ModuleError** - If event mode is not known.
+
+        :rtype: string
+
+        """
+        table = 'ACTION_PARAMETER_TABLE'
+        param = 'Event'
+        modes = {v: k for k, v in self.event_modes.items()}
+
+        mode = (await self.bus.get(self._serno, table, param))[0]
+        if mode not in range(127, 134):
+            raise ModuleError("Unknown event mode: %s" % mode)
+
+        return modes[mode % 0x80]
+
+    async def get_measure_mode(self):
+        """Coroutine version of :func:`Module.get_measure_mode`.
+
+        :raises: **ModuleError** - If measure mode is not known.
+
+        :rtype: string
+
+        """
+        table = 'DEVICE_CONFIGURATION_PARAMETER_TABLE'
+        param = 'MeasMode'
+        modes = {v: k for k, v in self.measure_modes.items()}
+
+        try:
+            mode = modes[(await self.bus.get(self._serno, table, param))[0]]
+        except KeyError as err:
+            raise ModuleError("Unknown measure mode: %s!" % err.args[0])
+
+        return mode
+
+    async def start_measure(self):
+        """Coroutine version of :func:`Module.start_measure`.
+
+        :rtype: bool
+
+        """
+        table = 'ACTION_PARAMETER_TABLE'
+        param = 'StartMeasure'
+        value = 1
+
+        if not await self.get_event_mode() == "NormalMeasure":
+            raise ModuleError("Wrong event mode, need 'NormalMeasure'!")
+
+        if not await self.get_measure_mode() == 'ModeA':
+            raise ModuleError("Wrong measure mode, need 'ModeA'!")
+
+        if await self.measure_running():
+            raise ModuleError("Measurement cycle already in progress!")
+
+        return await self.bus.set(self._serno, table, param, [value])
+
+    async def measure_running(self):
+        """Coroutine version of :func:`Module.measure_running`.
+
+        :rtype: bool
+
+        """
+        table = 'ACTION_PARAMETER_TABLE'
+        param = 'StartMeasure'
+        return (await self.bus.get(self._serno, table, param))[0] == 1
+
+    async def get_measurement(self, quantity='Moist'):
+        """Coroutine version of :func:`Module.get_measurement`.
+
+        :param quantity: The measure quantity to request.
+        :type  quantity: str
+
+        :rtype: int or float
+
+        """
+        table = 'MEASURE_PARAMETER_TABLE'
+        param = quantity
+        return (await self.bus.get(self._serno, table, param))[0]
+
+    async def get_moisture(self):
+        """Coroutine version of :func:`Module.get_moisture`. While the
+        measurement is running the event loop is free for other work.
+
+        :rtype: float
+
+        """
+        assert await self.start_measure()
+        while await self.measure_running():
+            await asyncio.sleep(0.500)
+        return await self.get_measurement(quantity='Moist')
+
+    async def write_eeprom(self, image):
+        """Coroutine version of :func:`Module.write_eeprom`.
+
+        :param image: The Image to write.
+        :type  image: :class:`EEPROM`
+
+        :rtype: bool
+
+        """
+        await self.unlock()
+
+        for number, page in enumerate(image):
+            if not await self.bus.set_eeprom_page(self._serno, number, page):
+                raise ModuleError("Writing EEPROM failed!")
+            await asyncio.sleep(0.05)
+
+        return True
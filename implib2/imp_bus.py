@@ -2,13 +2,46 @@
 
 import time
 
-from .imp_device import Device, DeviceError
+from .imp_device import Device, DeviceError, BITS_PER_BYTE
 from .imp_datatypes import DataTypes
-from .imp_packages import Package
+from .imp_packages import Package, PackageError
 from .imp_commands import Command
-from .imp_responces import Responce
+from .imp_responces import Responce, ResponceError
 from .imp_tables import Tables
-from .imp_helper import _imprange
+from .imp_pacing import Pacer
+from .imp_scanner import Scanner, ScannerError, TRANSIENT
+from .imp_helper import _load_store, _save_store
+
+# size of the replies in bytes: a header is 7 bytes, a data block carries
+# one extra byte for its crc.
+HEADER_LEN = 7
+SHORT_ACK_LEN = 1
+RANGE_ACK_LEN = 1
+NEGATIVE_ACK_LEN = HEADER_LEN + 4 + 1
+EEPROM_PAGE_LEN = HEADER_LEN + 250 + 1
+
+# time a probe needs to process a request, in seconds
+PROCESS_TIME = 0.1
+
+# time the probes need to switch over after a baudrate broadcast, the
+# manual asks for at least 500ms
+SYNC_WAIT = 0.500
+
+# the default waits, adds some extra love for rs485
+DEFAULT_TIMINGS = {
+    False: {'trans_wait': 0.000, 'cycle_wait': 0.001, 'range_wait': 0.020},
+    True: {'trans_wait': 0.070, 'cycle_wait': 0.070, 'range_wait': 0.070}}
+
+
+def _transit(length, baudrate, trans_wait):
+    # the wire time of a number of bytes plus the margin on top
+    return length * (BITS_PER_BYTE / float(baudrate) + trans_wait)
+
+
+def _timeout(package_len, reply_len, baudrate, trans_wait, process_time=PROCESS_TIME):
+    # the time from sending a package until its reply is in at the latest
+    return _transit(package_len, baudrate, trans_wait) + process_time + \
+        _transit(reply_len, baudrate, trans_wait)
 
 
 class BusError(Exception):
@@ -25,54 +58,187 @@ class Bus:
         >>> bus.sync()
         >>> bus.scan()
 
-    :param port: The serial port to use, defaults to `/dev/ttyUSB0`
-    :type  port: string
+    :param port: The serial port to use, defaults to `/dev/ttyUSB0`. Instead
+                 of a port name an already created :class:`Device` object
+                 (or any object providing the same interface) can be given.
+    :type  port: string or :class:`Device`
 
     :param rs485: Set this to `True` in order to use the way more
                   relaxed rs485 timings. Defaults to `False`.
     :type  rs485: bool
 
+    :param event_driven: Set this to `True` in order to start reading the
+                         answer right after sending the request. The read
+                         returns as soon as a complete answer arrived and
+                         the usual waiting time only serves as a deadline.
+                         Defaults to `False`.
+    :type  event_driven: bool
+
+    :param timing_file: A json file to persist the timings found by
+                        :func:`calibrate` per port. If the file holds
+                        timings for the port they are applied right away.
+    :type  timing_file: string
+
     """
-    def __init__(self, port='/dev/ttyUSB0', rs485=False):
-        tbl = Tables()
+    # the waits tuned by calibrate(), in the order they get tuned.
+    TIMINGS = ('trans_wait', 'range_wait', 'cycle_wait')
+
+    def __init__(self, port='/dev/ttyUSB0', rs485=False, event_driven=False,
+                 timing_file=None):
+        self.tbl = Tables()
+        self.dts = DataTypes()
         pkg = Package()
-        dts = DataTypes()
 
-        self.cmd = Command(tbl, pkg, dts)
-        self.res = Responce(tbl, pkg, dts)
-        self.dev = Device(port)
+        self.cmd = Command(self.tbl, pkg, self.dts)
+        self.res = Responce(self.tbl, pkg, self.dts)
+        self.dev = port if hasattr(port, 'read_pkg') else Device(port)
+        self.port = getattr(self.dev, 'port', port)
         self.bus_synced = False
+        self.event_driven = event_driven
+
+        # baudrate the bus (and so the probes) currently talks with
+        self.baudrate = 9600
+
+        # timing magic, adds some extra love for rs485. The transit time of
+        # a byte follows from the baudrate, trans_wait is a margin on top.
+        timings = DEFAULT_TIMINGS[bool(rs485)]
+        self.trans_wait = timings['trans_wait']
+        self.cycle_wait = timings['cycle_wait']
+        self.range_wait = timings['range_wait']
+
+        # time the probes need to switch over after a baudrate broadcast
+        self.sync_wait = SYNC_WAIT
+
+        # keeps the transactions apart by the waits above
+        self.pacer = Pacer()
+
+        self.timing_file = timing_file
+        if timing_file:
+            self.load_timings(timing_file)
 
-        # timing magic, adds some extra love for rs485
-        self.trans_wait = 0.002 if not rs485 else 0.070
-        self.cycle_wait = 0.001 if not rs485 else 0.070
-        self.range_wait = 0.020 if not rs485 else 0.070
+    def _transit(self, length):
+        return _transit(length, self.baudrate, self.trans_wait)
 
-    def _wait(self, package_len, process_time=0.1):
-        transit_time = package_len * self.trans_wait
-        time.sleep(transit_time + process_time + transit_time)
+    def _timeout(self, package_len, reply_len=HEADER_LEN, process_time=PROCESS_TIME):
+        return _timeout(package_len, reply_len, self.baudrate, self.trans_wait, process_time)
 
-    def _search(self, range_address, range_marker, found):
-        probes = len(found)
-        bcast_address = range_address + range_marker
+    def _read_timeout(self):
+        # the time a read blocks on top of the wait if no reply comes in
+        ser = getattr(self.dev, 'ser', None)
+        return getattr(ser, 'timeout', None) or 0.0
 
-        if not self.probe_range(bcast_address):
+    def _wait(self, package_len, reply_len=HEADER_LEN, process_time=PROCESS_TIME):
+        self.pacer.wait(self._timeout(package_len, reply_len, process_time))
+
+    def _receive(self, package_len, reply_len, read, *args):
+        self.pacer.wire_time += self._transit(package_len + reply_len)
+        if self.event_driven:
+            return read(*args, timeout=self._timeout(package_len, reply_len))
+        self._wait(package_len, reply_len)
+        return read(*args)
+
+    def _reply_len(self, table, param):
+        row = self.tbl.lookup(table, param)
+        return HEADER_LEN + max(row.length, self.dts.size(row.dtype)) + 1
+
+    def _check_timings(self, reference, rounds):
+        low, high = min(reference), max(reference)
+        try:
+            for _ in range(rounds):
+                if not self.scan(low, high) == reference:
+                    return False
+                for serno in reference:
+                    if not self.probe_module_long(serno):
+                        return False
+        except TRANSIENT + (ScannerError,):
             return False
+        return True
+
+    def load_timings(self, filename):
+        """Applies the timings stored for this port by :func:`save_timings`.
 
-        if range_marker == 1:
-            if self.probe_module_short(bcast_address):
-                found.append(bcast_address)
+        :param filename: The json file holding the timings.
+        :type  filename: string
 
-            if self.probe_module_short(bcast_address - 1):
-                found.append(bcast_address - 1)
+        :rtype: :const:`bool`, `True` if timings for the port were found.
 
-            return not probes == len(found)
+        """
+        timings = _load_store(filename).get(str(self.port))
+        if not timings:
+            return False
 
-        # divide-and-conquer by splitting the range into two pices.
-        self._search(bcast_address, range_marker >> 1, found)
-        self._search(range_address, range_marker >> 1, found)
+        for name in self.TIMINGS:
+            if name in timings:
+                setattr(self, name, timings[name])
         return True
 
+    def save_timings(self, filename):
+        """Stores the current timings of this port into a json file, which
+        may hold the timings of other ports as well.
+
+        :param filename: The json file holding the timings.
+        :type  filename: string
+
+        """
+        store = _load_store(filename)
+        store[str(self.port)] = dict((name, getattr(self, name)) for name in self.TIMINGS)
+        _save_store(filename, store)
+
+    def calibrate(self, sernos=None, rounds=3, steps=6):
+        """Finds the smallest timings which still give a 100% success rate
+        with the probes actually connected to the bus. Starting from the
+        current (conservative) values, every wait in :attr:`TIMINGS` is
+        tuned by a binary search between zero and its current value. A
+        candidate only passes if `rounds` scans of the probes' range find
+        exactly the reference probes and every probe answers a long ack.
+
+        The result is applied to the bus and, if the bus has a
+        `timing_file`, stored for the next start.
+
+        :param sernos: Serial numbers of the connected probes. Defaults to
+                       the result of a :func:`scan` with the current timings.
+        :type  sernos: iterable
+
+        :param rounds: Number of test rounds per candidate.
+        :type  rounds: int
+
+        :param steps: Number of bisection steps per timing.
+        :type  steps: int
+
+        :raises BusError: If there are no probes to calibrate with, or the
+                          current timings fail already.
+
+        :rtype: dict
+
+        """
+        reference = tuple(sorted(sernos)) if sernos is not None else self.scan()
+        if not reference:
+            raise BusError("No probes found to calibrate with!")
+
+        if not self._check_timings(reference, rounds):
+            raise BusError("Calibration failed with the current timings!")
+
+        for name in self.TIMINGS:
+            low, high = 0.0, getattr(self, name)
+
+            setattr(self, name, low)
+            if self._check_timings(reference, rounds):
+                continue
+
+            for _ in range(steps):
+                setattr(self, name, (low + high) / 2.0)
+                if self._check_timings(reference, rounds):
+                    high = getattr(self, name)
+                else:
+                    low = getattr(self, name)
+
+            setattr(self, name, high)
+
+        if self.timing_file:
+            self.save_timings(self.timing_file)
+
+        return dict((name, getattr(self, name)) for name in self.TIMINGS)
+
     def wakeup(self):
         """This function sends a broadcast packet which sets the 'EnterSleep'
         parameter of the 'ACTION_PARAMETER_TABLE' to '0', which actually means
@@ -92,6 +258,7 @@ class Bus:
                                          [value], ad_param)
 
         self.dev.open_device()
+        self.baudrate = 9600
         self.dev.write_pkg(package)
         time.sleep(0.300)
 
@@ -156,12 +323,80 @@ class Bus:
 
         # at last open the device with the setted baudrate
         self.dev.open_device(baudrate=baudrate)
+        self.baudrate = baudrate
         self.bus_synced = True
         time.sleep(1.000)
 
         return True
 
-    def scan(self, minserial=0, maxserial=16777215):
+    def fast_sync(self, baudrate=9600, serno=None, sync_wait=None):
+        """Faster version of :func:`sync`. Instead of closing and reopening
+        the serial port for every baudrate, the baudrate of the open port
+        is changed in place. After every broadcast it only waits until the
+        package is on the wire plus :attr:`sync_wait`, the time the probes
+        need to switch over. Like :func:`sync` it keeps the 500ms of the
+        manual unless a shorter `sync_wait` is asked for.
+
+        If the serial number of a known probe is given, it first tries a
+        :func:`probe_module_long` on the target baudrate. If the probe
+        answers the bus is already synchronised and the broadcast sweep is
+        skipped entirely.
+
+        :param baudrate: Baudrate to use (1200-2400-4800-9600).
+        :type  baudrate: int
+
+        :param serno: Serial number of a known probe to verify first.
+        :type  serno: int
+
+        :param sync_wait: Wait this long after every broadcast instead of
+                          :attr:`sync_wait`, e.g. less for probes known to
+                          switch over faster.
+        :type  sync_wait: float
+
+        :raises BusError: If baudrate is unknown.
+
+        :rtype: :const:`True`
+
+        """
+        if sync_wait is None:
+            sync_wait = self.sync_wait
+
+        address = 16777215
+        table = 'SYSTEM_PARAMETER_TABLE'
+        param = 'Baudrate'
+        value = baudrate//100
+        ad_param = 0
+
+        if value not in (12, 24, 48, 96):
+            raise BusError("Unknown baudrate!")
+
+        if serno is not None:
+            self.dev.set_baudrate(baudrate)
+            self.baudrate = baudrate
+            try:
+                if self.probe_module_long(serno):
+                    self.bus_synced = True
+                    return True
+            except (PackageError, ResponceError):
+                pass
+
+        package = self.cmd.set_parameter(address, table, param,
+                                         [value], ad_param)
+
+        for rate in (1200, 2400, 4800, 9600):
+            self.dev.set_baudrate(rate)
+            self.dev.write_pkg(package)
+            self.dev.drain()
+            time.sleep(sync_wait)
+
+        self.dev.set_baudrate(baudrate)
+        self.baudrate = baudrate
+        self.bus_synced = True
+
+        return True
+
+    def scan(self, minserial=0, maxserial=16777215, checkpoint=None, use_crc=False,
+             ranges=None, callback=None, report=None, robust=False):
         """ Command to scan the IMPBUS for connected probes.
 
         This command can be uses to search the IMPBus2 for connected probes. It
@@ -215,23 +450,112 @@ class Bus:
             ranges, spanning only two serial numbers. Than we can query them
             directly, using the :func:`probe_module_short` command.
 
+        The search itself is run by a :class:`Scanner`, which retries
+        nodes failing with a transient error and can keep its progress in a
+        checkpoint file to resume an interrupted scan. It starts from the
+        minimal set of aligned ranges covering exactly the requested range,
+        so a scan of 0x7fffff - 0x800000 only probes these two serial
+        numbers instead of the whole address space.
+
         :param minserial: Start of the range to search (usually: 0).
         :type  minserial: int
 
         :param maxserial: End of the range to search (usually: 16777215).
         :type  maxserial: int
 
+        :param checkpoint: The json file to keep the progress in.
+        :type  checkpoint: string
+
+        :param ranges: List of `(minserial, maxserial)` pairs to search
+                       instead of a single range, e.g. the serial number
+                       blocks used on a site.
+        :type  ranges: iterable
+
+        :param use_crc: Use the reply byte of the range probes to go
+                        straight to the probe in small subtrees, see
+                        :class:`Scanner`.
+        :type  use_crc: bool
+
+        :param callback: Called with the serial number of every probe the
+                         moment it is confirmed, see :func:`scan_iter`.
+        :type  callback: callable
+
+        :param report: A report to fill with the figures of the scan.
+        :type  report: :class:`ScanReport`
+
+        :param robust: Repeat negative probes adapted to the observed loss
+                       rate, for noisy lines. See :class:`Scanner`.
+        :type  robust: bool
+
+        :raises ScannerError: If a node still fails after all the retries.
+
         :rtype: tuple
 
         """
-        sernos = list()
-        rng, mark = _imprange(minserial, maxserial)
-        self._search(rng, mark, sernos)
+        # pylint: disable=too-many-arguments
+        scanner = Scanner(self, minserial, maxserial, checkpoint=checkpoint,
+                          use_crc=use_crc, ranges=ranges, report=report, robust=robust)
+        return scanner.run(callback)
+
+    def scan_iter(self, minserial=0, maxserial=16777215, ranges=None):
+        """Generator version of :func:`scan`. It yields the serial number
+        of every probe the moment it is confirmed, so the work on the first
+        probes can start while the rest of the bus is still searched. The
+        probes come in the order they are found, not sorted::
+
+            >>> for serno in bus.scan_iter():
+            ...     Module(bus, serno).set_event_mode('NormalMeasure')
+
+        .. note:: The generator shares the bus with its consumer, so all
+                  transactions of the consumer take place between the
+                  steps of the search.
+
+        :param minserial: Start of the range to search (usually: 0).
+        :type  minserial: int
+
+        :param maxserial: End of the range to search (usually: 16777215).
+        :type  maxserial: int
+
+        :param ranges: List of `(minserial, maxserial)` pairs to search
+                       instead of a single range.
+        :type  ranges: iterable
 
-        sernos = [x for x in sernos if x >= minserial and x <= maxserial]
-        sernos.sort()
+        :raises ScannerError: If a node still fails after all the retries.
 
-        return tuple(sernos)
+        :rtype: iterator
+
+        """
+        return iter(Scanner(self, minserial, maxserial, ranges=ranges))
+
+    def rescan(self, known, minserial=0, maxserial=16777215, discover=True):
+        """Incremental version of :func:`scan` for a bus whose probes are
+        mostly known. The known probes are confirmed by one
+        :func:`probe_module_short` each and the range search only covers
+        the parts of the address space without any known probe::
+
+            >>> probes = bus.scan()
+            >>> probes = bus.rescan(probes)
+
+        :param known: Serial numbers found by an earlier scan.
+        :type  known: iterable
+
+        :param minserial: Start of the range to search (usually: 0).
+        :type  minserial: int
+
+        :param maxserial: End of the range to search (usually: 16777215).
+        :type  maxserial: int
+
+        :param discover: Set this to `False` to only confirm the known
+                         probes, without searching for new ones.
+        :type  discover: bool
+
+        :raises ScannerError: If a node still fails after all the retries.
+
+        :rtype: tuple
+
+        """
+        scanner = Scanner(self, minserial, maxserial, known=known, discover=discover)
+        return scanner.run()
 
     def find_single_module(self):
         """ Find a single module on the Bus.
@@ -246,13 +570,13 @@ class Bus:
         package = self.cmd.get_negative_ack()
 
         try:
+            self.pacer.start()
             self.dev.write_pkg(package)
-            self._wait(len(package))
-            bytes_recv = self.dev.read_pkg()
+            bytes_recv = self._receive(len(package), NEGATIVE_ACK_LEN, self.dev.read_pkg)
         except DeviceError:
             return False
         finally:
-            time.sleep(self.cycle_wait)
+            self.pacer.finish(self.cycle_wait)
 
         return self.res.get_negative_ack(bytes_recv)
 
@@ -271,13 +595,13 @@ class Bus:
         package = self.cmd.get_long_ack(serno)
 
         try:
+            self.pacer.start()
             self.dev.write_pkg(package)
-            self._wait(len(package))
-            bytes_recv = self.dev.read_pkg()
+            bytes_recv = self._receive(len(package), HEADER_LEN, self.dev.read_pkg)
         except DeviceError:
             return False
         finally:
-            time.sleep(self.cycle_wait)
+            self.pacer.finish(self.cycle_wait)
 
         return self.res.get_long_ack(bytes_recv, serno)
 
@@ -297,16 +621,34 @@ class Bus:
         package = self.cmd.get_short_ack(serno)
 
         try:
+            self.pacer.start()
             self.dev.write_pkg(package)
-            self._wait(len(package))
-            bytes_recv = self.dev.read_bytes(1)
+            bytes_recv = self._receive(len(package), SHORT_ACK_LEN, self.dev.read_bytes, 1)
         except DeviceError:
             return False
         finally:
-            time.sleep(self.cycle_wait)
+            self.pacer.finish(self.cycle_wait)
 
         return self.res.get_short_ack(bytes_recv, serno)
 
+    def _range(self, broadcast):
+        # sends a range probe and returns whatever came back, nothing, the
+        # reply byte or, if several probes answered, their collision.
+        package = self.cmd.get_range_ack(broadcast)
+        self.pacer.start()
+        self.dev.write_pkg(package)
+        self.pacer.wire_time += self._transit(len(package) + RANGE_ACK_LEN)
+
+        if self.event_driven:
+            timeout = self._timeout(len(package), RANGE_ACK_LEN)
+            bytes_recv = self.dev.read(timeout=timeout, linger=self.range_wait)
+        else:
+            self._wait(len(package), RANGE_ACK_LEN)
+            bytes_recv = self.dev.read()
+
+        self.pacer.finish(self.cycle_wait)
+        return bytes_recv
+
     def probe_range(self, broadcast):
         """ This command is very similar to probe_module_short(). However,
         it addresses not just one single serial number, but a serial
@@ -320,12 +662,21 @@ class Bus:
         :rtype: :const:`bool`
 
         """
-        package = self.cmd.get_range_ack(broadcast)
-        self.dev.write_pkg(package)
-        self._wait(len(package))
-        bytes_recv = self.dev.read()
-        time.sleep(self.cycle_wait)
-        return self.res.get_range_ack(bytes_recv)
+        return self.res.get_range_ack(self._range(broadcast))
+
+    def probe_range_crc(self, broadcast):
+        """Same as :func:`probe_range`, but it keeps the reply byte. If only
+        one probe of the range answered, it's the CRC of its serial number.
+        If more than one probe answered, the replies collide and the byte
+        is garbage.
+
+        :param serno: Broadcast address.
+        :type  serno: int
+
+        :rtype: :const:`None` if nobody answered, else the reply as int.
+
+        """
+        return self.res.get_range_crc(self._range(broadcast))
 
     def get(self, serno, table, param):
         """This is the base command for getting some information from the
@@ -352,10 +703,11 @@ class Bus:
 
         """
         package = self.cmd.get_parameter(serno, table, param)
+        self.pacer.start()
         self.dev.write_pkg(package)
-        self._wait(len(package))
-        bytes_recv = self.dev.read_pkg()
-        time.sleep(self.cycle_wait)
+        reply_len = self._reply_len(table, param)
+        bytes_recv = self._receive(len(package), reply_len, self.dev.read_pkg)
+        self.pacer.finish(self.cycle_wait)
         return self.res.get_parameter(bytes_recv, table, param)
 
     def set(self, serno, table, param, value, ad_param=0):
@@ -390,10 +742,10 @@ class Bus:
         # pylint: disable=too-many-arguments
         package = self.cmd.set_parameter(serno, table, param,
                                          value, ad_param)
+        self.pacer.start()
         self.dev.write_pkg(package)
-        self._wait(len(package))
-        bytes_recv = self.dev.read_pkg()
-        time.sleep(self.cycle_wait)
+        bytes_recv = self._receive(len(package), HEADER_LEN, self.dev.read_pkg)
+        self.pacer.finish(self.cycle_wait)
         return self.res.set_parameter(bytes_recv, table, serno)
 
     def get_eeprom_page(self, serno, page_nr):
@@ -410,10 +762,10 @@ class Bus:
 
         """
         package = self.cmd.get_epr_page(serno, page_nr)
+        self.pacer.start()
         self.dev.write_pkg(package)
-        self._wait(len(package))
-        bytes_recv = self.dev.read_pkg()
-        time.sleep(self.cycle_wait)
+        bytes_recv = self._receive(len(package), EEPROM_PAGE_LEN, self.dev.read_pkg)
+        self.pacer.finish(self.cycle_wait)
         return self.res.get_epr_page(bytes_recv)
 
     def set_eeprom_page(self, serno, page_nr, page):
@@ -434,9 +786,9 @@ class Bus:
         """
         package = self.cmd.set_epr_page(serno, page_nr, page)
 
+        self.pacer.start()
         self.dev.write_pkg(package)
-        self._wait(len(package))
-        bytes_recv = self.dev.read_pkg()
-        time.sleep(self.cycle_wait)
+        bytes_recv = self._receive(len(package), HEADER_LEN, self.dev.read_pkg)
+        self.pacer.finish(self.cycle_wait)
 
         return self.res.set_epr_page(bytes_recv)
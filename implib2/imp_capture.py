@@ -0,0 +1,215 @@
+# -*- coding: UTF-8 -*-
+
+import time
+import struct
+import collections
+
+from .imp_device import DeviceError
+from .imp_pacing import _monotonic
+
+MAGIC = b'IMPCAP\x01'
+
+# kinds of records in a capture file
+OPEN, CLOSE, BAUDRATE, TX, RX, TIMEOUT = range(6)
+
+# time since start of the capture, kind of record, length of the payload
+RECORD = struct.Struct('<dBH')
+
+Record = collections.namedtuple('Record', ['time', 'kind', 'data'])
+
+
+class CaptureError(Exception):
+    pass
+
+
+def read_capture(filename):
+    """Reads a capture file written by :class:`RecordingDevice`.
+
+    :param filename: The capture file to read.
+    :type  filename: string
+
+    :rtype: list of :class:`Record`
+    """
+    records = list()
+
+    with open(filename, 'rb') as capture:
+        if not capture.read(len(MAGIC)) == MAGIC:
+            raise CaptureError("Not a capture file: {0}!".format(filename))
+
+        while True:
+            head = capture.read(RECORD.size)
+            if not head:
+                break
+            if len(head) < RECORD.size:
+                raise CaptureError("Truncated capture file: {0}!".format(filename))
+
+            stamp, kind, length = RECORD.unpack(head)
+            records.append(Record(stamp, kind, capture.read(length)))
+
+    return records
+
+
+class RecordingDevice(object):
+    """Wraps a :class:`Device` and logs all the traffic into a compact
+    binary capture file. Every record holds a timestamp, the kind of event
+    (TX, RX, timeout, open, close, baudrate change) and the raw bytes.
+    Every record is flushed right away, so the capture is complete up to
+    the last transaction even if the program dies. The recording device can
+    be given to :class:`Bus` instead of a port::
+
+        >>> dev = RecordingDevice(Device('/dev/ttyUSB0'), 'field.cap')
+        >>> bus = Bus(dev)
+        >>> bus.sync()
+        >>> bus.scan()
+        >>> dev.close()
+
+    :param device: The device to record.
+    :type  device: :class:`Device`
+
+    :param filename: The capture file to write.
+    :type  filename: string
+
+    """
+    def __init__(self, device, filename):
+        self.dev = device
+        self._file = open(filename, 'wb')
+        self._file.write(MAGIC)
+        self._start = _monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self.dev, name)
+
+    def _record(self, kind, data=b''):
+        data = bytes(data)
+        self._file.write(RECORD.pack(_monotonic() - self._start, kind, len(data)) + data)
+        self._file.flush()
+
+    def _recv(self, read, *args, **kwargs):
+        try:
+            data = read(*args, **kwargs)
+        except DeviceError as err:
+            self._record(TIMEOUT, str(err).encode('utf-8'))
+            raise
+        self._record(RX, data)
+        return data
+
+    def close(self):
+        """Closes the capture file."""
+        self._file.close()
+
+    def open_device(self, baudrate=9600):
+        self.dev.open_device(baudrate)
+        self._record(OPEN, struct.pack('<I', baudrate))
+
+    def close_device(self):
+        self.dev.close_device()
+        self._record(CLOSE)
+
+    def set_baudrate(self, baudrate):
+        self.dev.set_baudrate(baudrate)
+        self._record(BAUDRATE, struct.pack('<I', baudrate))
+
+    def drain(self):
+        self.dev.drain()
+
+    def write_pkg(self, packet):
+        # recorded before it's sent, so failed attempts are kept as well
+        self._record(TX, packet)
+        return self.dev.write_pkg(packet)
+
+    def read_pkg(self, *args, **kwargs):
+        return self._recv(self.dev.read_pkg, *args, **kwargs)
+
+    def read_bytes(self, *args, **kwargs):
+        return self._recv(self.dev.read_bytes, *args, **kwargs)
+
+    def read(self, *args, **kwargs):
+        return self._recv(self.dev.read, *args, **kwargs)
+
+
+class ReplayDevice(object):
+    """Feeds a session recorded by :class:`RecordingDevice` back to a
+    :class:`Bus`. Every sent package is checked against the recording and
+    every read returns the recorded bytes (or raises the recorded timeout).
+    The replies are delivered with the original timing, scaled by `speed`::
+
+        >>> bus = Bus(ReplayDevice('field.cap', speed=10.0))
+        >>> bus.sync()
+        >>> bus.scan()
+        (10010, 10011)
+
+    :param filename: The capture file to replay.
+    :type  filename: string
+
+    :param speed: Factor to compress the timing with. Use `1.0` for the
+                  original timing and `None` for no waiting at all.
+    :type  speed: float
+
+    :raises DeviceError: If the bus diverges from the recorded session.
+
+    """
+    def __init__(self, filename, speed=1.0):
+        self.records = collections.deque(read_capture(filename))
+        self.speed = speed
+        self.is_open = False
+        self.baudrate = 9600
+        self._start = None
+
+    def _next(self, *kinds):
+        try:
+            record = self.records.popleft()
+        except IndexError:
+            raise DeviceError("Replay exhausted!")
+
+        if record.kind not in kinds:
+            raise DeviceError("Replay diverged at {0:.6f}s!".format(record.time))
+
+        if self._start is None:
+            self._start = _monotonic() - record.time / (self.speed or 1.0)
+        elif self.speed:
+            delay = self._start + record.time / self.speed - _monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        return record
+
+    def _recv(self):
+        record = self._next(RX, TIMEOUT)
+        if record.kind == TIMEOUT:
+            raise DeviceError(record.data.decode('utf-8'))
+        return record.data
+
+    def open_device(self, baudrate=9600):
+        self._next(OPEN)
+        self.baudrate = baudrate
+        self.is_open = True
+
+    def close_device(self):
+        self._next(CLOSE)
+        self.is_open = False
+
+    def set_baudrate(self, baudrate):
+        self._next(BAUDRATE, OPEN)
+        self.baudrate = baudrate
+        self.is_open = True
+
+    def drain(self):
+        pass
+
+    def write_pkg(self, packet):
+        record = self._next(TX)
+        if not record.data == bytes(packet):
+            raise DeviceError("Replay diverged at {0:.6f}s!".format(record.time))
+        return True
+
+    def read_pkg(self, timeout=None):
+        # pylint: disable=unused-argument
+        return self._recv()
+
+    def read_bytes(self, length, timeout=None):
+        # pylint: disable=unused-argument
+        return self._recv()
+
+    def read(self, timeout=None, linger=0.0):
+        # pylint: disable=unused-argument
+        return self._recv()
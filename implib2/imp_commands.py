@@ -1,6 +1,7 @@
 # -*- coding: UTF-8 -*-
 
 import struct
+from collections import OrderedDict
 
 
 class CommandError(Exception):
@@ -8,11 +9,42 @@ class CommandError(Exception):
 
 
 class Command:
-    def __init__(self, tables, package, datatypes):
+    """Builds the request packages. The packages of :func:`get_parameter`
+    and :func:`set_parameter` are kept in a LRU cache of `cache_size`
+    entries, so polling the same parameters again and again doesn't
+    rebuild identical packages. The cache is disabled with a size of 0.
+    """
+    def __init__(self, tables, package, datatypes, cache_size=1024):
         self.tbl = tables
         self.pkg = package
         self.dts = datatypes
 
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def clear_cache(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key, build, *args):
+        try:
+            package = self._cache.pop(key)
+            self.hits += 1
+        except KeyError:
+            package = build(*args)
+            self.misses += 1
+            if not self.cache_size:
+                return package
+            while len(self._cache) >= self.cache_size:
+                self._cache.popitem(last=False)
+
+        # (re)inserted as the most recently used one
+        self._cache[key] = package
+        return package
+
     def get_long_ack(self, serno):
         return self.pkg.pack(serno=serno, cmd=0x02)
 
@@ -26,26 +58,32 @@ class Command:
         return self.pkg.pack(serno=16777215, cmd=0x08)
 
     def get_parameter(self, serno, table, param):
+        key = ('get', serno, table, param)
+        return self._cached(key, self._get_parameter, serno, table, param)
+
+    def _get_parameter(self, serno, table, param):
         cmd = self.tbl.lookup(table, param)
-        param_no = struct.pack('<B', cmd['No'])
+        param_no = struct.pack('<B', cmd.no)
         param_ad = struct.pack('<B', 0)
         data = param_no + param_ad
 
-        package = self.pkg.pack(serno=serno, cmd=cmd['Get'], data=data)
+        package = self.pkg.pack(serno=serno, cmd=cmd.get, data=data)
         return package
 
     # pylint: disable=too-many-arguments
     def set_parameter(self, serno, table, param, values, ad_param=0):
+        # keyed by the packed data, as values which compare equal may still
+        # pack differently (e.g. 0.0 and -0.0)
         cmd = self.tbl.lookup(table, param)
-        fmt = self.dts.lookup(cmd['Type'] % 0x80)
+        codec = self.dts.codec(cmd.dtype, len(values))
 
-        param_no = struct.pack('<B', cmd['No'])
+        param_no = struct.pack('<B', cmd.no)
         param_ad = struct.pack('<B', ad_param)
-        param = struct.pack(fmt.format(len(values)), *values)
+        param = codec.pack(*values)
         data = param_no + param_ad + param
 
-        package = self.pkg.pack(serno=serno, cmd=cmd['Set'], data=data)
-        return package
+        key = ('set', serno, cmd.set, data)
+        return self._cached(key, self.pkg.pack, serno, cmd.set, data)
 
     # pylint: disable=too-many-arguments
     def do_tdr_scan(self, serno, scan_start, scan_end, scan_span, scan_count):
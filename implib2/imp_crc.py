@@ -1,28 +1,48 @@
 # -*- coding: UTF-8 -*-
 
+import sys
 from struct import pack
 
 
 class MaximCRC:
+    """The CRC-8 (Dallas/Maxim) of the IMPBus2, table driven. The CRC of a
+    message can be computed from its chunks as they arrive, by passing the
+    CRC of the chunks so far on::
+
+        >>> crc = MaximCRC()
+        >>> reg = crc.calc(b'\\xfd\\x15')
+        >>> crc.calc(b'\\xed\\x09', reg)
+        243
+
+    The CRC of a message with its CRC appended is zero, so a message is
+    checked without splitting off the CRC.
+    """
     def __init__(self):
-        self.table = make_table()
+        # the table calc() works with, shared by all instances
+        self.table = _TABLE
+
+    @staticmethod
+    def calc(data, crc=0):
+        """Calculates the CRC of the given data.
+
+        :param data: The data, as bytes, bytearray, memoryview or str (py27).
+        :type  data: bytes
+
+        :param crc: The CRC of the data before, to continue with.
+        :type  crc: int
+
+        :rtype: int
+
+        """
+        for byte in _octets(data):
+            crc = _TABLE[crc ^ byte]
+        return crc
 
     def calc_crc(self, byte_str):
-        reg = 0x0
-        for char in byte_str:
-            if isinstance(char, str):
-                idx = (reg ^ ord(char)) & 0xff  # py27
-            else:
-                idx = (reg ^ char) & 0xff       # py33
-            reg = ((reg >> 8) ^ self.table[idx]) & 255
-        return pack('>B', reg)
+        return _BYTES[self.calc(byte_str)]
 
     def check_crc(self, byte_str):
-        data = byte_str[:-1]
-        crc = byte_str[-1:]
-        if not crc == self.calc_crc(data):
-            return False
-        return True
+        return len(byte_str) > 0 and self.calc(byte_str) == 0
 
 
 def reflect(data, width):
@@ -47,3 +67,14 @@ def make_table():
         register = reflect(register, 8)
         table[i] = register & 255
     return table
+
+
+if sys.version_info[0] < 3:
+    _octets = bytearray  # py27, str and buffers iterate as characters
+else:
+    def _octets(data):
+        # bytes, bytearray and (byte) memoryviews iterate as integers
+        return data
+
+_TABLE = tuple(make_table()[i] for i in range(1 << 8))
+_BYTES = tuple(pack('>B', i) for i in range(1 << 8))
@@ -1,8 +1,24 @@
 # -*- coding: UTF-8 -*-
 
+import struct
+
 
 class DataTypes:
+    """The data types of the table parameters. Besides the format strings
+    it keeps a registry of compiled :class:`struct.Struct` codecs, one per
+    type and item count, so packing and unpacking values neither formats
+    nor parses a format string again::
+
+        >>> dts = DataTypes()
+        >>> codec = dts.codec(0x06, 2)
+        >>> codec.pack(1.0, 2.0)
+        b'\\x00\\x00\\x80?\\x00\\x00\\x00@'
+        >>> codec.unpack_from(b'\\x00\\x00\\x00\\x00\\x80?\\x00\\x00\\x00@', 2)
+        (1.0, 2.0)
 
+    The item counts are bound by the 252 bytes of a data block, so the
+    registry stays small.
+    """
     def __init__(self):
         self._dtypes = {
             0x00: '<{0}B',  # 08-bit unsigned char
@@ -13,9 +29,42 @@ class DataTypes:
             0x05: '<{0}i',  # 32-bit signed integer
             0x06: '<{0}f',  # 32-bit float
             0x07: '<{0}d'}  # 64-bit double
+        self._codecs = dict()
 
     def __contains__(self, item):
         return item in self._dtypes
 
     def lookup(self, dtype):
         return self._dtypes[dtype]
+
+    def codec(self, dtype, count=1):
+        """The compiled codec of `count` items of a data type.
+
+        :param dtype: The data type.
+        :type  dtype: int
+
+        :param count: The number of items.
+        :type  count: int
+
+        :raises KeyError: If the data type is unknown.
+
+        :rtype: :class:`struct.Struct`
+
+        """
+        try:
+            return self._codecs[(dtype, count)]
+        except KeyError:
+            codec = struct.Struct(self._dtypes[dtype].format(count))
+            self._codecs[(dtype, count)] = codec
+            return codec
+
+    def size(self, dtype):
+        """The size of a single item of a data type in bytes.
+
+        :param dtype: The data type.
+        :type  dtype: int
+
+        :rtype: int
+
+        """
+        return self.codec(dtype).size
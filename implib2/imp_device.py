@@ -6,24 +6,74 @@ import struct
 import serial
 
 
+# start bit + 8 data bits + odd parity + 2 stop bits (8O2)
+BITS_PER_BYTE = 12
+
+# the serial timeout a read blocks for if no bytes come in
+READ_TIMEOUT = 0.1  # 100ms
+
+
 class DeviceError(Exception):
     pass
 
 
 class Device:
+    """The Device object wraps the serial port used to talk to the IMPBus2.
+
+    :param port: The serial port (or pyserial URL) to use.
+    :type  port: string
+
+    :param zero_copy: Set this to `True` in order to receive every package
+                      into a preallocated buffer using `readinto`. The
+                      :func:`read_pkg` command then returns a `memoryview`
+                      of that buffer, which is only valid until the next
+                      read. Defaults to `False`.
+    :type  zero_copy: bool
 
-    def __init__(self, port):
+    """
+
+    BITS_PER_BYTE = BITS_PER_BYTE
+
+    def __init__(self, port, zero_copy=False):
+        self.port = port
         self.ser = serial.serial_for_url(port, do_not_open=True)
         self.ser.bytesize = serial.EIGHTBITS
         self.ser.parity = serial.PARITY_ODD
         self.ser.stopbits = serial.STOPBITS_TWO
-        self.ser.timeout = 0.1  # 100ms
+        self.ser.timeout = READ_TIMEOUT
         self.ser.xonxoff = 0
         self.ser.rtscts = 0
         self.ser.dsrdtr = 0
+        self.timeout = READ_TIMEOUT
+        self.baudrate = 9600
+        self.zero_copy = zero_copy
         self.is_open = False
 
+        # header (7) + data block (max 255) of the biggest possible package
+        self._buffer = bytearray(7 + 255)
+        self._view = memoryview(self._buffer)
+
+    def _timed(self, func, arg, timeout=None):
+        """Calls a serial read function. If `timeout` is given the serial
+        timeout is temporarily replaced, so the read returns as soon as all
+        bytes arrived or the timeout expired, whatever comes first."""
+        if timeout is None:
+            return func(arg)
+
+        self.ser.timeout = max(timeout, 0)
+        try:
+            return func(arg)
+        finally:
+            self.ser.timeout = self.timeout
+
+    def _read(self, length, timeout=None):
+        return self._timed(self.ser.read, length, timeout)
+
+    def _readinto(self, view, timeout=None):
+        return self._timed(self.ser.readinto, view, timeout)
+
     def open_device(self, baudrate=9600):
+        self.baudrate = baudrate
         self.ser.baudrate = baudrate
         self.ser.open()
         self.ser.flush()
@@ -40,6 +90,19 @@ class Device:
             time.sleep(0.05)  # 50ms
             self.is_open = False
 
+    def set_baudrate(self, baudrate):
+        """Changes the baudrate of the already opened port in place, without
+        the close/open cycle. A closed device simply gets opened."""
+        if not self.is_open:
+            return self.open_device(baudrate)
+
+        self.baudrate = baudrate
+        self.ser.baudrate = baudrate
+
+    def drain(self):
+        """Waits until all written bytes are transmitted."""
+        self.ser.flush()
+
     def write_pkg(self, packet):
         if not self.is_open:
             raise DeviceError("Couldn't write packet, device is closed!")
@@ -51,12 +114,15 @@ class Device:
 
         return True
 
-    def read_pkg(self):
+    def read_pkg(self, timeout=None):
+        if self.zero_copy:
+            return self.read_frame(timeout)
+
         if not self.is_open:
             raise DeviceError("Couldn't read packet, device is closed!")
 
         # read header, always 7 bytes
-        header = self.ser.read(7)
+        header = self._read(7, timeout)
 
         if len(header) < 7:
             raise DeviceError('Timeout reading header!')
@@ -69,29 +135,65 @@ class Device:
         if length == 0:
             return header
 
-        data = self.ser.read(length)
+        if timeout is not None:
+            # the header is in, so give the data block its wire time.
+            timeout = self.timeout + length * self.BITS_PER_BYTE / float(self.baudrate)
+
+        data = self._read(length, timeout)
 
         if len(data) < length:
             raise DeviceError('Timeout reading data!')
 
         return header + data
 
-    def read_bytes(self, length):
+    def read_frame(self, timeout=None):
+        """Reads a package into the preallocated receive buffer, so no new
+        buffer is built per package (the serial port may still copy
+        through a temporary one internally). The returned `memoryview` can
+        be passed to :func:`Package.unpack` directly but only stays valid
+        until the next read."""
+        if not self.is_open:
+            raise DeviceError("Couldn't read packet, device is closed!")
+
+        # read header, always 7 bytes
+        if self._readinto(self._view[:7], timeout) < 7:
+            raise DeviceError('Timeout reading header!')
+
+        length = self._buffer[2]
+
+        if length == 0:
+            return self._view[:7]
+
+        if timeout is not None:
+            # the header is in, so give the data block its wire time.
+            timeout = self.timeout + length * self.BITS_PER_BYTE / float(self.baudrate)
+
+        if self._readinto(self._view[7:7 + length], timeout) < length:
+            raise DeviceError('Timeout reading data!')
+
+        return self._view[:7 + length]
+
+    def read_bytes(self, length, timeout=None):
         if not self.is_open:
             raise DeviceError("Couldn't read bytes, device is closed!")
 
-        data = self.ser.read(length)
+        data = self._read(length, timeout)
 
         if len(data) < length:
             raise DeviceError('Timeout reading bytes!')
 
         return data
 
-    def read(self):
+    def read(self, timeout=None, linger=0.0):
         if not self.is_open:
             raise DeviceError("Couldn't read byte, device is closed!")
 
-        byte = self.ser.read(1)
+        byte = self._read(1, timeout)
+
+        # let colliding answers of other probes die away before flushing.
+        if byte and linger:
+            time.sleep(linger)
+
         self.ser.flushInput()
 
         return byte
@@ -0,0 +1,329 @@
+# -*- coding: UTF-8 -*-
+
+import struct
+import weakref
+import itertools
+
+import serial
+
+from serial.serialutil import SerialBase, SerialException
+
+from .imp_crc import MaximCRC
+from .imp_tables import Tables
+from .imp_datatypes import DataTypes
+
+try:
+    import urlparse                 # py27
+except ImportError:
+    import urllib.parse as urlparse  # py33
+
+# makes serial_for_url() find `implib2/urlhandler/protocol_impemu.py`
+if 'implib2.urlhandler' not in serial.protocol_handler_packages:
+    serial.protocol_handler_packages.append('implib2.urlhandler')
+
+_EMULATORS = weakref.WeakValueDictionary()
+_COUNTER = itertools.count()
+
+BROADCAST = 16777215  # 0xFFFFFF
+
+
+class EmulatorError(Exception):
+    pass
+
+
+class VirtualProbe(object):
+    """A software model of a single IMPBus2 probe. It holds the raw values
+    of all the table parameters from `imp_tables.json`, a set of EEPROM
+    pages and the baudrate it currently listens on.
+
+    :param serno: Serial number of the probe.
+    :type  serno: int
+
+    :param baudrate: Baudrate the probe listens on. Defaults to 9600.
+    :type  baudrate: int
+
+    :param moisture: Moisture value returned by a measurement.
+    :type  moisture: float
+
+    """
+    def __init__(self, serno, baudrate=9600, moisture=12.5):
+        self.serno = serno
+        self.baudrate = baudrate
+        self.moisture = moisture
+        self.values = dict()
+        self.eeprom = dict()
+
+    def get_value(self, table, param, default):
+        return self.values.get((table, param), default)
+
+    def set_value(self, table, param, raw):
+        self.values[(table, param)] = bytes(raw)
+
+    def measure(self):
+        """Runs a (instantaneous) measurement cycle."""
+        self.set_value('MEASURE_PARAMETER_TABLE', 'Moist',
+                       struct.pack('<f', self.moisture))
+
+
+class Emulator(object):
+    """The Emulator simulates a whole IMPBus2 with any number of virtual
+    probes. It speaks the real wire protocol, so it can be used to exercise
+    :class:`Bus` and :class:`Module` without any hardware. Every emulator
+    is reachable by its own pyserial URL, which can be given to
+    :class:`Bus` instead of a serial port::
+
+        >>> from implib2 import Bus, Emulator
+        >>> emu = Emulator([10010, 10011])
+        >>> bus = Bus(emu.url, event_driven=True)
+        >>> bus.sync()
+        >>> bus.scan()
+        (10010, 10011)
+
+    The URL `impemu://?probes=10010,10011` creates an anonymous emulator on
+    the fly. The emulator answers instantly, so reads never block. If more
+    than one probe answers a range ack, the bytes collide and the master
+    receives the bitwise AND of the replies.
+
+    :param probes: Serial numbers (or :class:`VirtualProbe` objects).
+    :type  probes: iterable
+
+    :param name: Name used in the URL, defaults to a unique number.
+    :type  name: string
+
+    """
+    def __init__(self, probes=(), name=None):
+        self.crc = MaximCRC()
+        self.tbl = Tables()
+        self.dts = DataTypes()
+        self.probes = dict()
+
+        self.name = name if name is not None else str(next(_COUNTER))
+        self.url = 'impemu://{0}'.format(self.name)
+        _EMULATORS[self.name] = self
+
+        for probe in probes:
+            self.add_probe(probe)
+
+    @staticmethod
+    def lookup(name):
+        try:
+            return _EMULATORS[name]
+        except KeyError:
+            raise EmulatorError("Unknown emulator: {0}!".format(name))
+
+    def add_probe(self, probe):
+        if not isinstance(probe, VirtualProbe):
+            probe = VirtualProbe(probe)
+        self.probes[probe.serno] = probe
+        return probe
+
+    def remove_probe(self, serno):
+        return self.probes.pop(serno)
+
+    def _default(self, table, param, serno):
+        defaults = {
+            'SerialNum': struct.pack('<I', serno),
+            'HWVersion': struct.pack('<f', 1.14),
+            'FWVersion': struct.pack('<f', 1.140301),
+            'Baudrate': struct.pack('<H', 96),
+            'ModuleName': b'TRIME-PICO'.ljust(16, b'\x00'),
+            'Event': struct.pack('<B', 0x80)}
+        if param in defaults:
+            return defaults[param]
+
+        row = self.tbl.lookup(table, param)
+        return b'\x00' * max(row.length, self.dts.size(row.dtype))
+
+    def _serno(self, serno):
+        return struct.pack('<I', serno)[:-1]
+
+    def _package(self, state, cmd, serno, data=b''):
+        if data:
+            data = data + self.crc.calc_crc(data)
+        header = struct.pack('<BBB', state, cmd, len(data)) + self._serno(serno)
+        return header + self.crc.calc_crc(header) + data
+
+    def _listening(self, baudrate):
+        return [p for p in self.probes.values() if p.baudrate == baudrate]
+
+    def transact(self, package, baudrate=9600):
+        """Feeds a complete request package to the bus and returns the
+        bytes the probes reply with (maybe empty)."""
+        package = bytes(package)
+        if len(package) < 7 or not self.crc.check_crc(package[:7]):
+            return b''
+
+        cmd, length = bytearray(package[1:3])
+        serno = struct.unpack('<I', package[3:6] + b'\x00')[0]
+        data = package[7:7 + length]
+
+        if length and (len(data) < length or not self.crc.check_crc(data)):
+            return b''
+
+        probes = self._listening(baudrate)
+        target = [p for p in probes if p.serno == serno]
+        data = bytearray(data[:-1])
+
+        if cmd == 0x02:
+            return b''.join(self._package(0, cmd, p.serno) for p in target)
+        if cmd == 0x04:
+            return b''.join(self.crc.calc_crc(self._serno(p.serno)) for p in target)
+        if cmd == 0x06:
+            return self._range_ack(probes, serno)
+        if cmd == 0x08:
+            if len(probes) != 1:
+                return b''
+            return self._package(0, cmd, BROADCAST, struct.pack('<I', probes[0].serno))
+        table = self.tbl.commands.get(cmd)
+        if table is not None and cmd == table.get:
+            return b''.join(self._get_param(p, table, data) for p in target)
+        if table is not None and cmd == table.set:
+            if serno == BROADCAST:
+                for probe in probes:
+                    self._set_param(probe, table, data)
+                return b''
+            return b''.join(self._set_param(p, table, data) for p in target)
+        if cmd == 0x3c:
+            return b''.join(self._get_page(p, cmd, data) for p in target)
+        if cmd == 0x3d:
+            return b''.join(self._set_page(p, cmd, data) for p in target)
+
+        return b''.join(self._package(20, cmd, p.serno) for p in target)
+
+    def _range_ack(self, probes, bcast):
+        marker = bcast & -bcast
+        if not marker:
+            return b''
+
+        low, high = bcast - marker, bcast + marker - 1
+        answers = [self.crc.calc(self._serno(p.serno))
+                   for p in probes if low <= p.serno <= high]
+        if not answers:
+            return b''
+
+        byte = 0xff
+        for answer in answers:
+            byte &= answer
+        return struct.pack('<B', byte)
+
+    def _get_param(self, probe, table, data):
+        try:
+            param = table.numbers[data[0]].name
+        except (KeyError, IndexError):
+            return self._package(21, table.get, probe.serno)
+
+        default = self._default(table.name, param, probe.serno)
+        raw = probe.get_value(table.name, param, default)
+        return self._package(0, table.get, probe.serno, raw)
+
+    def _set_param(self, probe, table, data):
+        try:
+            param = table.numbers[data[0]].name
+        except (KeyError, IndexError):
+            return self._package(21, table.set, probe.serno)
+
+        raw = bytes(data[2:])
+        reply = self._package(0, table.set, probe.serno)
+        probe.set_value(table.name, param, raw)
+
+        if param == 'Baudrate':
+            probe.baudrate = struct.unpack('<H', raw)[0] * 100
+        elif param == 'Event':
+            probe.set_value(table.name, param, struct.pack('<B', 0x80 + data[2]))
+        elif param == 'StartMeasure' and data[2] == 1:
+            probe.measure()
+            probe.set_value(table.name, param, b'\x00')
+        elif param == 'SerialNum':
+            del self.probes[probe.serno]
+            probe.serno = struct.unpack('<I', raw)[0]
+            self.probes[probe.serno] = probe
+
+        return reply
+
+    def _get_page(self, probe, cmd, data):
+        page = probe.eeprom.get(data[1], b'\x00' * 250)
+        return self._package(0, cmd, probe.serno, page)
+
+    def _set_page(self, probe, cmd, data):
+        probe.eeprom[data[1]] = bytes(data[2:])
+        return self._package(0, cmd, probe.serno)
+
+
+class EmulatorSerial(SerialBase):
+    """A pyserial port connected to an :class:`Emulator`. It is created by
+    `serial.serial_for_url` for URLs starting with `impemu://`.
+    """
+    # pylint: disable=abstract-method
+
+    def __init__(self, *args, **kwargs):
+        self.emulator = None
+        self._rx = bytearray()
+        self._tx = bytearray()
+        super(EmulatorSerial, self).__init__(*args, **kwargs)
+
+    def from_url(self, url):
+        parts = urlparse.urlsplit(url)
+        if parts.scheme != 'impemu':
+            raise SerialException("Expected an impemu:// URL: {0}".format(url))
+
+        query = urlparse.parse_qs(parts.query)
+        if 'probes' in query:
+            sernos = [int(x) for x in query['probes'][0].split(',') if x]
+            return Emulator(sernos)
+
+        try:
+            return Emulator.lookup(parts.netloc)
+        except EmulatorError as err:
+            raise SerialException(str(err))
+
+    def open(self):
+        if self.is_open:
+            raise SerialException("Port is already open.")
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+
+        # keep the emulator (and so its state) over close/open cycles.
+        if self.emulator is None:
+            self.emulator = self.from_url(self.port)
+
+        self.is_open = True
+        self.reset_input_buffer()
+        self.reset_output_buffer()
+
+    def close(self):
+        self.is_open = False
+
+    def _reconfigure_port(self):
+        pass
+
+    @property
+    def in_waiting(self):
+        return len(self._rx)
+
+    def read(self, size=1):
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def write(self, data):
+        self._tx.extend(data)
+
+        # process every complete request package in the output buffer.
+        while len(self._tx) >= 7:
+            length = self._tx[2]
+            if len(self._tx) < 7 + length:
+                break
+            package = bytes(self._tx[:7 + length])
+            del self._tx[:7 + length]
+            self._rx.extend(self.emulator.transact(package, self.baudrate))
+
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        del self._rx[:]
+
+    def reset_output_buffer(self):
+        del self._tx[:]
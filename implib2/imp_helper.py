@@ -62,3 +62,60 @@ def _imprange(low, high):
     fill = mark | (mark - 1)
     mask = fill ^ 0xFFFFFF
     return low & mask, mark
+
+
+def _prefix_cover(low, high):
+    """ .. funktion:: _prefix_cover(low, high)
+
+    Takes a serial number range and returns the minimal list of aligned
+    ranges (range address, range marker) covering exactly this range, in
+    ascending order. A range of a single serial number has the marker 0.
+
+    :type low: int
+    :type high: int
+    :rtype: list
+
+    """
+    cover = list()
+    while low <= high:
+        size = low & -low or 0x1000000
+        while low + size - 1 > high:
+            size >>= 1
+        cover.append((low, size >> 1))
+        low += size
+    return cover
+
+
+def _load_store(filename):
+    """ .. funktion:: _load_store(filename)
+
+    Reads a json file used to persist data between runs. A missing file
+    gives an empty store.
+
+    :type filename: string
+    :rtype: dict
+    """
+    import json
+    try:
+        with open(filename) as js_file:
+            return json.load(js_file)
+    except (IOError, OSError):
+        return dict()
+
+
+def _save_store(filename, store):
+    """ .. funktion:: _save_store(filename, store)
+
+    Writes the store into a json file. The file is replaced atomically, so
+    a crash never leaves a half written store behind.
+
+    :type filename: string
+    :type store: dict
+    """
+    import os
+    import json
+    tmp_name = filename + '.tmp'
+    with open(tmp_name, 'w') as js_file:
+        json.dump(store, js_file, indent=2, sort_keys=True)
+    replace = getattr(os, 'replace', os.rename)  # py27 has no os.replace
+    replace(tmp_name, filename)
@@ -0,0 +1,127 @@
+# -*- coding: UTF-8 -*-
+
+import threading
+
+from .imp_bus import Bus
+
+
+class BusManager(object):
+    """The BusManager object drives several IMPBus2 lines at once. It owns
+    one :class:`Bus` object per serial port and runs each command on all of
+    them concurrently, using one worker thread per port. So the time needed
+    for a whole cycle is set by the slowest line and not by the sum of all
+    lines::
+
+        >>> from implib2 import BusManager
+        >>> manager = BusManager(['/dev/ttyUSB0', '/dev/ttyUSB1'])
+        >>> manager.sync()
+        {'/dev/ttyUSB0': True, '/dev/ttyUSB1': True}
+        >>> manager.scan()
+        {'/dev/ttyUSB0': (10010, 10011), '/dev/ttyUSB1': (10020,)}
+        >>> manager.poll('MEASURE_PARAMETER_TABLE', 'Moist')
+        {'/dev/ttyUSB0': {10010: 12.1, 10011: 13.4}, '/dev/ttyUSB1': {10020: 9.8}}
+
+    Failing ports don't stop the others. The results only contain the ports
+    (or probes) which succeeded, the exceptions of the failing ones are kept
+    in :attr:`errors`, keyed by the port or by the `(port, serno)` pair.
+
+    :param ports: The serial ports to use.
+    :type  ports: iterable
+
+    :param rs485: Set this to `True` in order to use the way more
+                  relaxed rs485 timings. Defaults to `False`.
+    :type  rs485: bool
+
+    :param event_driven: Use event driven reception on all the buses, see
+                         :class:`Bus`. Defaults to `False`.
+    :type  event_driven: bool
+
+    """
+    def __init__(self, ports, rs485=False, event_driven=False):
+        self.buses = dict()
+        for port in ports:
+            self.buses[port] = Bus(port, rs485=rs485, event_driven=event_driven)
+
+        self.probes = dict()
+        self.errors = dict()
+
+    def _run(self, func, *args):
+        results = dict()
+        errors = dict()
+
+        def worker(port, bus):
+            try:
+                results[port] = func(port, bus, *args)
+            except Exception as err:  # pylint: disable=broad-except
+                errors[port] = err
+
+        threads = [threading.Thread(target=worker, args=(port, bus))
+                   for port, bus in self.buses.items()]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.errors = errors
+        return results
+
+    def sync(self, baudrate=9600):
+        """Synchronises the probes of all buses to the given baudrate, see
+        :func:`Bus.sync`.
+
+        :param baudrate: Baudrate to use (1200-2400-4800-9600).
+        :type  baudrate: int
+
+        :rtype: dict
+
+        """
+        return self._run(lambda port, bus: bus.sync(baudrate))
+
+    def scan(self, minserial=0, maxserial=16777215):
+        """Scans all buses for connected probes, see :func:`Bus.scan`. The
+        found serial numbers are remembered for :func:`poll`.
+
+        :param minserial: Start of the range to search (usually: 0).
+        :type  minserial: int
+
+        :param maxserial: End of the range to search (usually: 16777215).
+        :type  maxserial: int
+
+        :rtype: dict
+
+        """
+        results = self._run(lambda port, bus: bus.scan(minserial, maxserial))
+        self.probes.update(results)
+        return results
+
+    def poll(self, table, param):
+        """Requests the given parameter from all the probes found by the
+        last :func:`scan`, see :func:`Bus.get`. Values consisting of a
+        single item are unpacked.
+
+        :param table: System table containing the requested infomation.
+        :type  table: string
+
+        :param param: Parameter od row containing the requested infomation.
+        :type  param: string
+
+        :rtype: dict
+
+        """
+        failed = dict()
+
+        def poll_bus(port, bus):
+            values = dict()
+            for serno in self.probes.get(port, ()):
+                try:
+                    value = bus.get(serno, table, param)
+                except Exception as err:  # pylint: disable=broad-except
+                    failed[(port, serno)] = err
+                    continue
+                values[serno] = value[0] if len(value) == 1 else value
+            return values
+
+        results = self._run(poll_bus)
+        self.errors.update(failed)
+        return results
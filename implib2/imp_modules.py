@@ -91,7 +91,7 @@ class Module:
         """
         # Calculate the SupportPW: calc_crc(serno) + 0x8000
         passwd = struct.pack('<I', self._serno)
-        passwd = struct.unpack('<B', self.crc.calc_crc(passwd))[0] + 0x8000
+        passwd = self.crc.calc(passwd) + 0x8000
 
         # Unlock the device with the password
         table = 'ACTION_PARAMETER_TABLE'
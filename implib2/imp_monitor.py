@@ -0,0 +1,172 @@
+# -*- coding: UTF-8 -*-
+
+from .imp_bus import HEADER_LEN, SHORT_ACK_LEN, RANGE_ACK_LEN
+from .imp_scanner import Scanner, TRANSIENT
+
+
+class Monitor(object):
+    """The Monitor watches a running bus for probes being plugged in or
+    removed. Instead of blocking the bus with a full :func:`Bus.scan`, it
+    only uses the idle time between the regular transactions of the
+    caller. Every round confirms the known probes by a short probe each and
+    walks the range tree of the rest of the address space, like
+    :func:`Bus.rescan`, one node at a time::
+
+        >>> monitor = Monitor(bus, bus.scan(), on_appear=print, on_disappear=print)
+        >>> while True:
+        ...     values = [bus.get(serno, table, param) for serno in monitor.probes]
+        ...     monitor.idle(bus.pacer.clock() + 10.0)
+        ...     # the next poll is due now
+
+    :func:`idle` only starts a node if all of its transactions fit before
+    the given deadline, so a scheduled poll is never delayed. Unless the
+    bus is event driven, every probe without a reply is budgeted with the
+    serial timeout its read blocks for on top. A node which fails is simply
+    tried again in the next idle slot.
+
+    A new probe is reported the moment it answers. A known probe is only
+    reported as gone once it missed `misses` rounds in a row, so a single
+    lost reply doesn't drop it.
+
+    :param bus: The bus to watch.
+    :type  bus: :class:`Bus`
+
+    :param known: Serial numbers of the probes already known.
+    :type  known: iterable
+
+    :param minserial: Start of the range to watch (usually: 0).
+    :type  minserial: int
+
+    :param maxserial: End of the range to watch (usually: 16777215).
+    :type  maxserial: int
+
+    :param ranges: List of `(minserial, maxserial)` pairs to watch instead
+                   of the single range above.
+    :type  ranges: iterable
+
+    :param on_appear: Called with the serial number of every new probe.
+    :type  on_appear: callable
+
+    :param on_disappear: Called with the serial number of every probe gone.
+    :type  on_disappear: callable
+
+    :param misses: Number of rounds in a row a probe has to miss to be
+                   reported as gone. Defaults to 2.
+    :type  misses: int
+
+    """
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(self, bus, known=(), minserial=0, maxserial=16777215, ranges=None,
+                 on_appear=None, on_disappear=None, misses=2):
+        self.bus = bus
+        self.ranges = ranges if ranges is not None else [(minserial, maxserial)]
+        self.on_appear = on_appear
+        self.on_disappear = on_disappear
+        self.misses = misses
+
+        self.probes = set(known)
+        self.missed = dict()
+        self.rounds = 0
+        self.errors = 0
+        self.scanner = None
+        self._seen = 0
+        self._start()
+
+    def _start(self):
+        self.scanner = Scanner(self.bus, ranges=self.ranges, known=self.probes, retries=0)
+        self._seen = 0
+
+    def _contains(self, serno):
+        return self.scanner._contains(serno)  # pylint: disable=protected-access
+
+    def _finish(self):
+        found = set(self.scanner.results())
+        for serno in sorted(x for x in self.probes - found if self._contains(x)):
+            self.missed[serno] = self.missed.get(serno, 0) + 1
+            if self.missed[serno] >= self.misses:
+                self.probes.discard(serno)
+                del self.missed[serno]
+                if self.on_disappear is not None:
+                    self.on_disappear(serno)
+
+        self.rounds += 1
+        self._start()
+
+    def _transaction(self, range_probe):
+        # a probe takes at most its timeout and the gap after it. Unless the
+        # bus is event driven a read without reply blocks for the serial
+        # timeout on top, otherwise a range ack lingers for range_wait.
+        # pylint: disable=protected-access
+        bus = self.bus
+        reply_len = RANGE_ACK_LEN if range_probe else SHORT_ACK_LEN
+        seconds = bus._timeout(HEADER_LEN, reply_len) + bus.cycle_wait
+        if not bus.event_driven:
+            seconds += bus._read_timeout()
+        elif range_probe:
+            seconds += bus.range_wait
+        return seconds
+
+    def cost(self):
+        """The time the next node takes at most: a single probe, or for a
+        pair of serial numbers the range probe and both short probes.
+
+        :rtype: float
+
+        """
+        _, range_marker = self.scanner.queue[-1]
+        if range_marker == 0:
+            return self._transaction(False)
+        seconds = self._transaction(True)
+        if range_marker == 1:
+            seconds += 2 * self._transaction(False)
+        return seconds
+
+    def step(self):
+        """Searches the next node of the current round, reports the new
+        probes it found and starts the next round after the last node.
+
+        :rtype: :const:`bool`, `True` if the node was searched.
+
+        """
+        try:
+            self.scanner.step()
+        except TRANSIENT:
+            self.errors += 1
+            return False
+        finally:
+            found = self.scanner.found
+            while self._seen < len(found):
+                serno = found[self._seen]
+                self._seen += 1
+                self.missed.pop(serno, None)
+                if serno not in self.probes and self._contains(serno):
+                    self.probes.add(serno)
+                    if self.on_appear is not None:
+                        self.on_appear(serno)
+
+        if not self.scanner.queue:
+            self._finish()
+        return True
+
+    def idle(self, deadline):
+        """Spends the time until the deadline on the search, as long as the
+        next node fits in completely.
+
+        :param deadline: The time the bus has to be free again, on the clock
+                         of the pacer of the bus.
+        :type  deadline: float
+
+        :rtype: int, the number of nodes searched.
+
+        """
+        pacer = self.bus.pacer
+        steps = 0
+        while self.scanner.queue:
+            start = pacer.clock()
+            if pacer.free_at is not None:
+                start = max(start, pacer.free_at)
+            if start + self.cost() > deadline:
+                break
+            if self.step():
+                steps += 1
+        return steps
@@ -0,0 +1,116 @@
+# -*- coding: UTF-8 -*-
+
+import time
+
+try:
+    _monotonic = time.monotonic     # py33
+except AttributeError:
+    _monotonic = time.time          # py27
+
+
+class Pacer(object):
+    """The Pacer spaces the transactions on the bus. Instead of sleeping a
+    fixed time after every step, it keeps the absolute (monotonic) deadline
+    at which the bus is free again. A new transaction waits exactly until
+    that deadline, so the time spent in between (Python overhead, building
+    packages) is not added on top of the configured gaps::
+
+        >>> pacer = Pacer()
+        >>> pacer.start()           # waits until the bus is free
+        >>> dev.write_pkg(package)
+        >>> pacer.wait(0.010)       # 10ms after the start of the transaction
+        >>> bytes_recv = dev.read()
+        >>> pacer.finish(0.001)     # bus is free again in 1ms
+
+    Short waits are not left to `time.sleep`, which tends to overshoot by a
+    millisecond or more. The last `spin` seconds before a deadline are
+    spent busy waiting on the clock.
+
+    The pacer keeps some statistics: :attr:`wait_time` is the time spent
+    waiting for deadlines and :attr:`idle_time` the time the bus was free
+    but unused between two transactions, the slack of the caller. The user
+    of the pacer may book the time its packages spend on the wire to
+    :attr:`wire_time`.
+
+    :param spin: Time before a deadline to busy wait instead of sleeping.
+                 Defaults to 2ms.
+    :type  spin: float
+
+    :param clock: Clock to use, defaults to a monotonic clock.
+    :type  clock: callable
+
+    """
+    def __init__(self, spin=0.002, clock=None):
+        self.spin = spin
+        self.clock = clock if clock is not None else _monotonic
+        self.free_at = None
+        self.started = None
+        self.reset()
+
+    def reset(self):
+        """Resets the statistics."""
+        self.transactions = 0
+        self.wait_time = 0.0
+        self.idle_time = 0.0
+        self.wire_time = 0.0
+
+    def wait_until(self, deadline):
+        """Waits until the clock reaches the given deadline.
+
+        :param deadline: The absolute time to wait for.
+        :type  deadline: float
+
+        :rtype: float, the time after waiting.
+
+        """
+        now = self.clock()
+        tic = now
+
+        remaining = deadline - now
+        if remaining > self.spin:
+            time.sleep(remaining - self.spin)
+            now = self.clock()
+
+        while now < deadline:
+            now = self.clock()
+
+        self.wait_time += now - tic
+        return now
+
+    def start(self):
+        """Waits until the bus is free and starts a new transaction.
+
+        :rtype: float, the start time of the transaction.
+
+        """
+        if self.free_at is None:
+            now = self.clock()
+        else:
+            now = self.clock()
+            if now < self.free_at:
+                now = self.wait_until(self.free_at)
+            else:
+                self.idle_time += now - self.free_at
+
+        self.started = now
+        self.free_at = None
+        self.transactions += 1
+        return now
+
+    def wait(self, delay):
+        """Waits until `delay` seconds after the start of the transaction.
+
+        :param delay: Time since the start of the transaction.
+        :type  delay: float
+
+        """
+        return self.wait_until(self.started + delay)
+
+    def finish(self, gap=0.0):
+        """Ends the transaction, the bus is free again in `gap` seconds.
+
+        :param gap: The minimum time to the next transaction.
+        :type  gap: float
+
+        """
+        self.free_at = self.clock() + gap
@@ -1,14 +1,53 @@
 # -*- coding: UTF-8 -*-
 
 import struct
+from collections import namedtuple
+
 from .imp_crc import MaximCRC
 from .imp_errors import Errors
 
+HEADER = ('state', 'cmd', 'length', 'serno')
+
+# the states of a reply package which are no error
+STATES = frozenset([0, 122, 123, 160, 161, 162, 163, 164, 165, 166, 253, 255])
+
 
 class PackageError(Exception):
     pass
 
 
+def _check_data(data):
+    if len(data) - 1 > 252:  # NOTE: crc is still attached
+        raise PackageError("Data block bigger than 252Bytes!")
+    if not MaximCRC.calc(data) == 0:
+        raise PackageError("Package with faulty data CRC!")
+
+
+class Frame(namedtuple('Frame', HEADER + ('package',))):
+    """A received package: the fields of its header and the raw package.
+    The data block is only sliced off and checked when :attr:`data` is
+    accessed, so acks which only need the header don't pay for it. A frame
+    of a `memoryview` read by
+    :func:`Device.read_frame` only stays valid until the next read.
+    """
+    __slots__ = ()
+
+    @property
+    def header(self):
+        return dict(zip(HEADER, self[:4]))
+
+    @property
+    def data(self):
+        if len(self.package) <= 7:
+            return None
+        data = self.package[7:]
+        _check_data(data)
+        return data[:-1]
+
+
+_new_frame = tuple.__new__
+
+
 class Package(object):
 
     def __init__(self):
@@ -20,13 +59,6 @@ class Package(object):
             raise PackageError("Data block bigger than 252Bytes!")
         return data + self.crc.calc_crc(data)
 
-    def _unpack_data(self, data):
-        if len(data[:-1]) > 252:  # NOTE: crc is still attached
-            raise PackageError("Data block bigger than 252Bytes!")
-        if not self.crc.check_crc(data):
-            raise PackageError("Package with faulty data CRC!")
-        return data[:-1]
-
     def _pack_head(self, cmd, length, serno):
         state = struct.pack('<B', 0xfd)  # indicates IMP232N protocol version
         cmd = struct.pack('<B', cmd)
@@ -38,24 +70,23 @@ class Package(object):
 
         return header
 
-    def _unpack_head(self, header):
-        if isinstance(header, str):  # py27
-            state = struct.unpack('<B', header[0])[0]
-            cmd = struct.unpack('<B', header[1])[0]
-            length = struct.unpack('<B', header[2])[0]
-        else:                        # py33
-            state, cmd, length = header[0], header[1], header[2]
+    def unpack_head(self, package):
+        """Checks the header of a package only, see :class:`Frame`.
 
-        serno = struct.unpack('<I', header[3:6] + b'\x00')[0]
+        :rtype: :class:`Frame`
+        """
+        # works on bytes, str (py27) and memoryview without slicing.
+        state, cmd, length, serno, serno_hi = struct.unpack_from('<BBBHB', package)
+        serno |= serno_hi << 16
 
-        if not self.crc.check_crc(header):
+        if not MaximCRC.calc(package[:7]) == 0:
             raise PackageError("Package with faulty header CRC!")
 
-        states = [0, 122, 123, 160, 161, 162, 163, 164, 165, 166, 253, 255]
-        if state not in states:
+        if state not in STATES:
             raise PackageError("{0}".format(self.err.lookup(state)))
 
-        return {'state': state, 'cmd': cmd, 'length': length, 'serno': serno}
+        # skips the argument handling of the generated Frame.__new__
+        return _new_frame(Frame, (state, cmd, length, serno, package))
 
     def pack(self, serno, cmd, data=None):
         if data:
@@ -69,12 +100,11 @@ class Package(object):
         return package
 
     def unpack(self, package):
-        header = self._unpack_head(package[:7])
-        data = None
+        """Checks the header and the data block of a package.
 
+        :rtype: :class:`Frame`
+        """
+        frame = self.unpack_head(package)
         if len(package) > 7:
-            data = self._unpack_data(package[7:])
-
-        package = {'header': header, 'data': data}
-
-        return package
+            _check_data(package[7:])
+        return frame
@@ -0,0 +1,325 @@
+# -*- coding: UTF-8 -*-
+
+import math
+import bisect
+import collections
+
+from .imp_device import READ_TIMEOUT
+from .imp_bus import Bus, HEADER_LEN, SHORT_ACK_LEN, RANGE_ACK_LEN, DEFAULT_TIMINGS, \
+    _transit, _timeout
+from .imp_scanner import Scanner
+from .imp_helper import _flp2, _prefix_cover
+
+# the supported distributions of the serial numbers on the bus
+DISTRIBUTIONS = ('uniform', 'sequential')
+
+# number of block positions averaged for the sequential distribution
+SEQUENTIAL_SAMPLES = 16
+
+Estimate = collections.namedtuple('Estimate', ['range_probes', 'short_probes', 'seconds'])
+
+
+class PlannerError(Exception):
+    pass
+
+
+class Planner(object):
+    """The Planner predicts the costs of a :func:`Bus.scan` without touching
+    the bus, e.g. to schedule a maintenance window. Given the number of
+    probes expected on the bus and how their serial numbers are
+    distributed, it estimates the number of range and short probes the
+    scan needs and how long it takes::
+
+        >>> from implib2 import Planner
+        >>> planner = Planner(ranges=[(10000, 19999)])
+        >>> planner.estimate(20)['expected']
+        Estimate(range_probes=321.59..., short_probes=39.96..., seconds=56.71...)
+        >>> planner.plan(20)['rs485']['worst']
+        Estimate(range_probes=348, short_probes=40, seconds=305.02)
+
+    The scan walks the same tree as :class:`Scanner`: the ranges are split
+    into their minimal cover of aligned subtrees, each subtree is range
+    probed and only the halves of positive ones are descended further. The
+    estimates come with three bounds:
+
+    * `best`: all probes in one aligned block of consecutive serial
+      numbers, which shares most of the tree.
+    * `expected`: the mean over the distribution. For `uniform` serial
+      numbers it's computed analytically, from the chance of each node of
+      the tree to hold a probe. For `sequential` ones (a single batch of
+      consecutive serial numbers) it's the mean over several positions of
+      the block.
+    * `worst`: the probes spread evenly over the ranges, so each of them
+      needs its own path down the tree.
+
+    The time of a transaction follows the wire time model of :class:`Bus`.
+    Unless `event_driven` is set, every probe waits for its full timeout and
+    the read of a negative one blocks for the serial timeout on top.
+    Otherwise positive replies are taken to arrive right away, only the
+    negative ones wait for the timeout.
+
+    :param minserial: Start of the range to search (usually: 0).
+    :type  minserial: int
+
+    :param maxserial: End of the range to search (usually: 16777215).
+    :type  maxserial: int
+
+    :param ranges: List of `(minserial, maxserial)` pairs to search instead
+                   of the single range above.
+    :type  ranges: iterable
+
+    """
+    def __init__(self, minserial=0, maxserial=16777215, ranges=None):
+        # pylint: disable=protected-access
+        self.ranges = Scanner._merge(ranges if ranges is not None else [(minserial, maxserial)])
+        self.roots = [node for low, high in self.ranges for node in _prefix_cover(low, high)]
+        self.size = sum(high - low + 1 for low, high in self.ranges)
+
+        self._offsets = list()
+        offset = 0
+        for low, high in self.ranges:
+            self._offsets.append(offset)
+            offset += high - low + 1
+
+    def _serno(self, position):
+        # the serial number at the given position of the concatenated ranges
+        idx = bisect.bisect_right(self._offsets, position) - 1
+        return self.ranges[idx][0] + position - self._offsets[idx]
+
+    def _position(self, serno):
+        # the position of a serial number within the concatenated ranges
+        idx = bisect.bisect_right(self.ranges, (serno, 0x1000000)) - 1
+        return self._offsets[idx] + serno - self.ranges[idx][0]
+
+    def count(self, sernos):
+        """The exact number of probes a scan of the ranges spends if the
+        given probes are connected to the bus.
+
+        :param sernos: The serial numbers of the probes on the bus.
+        :type  sernos: iterable
+
+        :rtype: tuple, the number of range probes, of short probes and of
+                the positive range probes.
+
+        """
+        sernos = sorted(set(sernos))
+        range_probes = short_probes = positives = 0
+
+        stack = list(reversed(self.roots))
+        while stack:
+            range_address, range_marker = stack.pop()
+            low = range_address
+            high = range_address + max(2 * range_marker, 1) - 1
+            pos = bisect.bisect_left(sernos, low)
+            occupied = pos < len(sernos) and sernos[pos] <= high
+
+            if range_marker == 0:
+                short_probes += 1
+                continue
+
+            range_probes += 1
+            if not occupied:
+                continue
+
+            positives += 1
+            if range_marker == 1:
+                short_probes += 2
+            else:
+                stack.append((range_address, range_marker >> 1))
+                stack.append((range_address + range_marker, range_marker >> 1))
+
+        return range_probes, short_probes, positives
+
+    def _occupied(self, probes, size):
+        # chance of a node of the given size to hold at least one of the
+        # probes, drawn without replacement from the ranges.
+        if self.size - size < probes:
+            return 1.0
+        empty = sum(math.log1p(-size / float(self.size - idx)) for idx in range(probes))
+        return 1.0 - math.exp(empty)
+
+    def expect(self, probes):
+        """The expected number of probes a scan of the ranges spends for
+        uniformly distributed serial numbers.
+
+        :param probes: Number of probes on the bus.
+        :type  probes: int
+
+        :rtype: tuple, the number of range probes, of short probes and of
+                the positive range probes.
+
+        """
+        range_probes = short_probes = positives = 0.0
+
+        for _, range_marker in self.roots:
+            if range_marker == 0:
+                short_probes += 1
+                continue
+
+            range_probes += 1
+            positives += self._occupied(probes, 2 * range_marker)
+
+            # a node of a level is probed if its parent holds a probe
+            size = range_marker
+            while size > 1:
+                nodes = 2.0 * range_marker / size
+                range_probes += nodes * self._occupied(probes, 2 * size)
+                positives += nodes * self._occupied(probes, size)
+                size >>= 1
+
+            # both serial numbers of a positive pair are probed
+            short_probes += 2 * range_marker * self._occupied(probes, 2)
+
+        return range_probes, short_probes, positives
+
+    def _block(self, probes, start):
+        # a batch of consecutive serial numbers from the given position on
+        return self.count(self._serno(start + idx) for idx in range(probes))
+
+    def _offsets_of(self, probes):
+        # block positions within a few times the block size, to catch the
+        # effect of the alignment.
+        span = min(4 * _flp2(max(probes, 1)), self.size - probes + 1)
+        return sorted(set(idx * span // SEQUENTIAL_SAMPLES for idx in range(SEQUENTIAL_SAMPLES)))
+
+    def _best(self, probes):
+        # the cheapest block, starting at the subtrees of the cover or at
+        # the positions sampled for the sequential distribution.
+        starts = set(self._offsets_of(probes))
+        for address, _ in self.roots:
+            position = self._position(address)
+            if position + probes <= self.size:
+                starts.add(position)
+        return min((self._block(probes, start) for start in starts),
+                   key=lambda counts: counts[0] + counts[1])
+
+    def _worst(self, probes):
+        return self.count(self._serno(idx * self.size // probes) for idx in range(probes))
+
+    def _sequential(self, probes):
+        counts = [self._block(probes, start) for start in self._offsets_of(probes)]
+        return tuple(sum(values) / float(len(counts)) for values in zip(*counts))
+
+    def seconds(self, range_probes, short_probes, positives, probes, rs485=False,
+                baudrate=9600, event_driven=False, bus=None):
+        """The time a scan of the given number of probes takes.
+
+        :param range_probes: Number of range probes.
+        :type  range_probes: float
+
+        :param short_probes: Number of short probes.
+        :type  short_probes: float
+
+        :param positives: Number of positive range probes.
+        :type  positives: float
+
+        :param probes: Number of probes found (positive short probes).
+        :type  probes: int
+
+        :param rs485: Use the rs485 timings. Defaults to `False`.
+        :type  rs485: bool
+
+        :param baudrate: The baudrate of the bus. Defaults to 9600.
+        :type  baudrate: int
+
+        :param event_driven: Model an event driven bus, see above.
+        :type  event_driven: bool
+
+        :param bus: Take the timings, the baudrate, the mode and the serial
+                    timeout from this (e.g. calibrated) bus instead.
+        :type  bus: :class:`Bus`
+
+        :rtype: float
+
+        """
+        # pylint: disable=protected-access
+        if bus is not None:
+            timings = dict((name, getattr(bus, name)) for name in Bus.TIMINGS)
+            baudrate = bus.baudrate
+            event_driven = bus.event_driven
+            read_timeout = bus._read_timeout()
+        else:
+            timings = DEFAULT_TIMINGS[bool(rs485)]
+            read_timeout = READ_TIMEOUT
+
+        def transit(length):
+            return _transit(length, baudrate, timings['trans_wait'])
+
+        cycle = timings['cycle_wait']
+        range_timeout = _timeout(HEADER_LEN, RANGE_ACK_LEN, baudrate, timings['trans_wait'])
+        short_timeout = _timeout(HEADER_LEN, SHORT_ACK_LEN, baudrate, timings['trans_wait'])
+
+        if not event_driven:
+            misses = (range_probes - positives) + (short_probes - probes)
+            return range_probes * (range_timeout + cycle) + \
+                short_probes * (short_timeout + cycle) + misses * read_timeout
+
+        negatives = (range_probes - positives) * (range_timeout + cycle) + \
+            (short_probes - probes) * (short_timeout + cycle)
+        range_hits = positives * (transit(HEADER_LEN + RANGE_ACK_LEN) +
+                                  timings['range_wait'] + cycle)
+        short_hits = probes * (transit(HEADER_LEN + SHORT_ACK_LEN) + cycle)
+        return negatives + range_hits + short_hits
+
+    def estimate(self, probes, distribution='uniform', **kwargs):
+        """Estimates the costs of a scan with the best, expected and worst
+        bound, see above. Further keyword arguments are passed on to
+        :func:`seconds`.
+
+        :param probes: Number of probes expected on the bus.
+        :type  probes: int
+
+        :param distribution: Distribution of the serial numbers, `uniform`
+                             or `sequential`. Defaults to `uniform`.
+        :type  distribution: string
+
+        :raises PlannerError: If the distribution is unknown or the probes
+                              don't fit into the ranges.
+
+        :rtype: dict of :class:`Estimate`
+
+        """
+        if distribution not in DISTRIBUTIONS:
+            raise PlannerError("Unknown distribution: {0}!".format(distribution))
+        if not 0 <= probes <= self.size:
+            raise PlannerError("{0} probes don't fit into the ranges!".format(probes))
+
+        bounds = {
+            'best': self._best(probes),
+            'worst': self._worst(probes)}
+        if distribution == 'uniform':
+            bounds['expected'] = self.expect(probes)
+        else:
+            bounds['expected'] = self._sequential(probes)
+
+        estimates = dict()
+        for bound, (range_probes, short_probes, positives) in bounds.items():
+            seconds = self.seconds(range_probes, short_probes, positives, probes, **kwargs)
+            estimates[bound] = Estimate(range_probes, short_probes, seconds)
+        return estimates
+
+    def plan(self, probes, distribution='uniform', baudrate=9600, event_driven=False):
+        """Estimates the costs of a scan for both, the rs232 and the rs485
+        timings.
+
+        :param probes: Number of probes expected on the bus.
+        :type  probes: int
+
+        :param distribution: Distribution of the serial numbers, `uniform`
+                             or `sequential`. Defaults to `uniform`.
+        :type  distribution: string
+
+        :param baudrate: The baudrate of the bus. Defaults to 9600.
+        :type  baudrate: int
+
+        :param event_driven: Model an event driven bus, see above.
+        :type  event_driven: bool
+
+        :rtype: dict, the estimates of :func:`estimate` keyed by `rs232`
+                and `rs485`.
+
+        """
+        return dict(
+            (name, self.estimate(probes, distribution, rs485=rs485, baudrate=baudrate,
+                                 event_driven=event_driven))
+            for name, rs485 in (('rs232', False), ('rs485', True)))
@@ -0,0 +1,198 @@
+# -*- coding: UTF-8 -*-
+
+import time
+
+from .imp_helper import _load_store, _save_store
+
+# static facts of a probe, read once from the SYSTEM_PARAMETER_TABLE
+FACTS = ('HWVersion', 'FWVersion', 'ModuleName')
+
+
+class RegistryError(Exception):
+    pass
+
+
+class Registry(object):
+    """The Registry keeps the probes found on every port in a json file, so
+    a restarted service doesn't have to scan the bus again. For each port
+    it stores the baudrate, the time of the last scan and for each probe
+    the time it was last seen and its static facts (hardware and firmware
+    version, module name)::
+
+        >>> from implib2 import Bus, Registry
+        >>> registry = Registry('probes.json')
+        >>> bus = Bus('/dev/ttyUSB0')
+        >>> bus.sync()
+        >>> registry.refresh(bus)
+        (10010, 10011)
+        >>> registry.facts(bus.port, 10010)
+        {'HWVersion': '1.14', 'FWVersion': '1.140301', 'ModuleName': 'TRIME-PICO', ...}
+
+    :func:`refresh` only touches the bus if the entry of the port is older
+    than `ttl` seconds. Then the known probes are confirmed by an
+    incremental :func:`Bus.rescan` and only new probes are asked for their
+    static facts.
+
+    :param filename: The json file to keep the registry in.
+    :type  filename: string
+
+    :param ttl: Time to live of the port entries in seconds. Defaults to
+                one day.
+    :type  ttl: float
+
+    """
+    def __init__(self, filename, ttl=86400.0):
+        self.filename = filename
+        self.ttl = ttl
+        self.ports = _load_store(filename)
+
+    def save(self):
+        """Writes the registry to its file."""
+        _save_store(self.filename, self.ports)
+
+    def _entry(self, port):
+        try:
+            return self.ports[str(port)]
+        except KeyError:
+            raise RegistryError("Unknown port: {0}!".format(port))
+
+    def probes(self, port):
+        """The serial numbers registered for the port.
+
+        :param port: The serial port.
+        :type  port: string
+
+        :rtype: tuple
+
+        """
+        if str(port) not in self.ports:
+            return tuple()
+        return tuple(sorted(int(serno) for serno in self._entry(port)['probes']))
+
+    def baudrate(self, port):
+        """The baudrate the probes of the port were seen with.
+
+        :param port: The serial port.
+        :type  port: string
+
+        :raises RegistryError: If the port is unknown.
+
+        :rtype: int
+
+        """
+        return self._entry(port)['baudrate']
+
+    def facts(self, port, serno):
+        """The static facts of a registered probe.
+
+        :param port: The serial port.
+        :type  port: string
+
+        :param serno: Serial number of the probe.
+        :type  serno: int
+
+        :raises RegistryError: If the port or the probe is unknown.
+
+        :rtype: dict
+
+        """
+        try:
+            return self._entry(port)['probes'][str(serno)]
+        except KeyError:
+            raise RegistryError("Unknown probe: {0}!".format(serno))
+
+    def expired(self, port):
+        """Whether the entry of the port is missing or older than the TTL.
+
+        :param port: The serial port.
+        :type  port: string
+
+        :rtype: bool
+
+        """
+        entry = self.ports.get(str(port))
+        return entry is None or time.time() - entry['scanned'] > self.ttl
+
+    def update(self, port, sernos, baudrate=9600, facts=None):
+        """Registers the probes found on a port. Probes which are not found
+        anymore are dropped, the facts of the others are kept.
+
+        :param port: The serial port.
+        :type  port: string
+
+        :param sernos: Serial numbers found on the port.
+        :type  sernos: iterable
+
+        :param baudrate: Baudrate the probes were found with.
+        :type  baudrate: int
+
+        :param facts: Static facts of (new) probes, keyed by serial number.
+        :type  facts: dict
+
+        """
+        now = time.time()
+        facts = facts or dict()
+        old = self.ports.get(str(port), dict()).get('probes', dict())
+
+        probes = dict()
+        for serno in sernos:
+            probe = dict(old.get(str(serno), dict()))
+            probe.update(facts.get(serno, dict()))
+            probe['last_seen'] = now
+            probes[str(serno)] = probe
+
+        self.ports[str(port)] = {'baudrate': baudrate, 'scanned': now, 'probes': probes}
+
+    @staticmethod
+    def read_facts(bus, serno):
+        """Reads the static facts of a probe.
+
+        :param bus: The bus the probe is connected to.
+        :type  bus: :class:`Bus`
+
+        :param serno: Serial number of the probe.
+        :type  serno: int
+
+        :rtype: dict
+
+        """
+        table = 'SYSTEM_PARAMETER_TABLE'
+        hw_version = bus.get(serno, table, 'HWVersion')[0]
+        fw_version = bus.get(serno, table, 'FWVersion')[0]
+        name = bus.get(serno, table, 'ModuleName')
+
+        return {
+            'HWVersion': '{0:.2f}'.format(hw_version),
+            'FWVersion': '{0:.6f}'.format(fw_version),
+            'ModuleName': ''.join(chr(x) for x in name if x)}
+
+    def refresh(self, bus, force=False):
+        """Returns the probes of the bus, from the registry as long as the
+        entry of the port is within its TTL or else by rescanning the bus.
+        New probes are asked for their static facts and the registry is
+        saved.
+
+        :param bus: The bus to refresh.
+        :type  bus: :class:`Bus`
+
+        :param force: Rescan even if the entry is still fresh.
+        :type  force: bool
+
+        :rtype: tuple
+
+        """
+        if not (force or self.expired(bus.port)):
+            return self.probes(bus.port)
+
+        known = self.probes(bus.port)
+        sernos = bus.rescan(known) if known else bus.scan()
+
+        facts = dict()
+        for serno in sernos:
+            if serno not in known or not all(
+                    fact in self.facts(bus.port, serno) for fact in FACTS):
+                facts[serno] = self.read_facts(bus, serno)
+
+        self.update(bus.port, sernos, bus.baudrate, facts)
+        self.save()
+        return sernos
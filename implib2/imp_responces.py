@@ -14,9 +14,9 @@ class Responce:
         self.dts = datatypes
 
     def get_long_ack(self, packet, serno):
-        responce = self.pkg.unpack(packet)
+        responce = self.pkg.unpack_head(packet)
 
-        if not serno == responce['header']['serno']:
+        if not serno == responce.serno:
             raise ResponceError("Wrong serno in responce!")
 
         return True
@@ -34,33 +34,37 @@ class Responce:
         # pylint: disable=no-self-use
         return len(packet) == 1
 
+    def get_range_crc(self, packet):
+        # pylint: disable=no-self-use
+        if not len(packet) == 1:
+            return None
+        return bytearray(packet)[0]
+
     def get_negative_ack(self, packet):
-        responce = self.pkg.unpack(packet)
-        return struct.unpack('<I', responce['data'])[0]
+        responce = self.pkg.unpack_head(packet)
+        return struct.unpack('<I', responce.data)[0]
 
     def get_parameter(self, packet, table, param):
-        data = self.pkg.unpack(packet)['data']
-        cmd = self.tbl.lookup(table, param)
-
-        fmt = self.dts.lookup(cmd['Type'] % 0x80)
-        length = len(data) // struct.calcsize(fmt.format(1))
+        data = self.pkg.unpack_head(packet).data
+        dtype = self.tbl.lookup(table, param).dtype
 
-        return struct.unpack(fmt.format(length), data)
+        length = len(data) // self.dts.size(dtype)
+        return self.dts.codec(dtype, length).unpack(data)
 
     def set_parameter(self, packet, table, serno):
-        responce = self.pkg.unpack(packet)
-        command = responce['header']['cmd']
-        cmd = self.tbl.lookup(table, 'Table')
+        responce = self.pkg.unpack_head(packet)
+        command = responce.cmd
 
-        if not command == cmd['Set']:
+        if not command == self.tbl.table(table).set:
             raise ResponceError("Wrong set command in responce!")
-        if not serno == responce['header']['serno']:
+        if not serno == responce.serno:
             raise ResponceError("Wrong serial number in responce!")
 
         return True
 
     def do_tdr_scan(self, packet):
-        data = self.pkg.unpack(packet)['data']
+        # bytes, str (py27) or memoryview (zero copy), indexed as integers
+        data = bytearray(self.pkg.unpack_head(packet).data)
         data = [data[i:i + 5] for i in range(0, len(data), 5)]
         scan = {}
 
@@ -68,30 +72,18 @@ class Responce:
             if not len(tuble) == 5:
                 raise ResponceError("Responce package has strange length!")
             scan_point = {}
-            if isinstance(tuble, str):
-                scan_point['tdr'] = struct.unpack('<B', tuble[0])[0]
-            else:
-                scan_point['tdr'] = tuble[0]
-            scan_point['time'] = struct.unpack('<f', tuble[1:5])[0]
+            scan_point['tdr'] = tuble[0]
+            scan_point['time'] = struct.unpack('<f', bytes(tuble[1:5]))[0]
             scan[point] = scan_point
 
         return scan
 
     def get_epr_page(self, packet):
-        responce = self.pkg.unpack(packet)
-        data = responce['data']
-
-        if isinstance(data, str):
-            page = list()
-            for byte in data:
-                page.append(struct.unpack('<B', byte)[0])
-        else:
-                page = list(data)
-
-        return page
+        data = self.pkg.unpack_head(packet).data
+        return list(bytearray(data))
 
     def set_epr_page(self, packet):
-        responce = self.pkg.unpack(packet)
-        if not responce['header']['cmd'] == 61:
+        responce = self.pkg.unpack_head(packet)
+        if not responce.cmd == 61:
             raise ResponceError("Responce command doesn't match!")
         return True
@@ -0,0 +1,590 @@
+# -*- coding: UTF-8 -*-
+
+import os
+import math
+import time
+import struct
+import bisect
+
+from .imp_device import DeviceError
+from .imp_packages import PackageError
+from .imp_responces import ResponceError
+from .imp_crc import MaximCRC
+from .imp_pacing import Pacer
+from .imp_helper import _prefix_cover, _load_store, _save_store
+
+# errors of a single transaction which are worth a retry
+TRANSIENT = (DeviceError, PackageError, ResponceError)
+
+
+class ScannerError(Exception):
+    pass
+
+
+def _positive(reply):
+    # a range crc of 0 is a valid reply too
+    return reply is not None and reply is not False
+
+
+def serno_crc(serno):
+    """The CRC a probe replies to a short or range ack with.
+
+    :param serno: Serial number of the probe.
+    :type  serno: int
+
+    :rtype: int
+    """
+    return MaximCRC.calc(struct.pack('<I', serno)[:-1])
+
+
+_INDEXES = dict()
+
+# the bus statistics kept by the pacer, see ScanReport
+_PACER_STATS = ('transactions', 'wait_time', 'idle_time', 'wire_time')
+
+
+def crc_index(bits):
+    """Inverse index of the serial number CRCs, mapping a CRC to all the
+    offsets `x < 2**bits` with `serno_crc(x) == crc`. The CRC is linear, so
+    for an aligned range `serno_crc(address | x)` equals
+    `serno_crc(address) ^ serno_crc(x)` and the index serves every range
+    of up to `2**bits` serial numbers.
+
+    :param bits: Size of the index as power of two.
+    :type  bits: int
+
+    :rtype: dict
+    """
+    if bits not in _INDEXES:
+        index = dict()
+        for offset in range(1 << bits):
+            index.setdefault(serno_crc(offset), list()).append(offset)
+        _INDEXES[bits] = index
+    return _INDEXES[bits]
+
+
+class ScanReport(object):
+    """The ScanReport collects the figures of a scan, to compare buses and
+    to tune the timings with data. It can be handed to :func:`Bus.scan` or
+    :class:`Scanner` to be filled::
+
+        >>> report = ScanReport()
+        >>> bus.scan(report=report)
+        (10010, 10011)
+        >>> print(report)
+
+    The range probes are counted per depth of the search tree, where depth
+    0 is the whole address space and depth 23 a pair of serial numbers.
+    The times are only summed up while the scan is running:
+
+    * :attr:`wall_time`: the time the search took.
+    * :attr:`wire_time`: the time the packages (should) spend on the wire,
+      following from the baudrate.
+    * :attr:`wait_time`: the time spent waiting for deadlines, this
+      includes waiting for the replies if the bus isn't event driven.
+    * :attr:`idle_time`: the time the bus was free but unused.
+
+    In the robust mode of the :class:`Scanner` it also holds the number of
+    repeated probes, the estimated :attr:`loss_rate` of the line and the
+    estimated probability that a probe was missed. :attr:`answer_rate`
+    holds, per found probe, the share of its short acks which got an
+    answer: 1.0 if it answered the first one, 0.5 if it took a repetition
+    and so on. It tells how reliable the line to a probe is, not how
+    likely the probe is real; a found probe did answer.
+
+    """
+    def __init__(self):
+        self.ranges = dict()
+        self.short_acks = 0
+        self.short_hits = 0
+        self.errors = dict()
+        self.retries = 0
+        self.transactions = 0
+        self.wall_time = 0.0
+        self.wait_time = 0.0
+        self.idle_time = 0.0
+        self.wire_time = 0.0
+        self.repeats = 0
+        self.loss_rate = 0.0
+        self.miss_probability = 0.0
+        self.answer_rate = dict()
+
+    def add_range(self, range_marker, hit):
+        depth = 24 - range_marker.bit_length()
+        counts = self.ranges.setdefault(depth, [0, 0])
+        counts[0 if hit else 1] += 1
+
+    def add_short(self, hit):
+        self.short_acks += 1
+        self.short_hits += bool(hit)
+
+    def add_error(self, err):
+        name = type(err).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    @property
+    def range_probes(self):
+        """Number of range probes."""
+        return sum(sum(counts) for counts in self.ranges.values())
+
+    @property
+    def positive_ratio(self):
+        """Share of the range probes somebody answered to."""
+        if not self.range_probes:
+            return 0.0
+        hits = sum(counts[0] for counts in self.ranges.values())
+        return hits / float(self.range_probes)
+
+    def __str__(self):
+        lines = ['depth  positive  negative']
+        for depth in sorted(self.ranges):
+            lines.append('{0:5d} {1:9d} {2:9d}'.format(depth, *self.ranges[depth]))
+        lines.extend([
+            'range probes: {0} ({1:.0%} positive)'.format(
+                self.range_probes, self.positive_ratio),
+            'short acks:   {0} ({1} positive)'.format(self.short_acks, self.short_hits),
+            'errors:       {0} ({1} retries)'.format(
+                sum(self.errors.values()), self.retries),
+            'repeats:      {0} (loss rate {1:.1%}, miss probability {2:.2g})'.format(
+                self.repeats, self.loss_rate, self.miss_probability),
+            'transactions: {0}'.format(self.transactions),
+            'wall time:    {0:.3f}s (wire {1:.3f}s, wait {2:.3f}s, idle {3:.3f}s)'.format(
+                self.wall_time, self.wire_time, self.wait_time, self.idle_time)])
+        return '\n'.join(lines)
+
+
+class Scanner(object):
+    """The Scanner runs the binary search of :func:`Bus.scan` without
+    recursion. The pending nodes of the search tree, pairs of range address
+    and range marker, are kept in an explicit last-in-first-out queue, so
+    the probes are queried in the very same order as by the recursive
+    search. Every node is handled on its own:
+
+    * A transient error (:exc:`DeviceError`, :exc:`PackageError` or
+      :exc:`ResponceError`) only repeats the failed node, up to `retries`
+      times.
+    * The queue and the probes found so far can be written to a checkpoint
+      file. If the scan gets interrupted, a new scanner with the same
+      checkpoint file resumes right where the old one stopped::
+
+        >>> scanner = Scanner(bus, checkpoint='scan.json')
+        >>> scanner.run()
+        (10010, 10011)
+
+    The checkpoint is written every `interval` nodes and whenever the scan
+    is aborted by an exception. It is removed once the scan completed.
+
+    The search starts from the minimal set of aligned ranges covering
+    exactly the range (or the list of `ranges`) to scan, so no range probe
+    is spent on serial numbers outside. A node with the range marker `0`
+    stands for the single serial number given as range address, it is
+    queried by :func:`Bus.probe_module_short`.
+
+    If the serial numbers of the `known` probes are given, the scan does not
+    start from the whole range. Each known probe is confirmed by a single
+    :func:`Bus.probe_module_short` and only the subtrees of the address
+    space which hold no known probe are range-searched for new probes.
+    With `discover` set to `False` these subtrees are skipped too, leaving
+    exactly one transaction per known probe.
+
+    With `use_crc` the reply byte of the range probes of small subtrees (up
+    to `2**crc_bits` serial numbers) is used as well. If a single probe
+    answered, the byte is the CRC of its serial number and the candidates
+    with that CRC are looked up in :func:`crc_index` and probed directly.
+    As the byte could as well be the collision of several replies, the
+    rest of the subtree is searched afterwards, but in one range probe per
+    aligned block instead of descending the subtree level by level. If no
+    candidate answers, the subtree is descended as usual.
+
+    On noisy lines a single lost reply makes a range probe negative and so
+    prunes a whole subtree. With `robust` set, every negative probe is
+    repeated until it turns positive or enough negative votes are in. The
+    number of repetitions adapts to the loss rate observed so far (the
+    share of probes of occupied nodes which needed a repetition), so the
+    chance to miss a probe stays below `target` per node. Positive replies
+    are never repeated. The share of answered short acks of each found
+    probe is kept in :attr:`ScanReport.answer_rate`.
+
+    :param bus: The bus to scan.
+    :type  bus: :class:`Bus`
+
+    :param minserial: Start of the range to search (usually: 0).
+    :type  minserial: int
+
+    :param maxserial: End of the range to search (usually: 16777215).
+    :type  maxserial: int
+
+    :param ranges: List of `(minserial, maxserial)` pairs to search instead
+                   of the single range above.
+    :type  ranges: iterable
+
+    :param retries: Number of retries per node. Defaults to 3.
+    :type  retries: int
+
+    :param checkpoint: The json file to keep the progress in.
+    :type  checkpoint: string
+
+    :param interval: Number of nodes between two checkpoints.
+    :type  interval: int
+
+    :param known: Serial numbers of the probes found by an earlier scan.
+    :type  known: iterable
+
+    :param discover: Search the rest of the range for new probes, only used
+                     together with `known`. Defaults to `True`.
+    :type  discover: bool
+
+    :param use_crc: Use the reply byte of the range probes, see above.
+                    Defaults to `False`.
+    :type  use_crc: bool
+
+    :param crc_bits: Size of the subtrees to use the reply byte for, as
+                     power of two. Defaults to 8.
+    :type  crc_bits: int
+
+    :param report: The report to fill, by default a new one is created and
+                   kept as :attr:`report`.
+    :type  report: :class:`ScanReport`
+
+    :param robust: Repeat negative probes, see above. Defaults to `False`.
+    :type  robust: bool
+
+    :param target: Accepted chance to miss an occupied node in the robust
+                   mode. Defaults to 0.001.
+    :type  target: float
+
+    :param max_repeats: Maximum number of repetitions of a probe in the
+                        robust mode. Defaults to 5.
+    :type  max_repeats: int
+
+    """
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(self, bus, minserial=0, maxserial=16777215, retries=3,
+                 checkpoint=None, interval=50, known=None, discover=True,
+                 use_crc=False, crc_bits=8, ranges=None, report=None,
+                 robust=False, target=0.001, max_repeats=5):
+        self.bus = bus
+        self.ranges = self._merge(ranges if ranges is not None else [(minserial, maxserial)])
+        self.minserial = self.ranges[0][0] if self.ranges else minserial
+        self.maxserial = self.ranges[-1][1] if self.ranges else maxserial
+        self.retries = retries
+        self.checkpoint = checkpoint
+        self.interval = interval
+        self.known = None
+        self.discover = discover
+        self.use_crc = use_crc
+        self.crc_bits = crc_bits
+        self.robust = robust
+        self.target = target
+        self.max_repeats = max_repeats
+
+        # probes of occupied nodes and how many of them got lost
+        self.samples = 0
+        self.losses = 0
+
+        if known is not None:
+            self.known = sorted(x for x in set(known) if self._contains(x))
+
+        self.queue = list()
+        self.found = list()
+        self.retried = 0
+        self.report = report if report is not None else ScanReport()
+
+        if not (checkpoint and self.load(checkpoint)):
+            self.reset()
+
+    @staticmethod
+    def _merge(ranges):
+        merged = list()
+        for low, high in sorted(ranges):
+            if low > high:
+                continue
+            if merged and low <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(high, merged[-1][1]))
+            else:
+                merged.append((low, high))
+        return merged
+
+    def _contains(self, serno):
+        pos = bisect.bisect_right(self.ranges, (serno, 0x1000000)) - 1
+        return pos >= 0 and self.ranges[pos][0] <= serno <= self.ranges[pos][1]
+
+    def reset(self):
+        """Starts over with the ranges to search as the pending nodes, or
+        with the known probes and the subtrees around them."""
+        roots = [node for low, high in self.ranges for node in _prefix_cover(low, high)]
+
+        if self.known is None:
+            self.queue = roots
+        else:
+            self.queue = list()
+            if self.discover:
+                for root in roots:
+                    self.queue.extend(self._cover(root, self.known))
+            self.queue.extend((serno, 0) for serno in reversed(self.known))
+        self.found = list()
+
+    @staticmethod
+    def _holds(sernos, low, high):
+        pos = bisect.bisect_left(sernos, low)
+        return pos < len(sernos) and sernos[pos] <= high
+
+    def _cover(self, root, sernos):
+        # the nodes spanning the range except the given sorted serial
+        # numbers, ordered to be searched from high to low like a full scan.
+        cover = list()
+        stack = [root]
+        while stack:
+            range_address, range_marker = stack.pop()
+            low = range_address
+            high = range_address + max(2 * range_marker, 1) - 1
+
+            if not self._holds(sernos, low, high):
+                cover.append((range_address, range_marker))
+            elif range_marker == 1:
+                for serno in (high, low):
+                    if serno not in sernos:
+                        cover.append((serno, 0))
+            elif range_marker > 1:
+                stack.append((range_address, range_marker >> 1))
+                stack.append((range_address + range_marker, range_marker >> 1))
+
+        cover.reverse()
+        return cover
+
+    def load(self, filename):
+        """Restores the progress from a checkpoint file. Checkpoints of
+        another range are ignored.
+
+        :param filename: The checkpoint file.
+        :type  filename: string
+
+        :rtype: :const:`bool`, `True` if the checkpoint was restored.
+
+        """
+        state = _load_store(filename)
+        if not state.get('ranges') == [list(rng) for rng in self.ranges]:
+            return False
+
+        self.queue = [tuple(node) for node in state['queue']]
+        self.found = list(state['found'])
+        return True
+
+    def save(self, filename):
+        """Writes the progress into a checkpoint file.
+
+        :param filename: The checkpoint file.
+        :type  filename: string
+
+        """
+        _save_store(filename, {
+            'ranges': [list(rng) for rng in self.ranges],
+            'queue': [list(node) for node in self.queue],
+            'found': self.found})
+
+    @property
+    def pending(self):
+        """Number of nodes still to search."""
+        return len(self.queue)
+
+    def _retry(self, func, *args):
+        for attempt in range(self.retries + 1):
+            try:
+                return func(*args)
+            except TRANSIENT as err:
+                self.report.add_error(err)
+                if attempt == self.retries:
+                    raise
+                self.retried += 1
+                self.report.retries += 1
+
+    def _add(self, serno):
+        if serno not in self.found:
+            self.found.append(serno)
+
+    @property
+    def loss_rate(self):
+        """The estimated share of lost replies, starting from 6%."""
+        return (self.losses + 0.3) / (self.samples + 5.0)
+
+    def _repeats(self):
+        if not self.robust:
+            return 0
+        votes = math.ceil(math.log(self.target) / math.log(self.loss_rate))
+        return int(min(self.max_repeats, max(0, votes - 1)))
+
+    def _vote(self, probe, address, record):
+        reply = self._retry(probe, address)
+        record(_positive(reply))
+        attempts = 1
+
+        if not _positive(reply):
+            for _ in range(self._repeats()):
+                reply = self._retry(probe, address)
+                record(_positive(reply))
+                attempts += 1
+                self.report.repeats += 1
+                if _positive(reply):
+                    break
+
+        if _positive(reply):
+            self.samples += attempts
+            self.losses += attempts - 1
+        elif self.robust:
+            self.report.miss_probability = min(
+                1.0, self.report.miss_probability + self.loss_rate ** attempts)
+
+        self.report.loss_rate = self.loss_rate
+        return reply, attempts
+
+    def _short(self, serno):
+        hit, attempts = self._vote(self.bus.probe_module_short, serno, self.report.add_short)
+        if hit:
+            self._add(serno)
+            self.report.answer_rate[serno] = 1.0 / attempts
+        return hit
+
+    def _range(self, probe, range_address, range_marker):
+        def record(hit):
+            self.report.add_range(range_marker, hit)
+
+        return self._vote(probe, range_address + range_marker, record)[0]
+
+    def _visit(self, range_address, range_marker):
+        if range_marker == 0:
+            self._short(range_address)
+            return []
+
+        bcast_address = range_address + range_marker
+
+        if self.use_crc and 1 < range_marker and 2 * range_marker <= 1 << self.crc_bits:
+            return self._visit_crc(range_address, range_marker)
+
+        if not self._range(self.bus.probe_range, range_address, range_marker):
+            return []
+
+        if range_marker == 1:
+            self._short(bcast_address)
+            self._short(bcast_address - 1)
+            return []
+
+        # divide-and-conquer, the higher half is searched first.
+        return [(range_address, range_marker >> 1),
+                (bcast_address, range_marker >> 1)]
+
+    def _visit_crc(self, range_address, range_marker):
+        reply = self._range(self.bus.probe_range_crc, range_address, range_marker)
+        if reply is None:
+            return []
+
+        target = reply ^ serno_crc(range_address)
+        size = 2 * range_marker
+
+        confirmed = list()
+        for offset in crc_index(self.crc_bits).get(target, ()):
+            serno = range_address | offset
+            if offset < size and self._short(serno):
+                confirmed.append(serno)
+
+        if not confirmed:
+            return [(range_address, range_marker >> 1),
+                    (range_address + range_marker, range_marker >> 1)]
+
+        # somebody else may have answered as well, check the rest.
+        return self._cover((range_address, range_marker), sorted(confirmed))
+
+    def step(self):
+        """Searches the next pending node. The node only leaves the queue
+        if it was searched successfully.
+
+        :rtype: :const:`bool`, `True` if there are nodes left.
+
+        """
+        pacer = getattr(self.bus, 'pacer', None)
+        if not isinstance(pacer, Pacer):
+            pacer = None
+
+        before = [getattr(pacer, name) for name in _PACER_STATS] if pacer else None
+        tic = time.time()
+        try:
+            node = self.queue[-1]
+            children = self._visit(*node)
+            self.queue.pop()
+            self.queue.extend(children)
+        finally:
+            self.report.wall_time += time.time() - tic
+            if pacer:
+                for name, value in zip(_PACER_STATS, before):
+                    setattr(self.report, name,
+                            getattr(self.report, name) + getattr(pacer, name) - value)
+
+        return bool(self.queue)
+
+    def __iter__(self):
+        """Searches all the pending nodes and yields the serial number of
+        every probe the moment it is confirmed. Probes restored from a
+        checkpoint are yielded first. If the iteration is stopped early,
+        the progress is kept in the checkpoint file::
+
+            >>> for serno in Scanner(bus):
+            ...     print(Module(bus, serno).get_hw_version())
+
+        :raises ScannerError: If a node still fails after all the retries.
+
+        """
+        steps = 0
+        yielded = 0
+        try:
+            while True:
+                while yielded < len(self.found):
+                    serno = self.found[yielded]
+                    yielded += 1
+                    if self._contains(serno):
+                        yield serno
+
+                if not self.queue:
+                    break
+
+                self.step()
+                steps += 1
+                if self.checkpoint and not steps % self.interval:
+                    self.save(self.checkpoint)
+        except TRANSIENT as err:
+            if self.checkpoint:
+                self.save(self.checkpoint)
+            raise ScannerError("Scan aborted at {0}: {1}".format(self.queue[-1], err))
+        except BaseException:
+            if self.checkpoint:
+                self.save(self.checkpoint)
+            raise
+
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    def run(self, callback=None):
+        """Searches all the pending nodes.
+
+        :param callback: Called with the serial number of every probe the
+                         moment it is confirmed.
+        :type  callback: callable
+
+        :raises ScannerError: If a node still fails after all the retries.
+
+        :rtype: tuple
+
+        """
+        for serno in self:
+            if callback is not None:
+                callback(serno)
+
+        return self.results()
+
+    def results(self):
+        """The probes found so far within the searched ranges.
+
+        :rtype: tuple
+
+        """
+        sernos = [x for x in self.found if self._contains(x)]
+        sernos.sort()
+        return tuple(sernos)
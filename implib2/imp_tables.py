@@ -1,23 +1,150 @@
 # -*- coding: UTF-8 -*-
 
 from .imp_helper import _load_json
+from .imp_datatypes import DataTypes
+
+try:
+    from collections.abc import Mapping  # py33
+except ImportError:
+    from collections import Mapping      # py27
+
+try:
+    from types import MappingProxyType as _frozen  # py33
+except ImportError:
+    _frozen = dict                                 # py27
 
 
 class TablesError(Exception):
     pass
 
 
+class _Record(Mapping):
+    # an immutable record, readable by attribute and, like the rows of the
+    # json file, by key.
+    _keys = dict()
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{0} is read-only!".format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("{0} is read-only!".format(type(self).__name__))
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self._keys[key])
+        except KeyError:
+            raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return "{0}({1})".format(type(self).__name__, self.name)
+
+
+class Table(_Record):
+    """A compiled table: its :attr:`name`, the command codes :attr:`get`
+    and :attr:`set` and its parameters, indexed by name in :attr:`params`
+    and by number in :attr:`numbers`."""
+    _keys = {'Get': 'get', 'Set': 'set'}
+
+
+class Param(_Record):
+    """A compiled parameter of a table: its :attr:`name`, number :attr:`no`,
+    :attr:`length` in bytes, data type :attr:`dtype` (without the array
+    flag of :attr:`type`), the :attr:`codec` of its full length and whether
+    it's :attr:`writable`. The command codes :attr:`get` and :attr:`set`
+    are taken from its table."""
+    _keys = {'No': 'no', 'Type': 'type', 'Status': 'status', 'Length': 'length',
+             'Get': 'get', 'Set': 'set'}
+
+
 class Tables:
+    """The parameter tables of the probes, compiled once from the json file
+    into immutable :class:`Table` and :class:`Param` records. Parameters
+    are looked up by name or, as they are sent on the bus, by number::
+
+        >>> tbl = Tables()
+        >>> param = tbl.lookup('MEASURE_PARAMETER_TABLE', 'Moist')
+        >>> param.no, param.get, param['Get']
+        (10, 22, 22)
+        >>> tbl.by_number('MEASURE_PARAMETER_TABLE', 10).name
+        'Moist'
+        >>> tbl.commands[22].name
+        'MEASURE_PARAMETER_TABLE'
 
+    Only the last one of two parameters with the same number is found by
+    number.
+    """
     def __init__(self, filename='imp_tables.json'):
         self._tables = _load_json(filename)
+        dts = DataTypes()
+
+        schema = dict()
+        commands = dict()
+        for name, rows in self._tables.items():
+            get, set_ = rows['Table']['Get'], rows['Table']['Set']
+
+            params = dict()
+            numbers = dict()
+            for param, row in rows.items():
+                if param == 'Table':
+                    continue
+                dtype = row['Type'] % 0x80
+                params[param] = numbers[row['No']] = Param(
+                    table=name, name=param, no=row['No'], type=row['Type'],
+                    dtype=dtype, status=row['Status'], length=row['Length'],
+                    writable='W' in row['Status'], get=get, set=set_,
+                    codec=dts.codec(dtype, max(1, row['Length'] // dts.size(dtype))))
+
+            schema[name] = commands[get] = commands[set_] = Table(
+                name=name, get=get, set=set_,
+                params=_frozen(params), numbers=_frozen(numbers))
+
+        self.schema = _frozen(schema)
+        self.commands = _frozen(commands)
+
+    def table(self, table):
+        """The compiled table of the given name.
+
+        :raises TablesError: If the table is unknown.
+
+        :rtype: :class:`Table`
+        """
+        try:
+            return self.schema[table]
+        except KeyError as err:
+            raise TablesError("Unknown param or table: {}!".format(err))
 
     def lookup(self, table, param):
+        """The compiled parameter of a table. The parameter `Table` gives
+        the table itself, for its command codes.
+
+        :raises TablesError: If the table or the parameter is unknown.
+
+        :rtype: :class:`Param`
+        """
         try:
-            cmd = self._tables[table][param]
-            cmd[u'Set'] = self._tables[table]["Table"]["Set"]
-            cmd[u'Get'] = self._tables[table]["Table"]["Get"]
+            tbl = self.schema[table]
+            return tbl if param == 'Table' else tbl.params[param]
         except KeyError as err:
             raise TablesError("Unknown param or table: {}!".format(err))
 
-        return cmd
+    def by_number(self, table, number):
+        """The compiled parameter of a table by its number.
+
+        :raises TablesError: If the table or the number is unknown.
+
+        :rtype: :class:`Param`
+        """
+        try:
+            return self.schema[table].numbers[number]
+        except KeyError as err:
+            raise TablesError("Unknown param or table: {}!".format(err))
@@ -0,0 +1,5 @@
+# -*- coding: UTF-8 -*-
+#
+# URL format: impemu://<name> or impemu://?probes=<serno>[,<serno>...]
+
+from ..imp_emulator import EmulatorSerial as Serial  # noqa
@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+
+
+class FakeClock(object):
+    # a clock for the pacer, which only moves on if it's read or slept on
+
+    def __init__(self, tick=0.000001):
+        self.now = 100.0
+        self.tick = tick
+        self.sleeps = list()
+
+    def __call__(self):
+        # every reading of the clock costs a little time
+        self.now += self.tick
+        return self.now
+
+    def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+class BlockingSerial(object):
+    # wraps the serial port of the emulator, a read which misses bytes
+    # blocks for the serial timeout like a real port.
+
+    def __init__(self, ser, clock):
+        self._ser = ser
+        self._clock = clock
+        self.timeout = ser.timeout
+
+    def __getattr__(self, name):
+        return getattr(self._ser, name)
+
+    def read(self, size=1):
+        data = self._ser.read(size)
+        if len(data) < size:
+            self._clock.sleep(self.timeout)
+        return data
@@ -0,0 +1,158 @@
+# -*- coding: UTF-8 -*-
+
+import os
+import sys
+
+from binascii import a2b_hex as a2b
+
+import pytest
+
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+if sys.version_info < (3, 5) or not hasattr(os, 'openpty'):
+    pytest.skip("asyncio transport needs python 3.5+ on POSIX", allow_module_level=True)
+
+import asyncio  # noqa
+
+from implib2.imp_asyncio import AsyncBus, AsyncModule  # noqa
+from implib2.imp_device import DeviceError  # noqa
+
+
+def done(loop, result):
+    future = loop.create_future()
+    future.set_result(result)
+    return future
+
+
+class TestAsyncBus:
+
+    def setup(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.master, slave = os.openpty()
+        self.bus = AsyncBus(os.ttyname(slave), loop=self.loop)
+        self.slave = slave
+        self.run(self.bus.dev.open_device())
+
+    def teardown(self):
+        self.run(self.bus.dev.close_device())
+        os.close(self.master)
+        os.close(self.slave)
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_get(self):
+        os.write(self.master, a2b('000a051a7900181a79000042'))
+        value = self.run(self.bus.get(31002, 'SYSTEM_PARAMETER_TABLE', 'SerialNum'))
+        assert value == (31002,)
+        assert os.read(self.master, 64) == a2b('fd0a031a7900290100c4')
+
+    def test_set(self):
+        os.write(self.master, a2b('0011001a790095'))
+        assert self.run(self.bus.set(31002, 'PROBE_CONFIGURATION_PARAMETER_TABLE',
+                                     'DeviceSerialNum', [31003]))
+        assert os.read(self.master, 64) == a2b('fd11071a79002b0c001b790000b0')
+
+    def test_get_eeprom_page(self):
+        os.write(self.master, a2b('003c0b1a790015112fc44e3702f3e7fb3dc5'))
+        page = [17, 47, 196, 78, 55, 2, 243, 231, 251, 61]
+        assert self.run(self.bus.get_eeprom_page(30001, 0)) == page
+
+    def test_probe_module_short(self):
+        os.write(self.master, a2b('24'))
+        assert self.run(self.bus.probe_module_short(31002))
+
+    def test_probe_module_short_Timeout(self):
+        assert not self.run(self.bus.probe_module_short(31002))
+
+    def test_probe_range(self):
+        os.write(self.master, a2b('ff'))
+        assert self.run(self.bus.probe_range(0b111100000000000000000000))
+
+    def test_probe_range_AndFindNothing(self):
+        assert not self.run(self.bus.probe_range(0b111100000000000000000000))
+
+    def test_lock_OnOtherLoop(self):
+        loop = asyncio.new_event_loop()
+        master, slave = os.openpty()
+        try:
+            bus = AsyncBus(os.ttyname(slave), loop=loop)
+            assert bus._lock is None
+            loop.run_until_complete(bus.dev.open_device())
+            try:
+                tasks = [asyncio.ensure_future(bus.probe_module_short(serno), loop=loop)
+                         for serno in (31002, 31003)]
+                assert loop.run_until_complete(asyncio.gather(*tasks)) == [False, False]
+            finally:
+                loop.run_until_complete(bus.dev.close_device())
+        finally:
+            os.close(master)
+            os.close(slave)
+            loop.close()
+
+    def test_read_pkg_PortGone(self):
+        os.close(self.master)
+        self.master = os.open(os.devnull, os.O_RDONLY)
+        with pytest.raises(DeviceError):
+            self.run(self.bus.dev.read_pkg(timeout=1.0))
+        assert not self.bus.dev.is_open
+        assert not self.loop.remove_reader(self.bus.dev.ser.fileno())
+        self.bus.dev.ser.close()
+
+    def test_get_Timeout(self):
+        with pytest.raises(DeviceError):
+            self.run(self.bus.get(31002, 'SYSTEM_PARAMETER_TABLE', 'SerialNum'))
+
+    def test_scan(self):
+        probe = 33211
+
+        def check_range(bcast):
+            serno = probe
+            while not bcast & 1:
+                bcast = bcast >> 1
+                serno = serno >> 1
+            return done(self.loop, (bcast >> 1) == (serno >> 1))
+
+        def check_serno(serno):
+            return done(self.loop, serno == probe)
+
+        self.bus.probe_range = check_range
+        self.bus.probe_module_short = check_serno
+
+        assert self.run(self.bus.scan(33000, 34000)) == (probe,)
+
+
+class TestAsyncModule:
+
+    def setup(self):
+        self.loop = asyncio.new_event_loop()
+        self.bus = MagicMock()
+        self.mod = AsyncModule(self.bus, 31002)
+
+    def teardown(self):
+        self.loop.close()
+
+    def test_get_moisture(self, monkeypatch):
+        answers = {
+            'Event': [(0x80,)],
+            'MeasMode': [(0,)],
+            'StartMeasure': [(0,), (1,), (0,)],
+            'Moist': [(12.5,)]}
+
+        def get(serno, table, param):
+            return done(self.loop, answers[param].pop(0))
+
+        def set(serno, table, param, value):
+            return done(self.loop, True)
+
+        self.bus.get = get
+        self.bus.set = set
+
+        monkeypatch.setattr(asyncio, 'sleep', lambda delay: done(self.loop, None))
+        assert self.loop.run_until_complete(self.mod.get_moisture()) == 12.5
@@ -11,7 +11,7 @@ except ImportError:
 from implib2.imp_bus import Bus, BusError
 from implib2.imp_device import Device, DeviceError  # noqa
 from implib2.imp_commands import Command            # noqa
-from implib2.imp_responces import Responce          # noqa
+from implib2.imp_responces import Responce, ResponceError  # noqa
 
 
 class TestBus:
@@ -41,6 +41,22 @@ class TestBus:
         self.patcher2.stop()
         self.patcher3.stop()
 
+    def test___init___WithDevice(self):
+        device = MagicMock()
+        assert Bus(device).dev is device
+
+    def test__timeout(self):
+        # 8O2 framing: 12 bits per byte
+        assert self.bus._timeout(10, 7) == pytest.approx(17 * 12 / 9600.0 + 0.1)
+        self.bus.baudrate = 1200
+        assert self.bus._timeout(10, 7) == pytest.approx(17 * 12 / 1200.0 + 0.1)
+        self.bus.trans_wait = 0.070
+        assert self.bus._timeout(10, 1) == pytest.approx(11 * (0.01 + 0.070) + 0.1)
+
+    def test__reply_len(self):
+        assert self.bus._reply_len('SYSTEM_PARAMETER_TABLE', 'SerialNum') == 12
+        assert self.bus._reply_len('SYSTEM_PARAMETER_TABLE', 'ModuleName') == 24
+
     def test_wakeup(self):
         address = 16777215
         table = 'ACTION_PARAMETER_TABLE'
@@ -97,6 +113,7 @@ class TestBus:
         self.dev.write_pkg.return_value = True
 
         self.bus.sync(baudrate=baudrate)
+        assert self.bus.baudrate == baudrate
         assert self.bus.bus_synced
         assert self.manager.mock_calls == expected_calls
 
@@ -104,6 +121,63 @@ class TestBus:
         with pytest.raises(BusError, message="Unknown baudrate!"):
             self.bus.sync(baudrate=6666)
 
+    def test_fast_sync(self):
+        address = 16777215
+        table = 'SYSTEM_PARAMETER_TABLE'
+        param = 'Baudrate'
+        baudrate = 9600
+        value = baudrate // 100
+        ad_param = 0
+        package = a2b('fd0b05ffffffaf0400600054')
+
+        expected_calls = [call.cmd.set_parameter(address, table, param, [value], ad_param)]
+        for rate in (1200, 2400, 4800, 9600):
+            expected_calls += [
+                call.dev.set_baudrate(rate),
+                call.dev.write_pkg(package),
+                call.dev.drain(),
+            ]
+        expected_calls.append(call.dev.set_baudrate(baudrate))
+
+        self.cmd.set_parameter.return_value = package
+        self.dev.write_pkg.return_value = True
+
+        with patch('implib2.imp_bus.time.sleep') as sleep:
+            assert self.bus.fast_sync(baudrate=baudrate)
+        assert self.bus.bus_synced
+        assert self.manager.mock_calls == expected_calls
+        assert sleep.call_args_list == [call(self.bus.sync_wait)] * 4
+        assert self.bus.sync_wait >= 0.500
+
+    def test_fast_sync_ShorterWait(self):
+        with patch('implib2.imp_bus.time.sleep') as sleep:
+            assert self.bus.fast_sync(baudrate=9600, sync_wait=0.250)
+        assert sleep.call_args_list == [call(0.250)] * 4
+
+    def test_fast_sync_VerifyFirst(self):
+        serno = 31002
+        self.bus.probe_module_long = MagicMock()
+        self.bus.probe_module_long.return_value = True
+
+        assert self.bus.fast_sync(baudrate=4800, serno=serno)
+        assert self.bus.bus_synced
+        self.bus.probe_module_long.assert_called_once_with(serno)
+        assert self.manager.mock_calls == [call.dev.set_baudrate(4800)]
+        assert self.bus.baudrate == 4800
+
+    def test_fast_sync_VerifyFirstFails(self):
+        serno = 31002
+        self.bus.probe_module_long = MagicMock()
+        self.bus.probe_module_long.side_effect = ResponceError("Wrong serno in responce!")
+
+        with patch('implib2.imp_bus.time.sleep'):
+            assert self.bus.fast_sync(baudrate=9600, serno=serno)
+        assert self.dev.write_pkg.call_count == 4
+
+    def test_fast_sync_WithWrongBaudrate(self):
+        with pytest.raises(BusError, message="Unknown baudrate!"):
+            self.bus.fast_sync(baudrate=6666)
+
     def test_scan_AndFindEverything(self):
         minserial = 0b0001  # 01
         maxserial = 0b1010  # 10
@@ -114,30 +188,16 @@ class TestBus:
         self.bus.probe_module_short = MagicMock()
         self.bus.probe_module_short.return_value = True
 
+        # 1-10 is covered by: 1, 2-3, 4-7, 8-9, 10
         range_list = [
-            call(0b1000),  # 08
-            call(0b1100),  # 12
-            call(0b1110),  # 14
-            call(0b1111),  # 15
-            call(0b1101),  # 13
-            call(0b1010),  # 10
-            call(0b1011),  # 11
-            call(0b1001),  # 09
-            call(0b0100),  # 04
-            call(0b0110),  # 06
-            call(0b0111),  # 07
-            call(0b0101),  # 05
-            call(0b0010),  # 02
-            call(0b0011),  # 03
-            call(0b0001)   # 01
+            call(0b1001),  # 09 (8-9)
+            call(0b0110),  # 06 (4-7)
+            call(0b0111),  # 07 (6-7)
+            call(0b0101),  # 05 (4-5)
+            call(0b0011)   # 03 (2-3)
         ]
 
         modules_list = [
-            call(0b1111),  # 15
-            call(0b1110),  # 14
-            call(0b1101),  # 13
-            call(0b1100),  # 12
-            call(0b1011),  # 11
             call(0b1010),  # 10
             call(0b1001),  # 09
             call(0b1000),  # 08
@@ -147,8 +207,7 @@ class TestBus:
             call(0b0100),  # 04
             call(0b0011),  # 03
             call(0b0010),  # 02
-            call(0b0001),  # 01
-            call(0b0000)   # 00
+            call(0b0001)   # 01
         ]
 
         results = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, )
@@ -164,8 +223,30 @@ class TestBus:
         self.bus.probe_range = MagicMock()
         self.bus.probe_range.return_value = False
 
+        self.bus.probe_module_short = MagicMock()
+        self.bus.probe_module_short.return_value = False
+
         assert self.bus.scan(minserial, maxserial) is tuple()
-        self.bus.probe_range.assert_called_once_with(0b1000)
+        assert self.bus.probe_range.call_args_list == [call(0b1001), call(0b0110), call(0b0011)]
+        assert self.bus.probe_module_short.call_args_list == [call(0b1010), call(0b0001)]
+
+    def test_scan_AcrossPrefixBoundary(self):
+        self.bus.probe_range = MagicMock()
+        self.bus.probe_module_short = MagicMock()
+        self.bus.probe_module_short.side_effect = lambda serno: serno == 0x800000
+
+        assert self.bus.scan(0x7fffff, 0x800000) == (0x800000,)
+        assert not self.bus.probe_range.called
+        assert self.bus.probe_module_short.call_args_list == [call(0x800000), call(0x7fffff)]
+
+    def test_scan_WithRanges(self):
+        self.bus.probe_range = MagicMock(return_value=False)
+        self.bus.probe_module_short = MagicMock(return_value=False)
+
+        assert self.bus.scan(ranges=[(16, 31), (64, 127), (20, 40)]) == ()
+        # 16-40 is covered by 16-31, 32-39, 40 and 64-127 by itself
+        assert self.bus.probe_range.call_args_list == [call(96), call(36), call(24)]
+        assert self.bus.probe_module_short.call_args_list == [call(40)]
 
     @pytest.mark.parametrize("probe", range(33000, 34001))
     def test_scan_AndFindOne(self, probe):
@@ -342,6 +423,26 @@ class TestBus:
         assert not self.bus.probe_range(broadcast)
         assert self.manager.mock_calls == expected_calls
 
+    def test_probe_range_crc(self):
+        broadcast = 0b111100000000000000000000
+        package = a2b('fd06000000f0d0')
+        bytes_recv = a2b('24')
+
+        expected_calls = [
+            call.cmd.get_range_ack(broadcast),
+            call.dev.write_pkg(package),
+            call.dev.read(),
+            call.res.get_range_crc(bytes_recv)
+        ]
+
+        self.cmd.get_range_ack.return_value = package
+        self.dev.write_pkg.return_value = True
+        self.dev.read.return_value = bytes_recv
+        self.res.get_range_crc.return_value = 0x24
+
+        assert self.bus.probe_range_crc(broadcast) == 0x24
+        assert self.manager.mock_calls == expected_calls
+
     def test_get(self):
         serno = 31002
         table = 'SYSTEM_PARAMETER_TABLE'
@@ -431,3 +532,173 @@ class TestBus:
 
         assert self.bus.set_eeprom_page(serno, page_nr, page)
         assert self.manager.mock_calls == expected_calls
+
+    def test_get_EventDriven(self):
+        serno = 31002
+        table = 'SYSTEM_PARAMETER_TABLE'
+        param = 'SerialNum'
+        package = a2b('fd0a031a7900290100c4')
+        bytes_recv = a2b('000a051a7900181a79000042')
+        timeout = self.bus._timeout(len(package), len(bytes_recv))
+
+        expected_calls = [
+            call.cmd.get_parameter(serno, table, param),
+            call.dev.write_pkg(package),
+            call.dev.read_pkg(timeout=timeout),
+            call.res.get_parameter(bytes_recv, table, param)
+        ]
+
+        self.cmd.get_parameter.return_value = package
+        self.dev.write_pkg.return_value = True
+        self.dev.read_pkg.return_value = bytes_recv
+        self.res.get_parameter.return_value = (31002,)
+
+        self.bus.event_driven = True
+        self.bus.pacer = MagicMock()
+        assert self.bus.get(serno, table, param) == (serno,)
+        assert self.manager.mock_calls == expected_calls
+        assert self.bus.pacer.method_calls == [call.start(), call.finish(self.bus.cycle_wait)]
+
+    def test_probe_module_short_EventDriven(self):
+        serno = 31002
+        package = a2b('fd04001a790003')
+        bytes_recv = a2b('24')
+        timeout = self.bus._timeout(len(package), len(bytes_recv))
+
+        expected_calls = [
+            call.cmd.get_short_ack(serno),
+            call.dev.write_pkg(package),
+            call.dev.read_bytes(1, timeout=timeout),
+            call.res.get_short_ack(bytes_recv, serno)
+        ]
+
+        self.cmd.get_short_ack.return_value = package
+        self.dev.write_pkg.return_value = True
+        self.dev.read_bytes.return_value = bytes_recv
+        self.res.get_short_ack.return_value = True
+
+        self.bus.event_driven = True
+        assert self.bus.probe_module_short(serno)
+        assert self.manager.mock_calls == expected_calls
+
+    def test_probe_range_EventDriven(self):
+        broadcast = 0b111100000000000000000000
+        package = a2b('fd06000000f0d0')
+        bytes_recv = a2b('ff')
+        timeout = self.bus._timeout(len(package), len(bytes_recv))
+
+        expected_calls = [
+            call.cmd.get_range_ack(broadcast),
+            call.dev.write_pkg(package),
+            call.dev.read(timeout=timeout, linger=self.bus.range_wait),
+            call.res.get_range_ack(bytes_recv)
+        ]
+
+        self.cmd.get_range_ack.return_value = package
+        self.dev.write_pkg.return_value = True
+        self.dev.read.return_value = bytes_recv
+        self.res.get_range_ack.return_value = True
+
+        self.bus.event_driven = True
+        assert self.bus.probe_range(broadcast)
+        assert self.manager.mock_calls == expected_calls
+
+    def test_probe_module_short_Paced(self):
+        self.cmd.get_short_ack.return_value = a2b('fd04001a790003')
+        self.dev.write_pkg.return_value = True
+        self.dev.read_bytes.return_value = a2b('24')
+        self.bus.pacer = MagicMock()
+        self.bus.pacer.start.return_value = 0.0
+
+        self.bus.probe_module_short(31002)
+        assert self.bus.pacer.method_calls == [
+            call.start(),
+            call.wait(self.bus._timeout(7, 1)),
+            call.finish(self.bus.cycle_wait)]
+
+    def test_calibrate(self):
+        # the probes only answer reliably with trans_wait >= 1ms
+        self.bus.trans_wait = 0.002
+        self.bus.cycle_wait = 0.001
+        self.bus.range_wait = 0.020
+        self.bus.scan = MagicMock(
+            side_effect=lambda low, high: (10010, 10011) if self.bus.trans_wait >= 0.001 else ())
+        self.bus.probe_module_long = MagicMock(return_value=True)
+
+        timings = self.bus.calibrate([10011, 10010], rounds=2, steps=4)
+        assert timings == {'trans_wait': 0.001, 'range_wait': 0.0, 'cycle_wait': 0.0}
+        assert self.bus.trans_wait == 0.001
+        assert self.bus.scan.call_args == call(10010, 10011)
+
+    def test_calibrate_ScansForProbes(self):
+        self.bus.scan = MagicMock(return_value=(10010,))
+        self.bus.probe_module_long = MagicMock(return_value=True)
+        self.bus.calibrate(rounds=1)
+        assert self.bus.scan.call_args_list[0] == call()
+
+    def test_calibrate_ButNothingFound(self):
+        self.bus.scan = MagicMock(return_value=())
+        with pytest.raises(BusError, match='No probes found'):
+            self.bus.calibrate()
+
+    def test_calibrate_ButFailsAlready(self):
+        self.bus.scan = MagicMock(return_value=(10010,))
+        self.bus.probe_module_long = MagicMock(side_effect=DeviceError('Timeout!'))
+        with pytest.raises(BusError, match='current timings'):
+            self.bus.calibrate()
+
+    def test_save_and_load_timings(self, tmpdir):
+        filename = str(tmpdir.join('timings.json'))
+        self.bus.port = '/dev/ttyUSB0'
+        self.bus.trans_wait = 0.0005
+        self.bus.save_timings(filename)
+
+        bus = Bus('/dev/ttyUSB1', timing_file=filename)
+        assert bus.trans_wait == 0.0
+        bus.port = '/dev/ttyUSB0'
+        assert bus.load_timings(filename)
+        assert bus.trans_wait == 0.0005
+        assert bus.cycle_wait == self.bus.cycle_wait
+
+    def test_calibrate_ProgrammingErrorRaised(self):
+        self.bus.scan = MagicMock(return_value=(10010,))
+        self.bus.probe_module_long = MagicMock(side_effect=TypeError('Oops!'))
+        with pytest.raises(TypeError):
+            self.bus.calibrate([10010], rounds=1)
+
+    def test_calibrate_WithTimingFile(self, tmpdir):
+        filename = str(tmpdir.join('timings.json'))
+        self.bus.port = '/dev/ttyUSB0'
+        self.bus.timing_file = filename
+        self.bus.scan = MagicMock(return_value=(10010,))
+        self.bus.probe_module_long = MagicMock(return_value=True)
+        self.bus.calibrate(rounds=1)
+
+        bus = Bus('/dev/ttyUSB0', timing_file=filename)
+        bus.port = '/dev/ttyUSB0'
+        assert bus.load_timings(filename)
+        assert bus.range_wait == 0.0
+
+    def test_rescan(self):
+        self.bus.probe_range = MagicMock()
+        self.bus.probe_module_short = MagicMock(return_value=True)
+        assert self.bus.rescan((10011, 10010), discover=False) == (10010, 10011)
+        assert self.bus.probe_module_short.call_args_list == [call(10010), call(10011)]
+        assert not self.bus.probe_range.called
+
+    def test_scan_iter(self):
+        self.bus.probe_range = MagicMock(return_value=True)
+        self.bus.probe_module_short = MagicMock(side_effect=lambda serno: serno in (3, 9))
+
+        sernos = self.bus.scan_iter(1, 10)
+        assert next(sernos) == 9
+        assert self.bus.probe_module_short.call_count == 3
+        assert list(sernos) == [3]
+
+    def test_scan_WithCallback(self):
+        self.bus.probe_range = MagicMock(return_value=True)
+        self.bus.probe_module_short = MagicMock(side_effect=lambda serno: serno in (3, 9))
+        callback = MagicMock()
+
+        assert self.bus.scan(1, 10, callback=callback) == (3, 9)
+        assert callback.call_args_list == [call(9), call(3)]
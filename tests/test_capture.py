@@ -0,0 +1,132 @@
+# -*- coding: UTF-8 -*-
+
+import time
+
+import pytest
+
+from implib2.imp_bus import Bus
+from implib2.imp_device import Device, DeviceError
+from implib2.imp_emulator import Emulator
+from implib2.imp_capture import (RecordingDevice, ReplayDevice, CaptureError,
+                                 read_capture, OPEN, TX, RX, TIMEOUT)
+
+
+def make_bus(device):
+    bus = Bus(device, event_driven=True)
+    bus.cycle_wait = 0
+    bus.range_wait = 0
+    return bus
+
+
+class TestCapture:
+
+    def setup(self):
+        self.emu = Emulator([10010, 10011, 33211])
+
+    def record(self, filename):
+        dev = RecordingDevice(Device(self.emu.url), filename)
+        bus = make_bus(dev)
+        dev.open_device()
+        sernos = bus.scan()
+        values = [bus.get(serno, 'SYSTEM_PARAMETER_TABLE', 'SerialNum') for serno in sernos]
+        assert not bus.probe_module_long(12345)
+        dev.close_device()
+        dev.close()
+        return sernos, values
+
+    def test_read_capture(self, tmpdir):
+        filename = str(tmpdir.join('session.cap'))
+        self.record(filename)
+
+        records = read_capture(filename)
+        kinds = set(record.kind for record in records)
+        assert records[0].kind == OPEN
+        assert set([TX, RX, TIMEOUT]) <= kinds
+        assert [r.time for r in records] == sorted(r.time for r in records)
+
+    def test_record_Flushed(self, tmpdir):
+        filename = str(tmpdir.join('session.cap'))
+        dev = RecordingDevice(Device(self.emu.url), filename)
+        bus = make_bus(dev)
+        dev.open_device()
+        assert bus.probe_module_short(10010)
+
+        # readable before the device or the capture file is closed
+        kinds = [record.kind for record in read_capture(filename)]
+        assert kinds == [OPEN, TX, RX]
+        dev.close_device()
+        dev.close()
+
+    def test_read_capture_NoCaptureFile(self, tmpdir):
+        filename = tmpdir.join('other.cap')
+        filename.write('something else')
+        with pytest.raises(CaptureError, match="Not a capture file"):
+            read_capture(str(filename))
+
+    def test_replay(self, tmpdir):
+        filename = str(tmpdir.join('session.cap'))
+        sernos, values = self.record(filename)
+
+        dev = ReplayDevice(filename, speed=None)
+        bus = make_bus(dev)
+        dev.open_device()
+        assert bus.scan() == sernos
+        assert [bus.get(s, 'SYSTEM_PARAMETER_TABLE', 'SerialNum') for s in sernos] == values
+        assert not bus.probe_module_long(12345)
+        dev.close_device()
+
+    def test_replay_Diverged(self, tmpdir):
+        filename = str(tmpdir.join('session.cap'))
+        self.record(filename)
+
+        dev = ReplayDevice(filename, speed=None)
+        bus = make_bus(dev)
+        dev.open_device()
+        with pytest.raises(DeviceError, match="Replay diverged"):
+            bus.get(10010, 'SYSTEM_PARAMETER_TABLE', 'SerialNum')
+
+    def test_replay_Exhausted(self, tmpdir):
+        filename = str(tmpdir.join('session.cap'))
+        self.record(filename)
+
+        dev = ReplayDevice(filename, speed=None)
+        dev.records.clear()
+        with pytest.raises(DeviceError, match="Replay exhausted"):
+            dev.open_device()
+
+    def test_replay_OriginalTiming(self, tmpdir):
+        filename = str(tmpdir.join('slow.cap'))
+        dev = RecordingDevice(Device(self.emu.url), filename)
+        dev.open_device()
+        time.sleep(0.2)
+        dev.close_device()
+        dev.close()
+
+        dev = ReplayDevice(filename, speed=2.0)
+        tic = time.time()
+        dev.open_device()
+        dev.close_device()
+        assert 0.08 < time.time() - tic < 0.2
+
+    def test_replay_ScaledFromFirstRecord(self, tmpdir):
+        filename = str(tmpdir.join('late.cap'))
+        dev = RecordingDevice(Device(self.emu.url), filename)
+        time.sleep(0.2)
+        dev.open_device()
+        time.sleep(0.2)
+        dev.close_device()
+        dev.close()
+
+        dev = ReplayDevice(filename, speed=2.0)
+        dev.open_device()
+        tic = time.time()
+        dev.close_device()
+        assert 0.08 < time.time() - tic < 0.2
+
+    def test_record_FailedWrite(self, tmpdir):
+        filename = str(tmpdir.join('failed.cap'))
+        dev = RecordingDevice(Device(self.emu.url), filename)
+        with pytest.raises(DeviceError):
+            dev.write_pkg(b'\xfd\x04\x00\x1a\x79\x00\xf3')
+        dev.close()
+        assert [record.kind for record in read_capture(filename)] == [TX]
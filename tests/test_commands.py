@@ -1,5 +1,6 @@
 # -*- coding: UTF-8 -*-
 
+import struct
 from binascii import a2b_hex as a2b
 
 import pytest
@@ -59,3 +60,67 @@ class TestCommand:
         page = range(0, 251)
         with pytest.raises(CommandError, message="Page to big, exeeds 250 Bytes!"):
             self.cmd.set_epr_page(30001, 7, page)
+
+
+class TestCommandCache:
+
+    def setup(self):
+        self.cmd = Command(Tables(), Package(), DataTypes(), cache_size=2)
+
+    def test_get_parameter_Hit(self):
+        first = self.cmd.get_parameter(31002, 'SYSTEM_PARAMETER_TABLE', 'SerialNum')
+        second = self.cmd.get_parameter(31002, 'SYSTEM_PARAMETER_TABLE', 'SerialNum')
+        assert second == a2b('fd0a031a7900290100c4')
+        assert second is first
+        assert (self.cmd.hits, self.cmd.misses) == (1, 1)
+
+    def test_get_parameter_KeyedBySerno(self):
+        self.cmd.get_parameter(31002, 'SYSTEM_PARAMETER_TABLE', 'SerialNum')
+        pkg = self.cmd.get_parameter(31003, 'SYSTEM_PARAMETER_TABLE', 'SerialNum')
+        assert not pkg == a2b('fd0a031a7900290100c4')
+        assert (self.cmd.hits, self.cmd.misses) == (0, 2)
+
+    def test_set_parameter_KeyedByValues(self):
+        table, param = 'SYSTEM_PARAMETER_TABLE', 'SerialNum'
+        first = self.cmd.set_parameter(31002, table, param, [31003])
+        assert self.cmd.set_parameter(31002, table, param, [31003]) is first
+        assert not self.cmd.set_parameter(31002, table, param, [31004]) == first
+        assert not self.cmd.set_parameter(31002, table, param, [31003], 1) == first
+        assert (self.cmd.hits, self.cmd.misses) == (1, 3)
+
+    def test_set_parameter_EqualValuesPackedApart(self):
+        table, param = 'MEASURE_PARAMETER_TABLE', 'Moist'
+        first = self.cmd.set_parameter(31002, table, param, [0.0])
+        assert not self.cmd.set_parameter(31002, table, param, [-0.0]) == first
+        assert self.cmd.misses == 2
+
+    def test_set_parameter_WrongType(self):
+        table, param = 'SYSTEM_PARAMETER_TABLE', 'SerialNum'
+        self.cmd.set_parameter(31002, table, param, [1])
+        with pytest.raises(struct.error):
+            self.cmd.set_parameter(31002, table, param, ['1'])
+
+    def test_cache_EvictsLeastRecentlyUsed(self):
+        table, param = 'SYSTEM_PARAMETER_TABLE', 'SerialNum'
+        self.cmd.get_parameter(1, table, param)
+        self.cmd.get_parameter(2, table, param)
+        self.cmd.get_parameter(1, table, param)
+        self.cmd.get_parameter(3, table, param)
+        assert list(key[1] for key in self.cmd._cache) == [1, 3]
+
+        self.cmd.get_parameter(2, table, param)
+        assert (self.cmd.hits, self.cmd.misses) == (1, 4)
+
+    def test_cache_Disabled(self):
+        cmd = Command(Tables(), Package(), DataTypes(), cache_size=0)
+        cmd.get_parameter(31002, 'SYSTEM_PARAMETER_TABLE', 'SerialNum')
+        pkg = cmd.get_parameter(31002, 'SYSTEM_PARAMETER_TABLE', 'SerialNum')
+        assert pkg == a2b('fd0a031a7900290100c4')
+        assert (cmd.hits, cmd.misses) == (0, 2)
+        assert len(cmd._cache) == 0
+
+    def test_clear_cache(self):
+        self.cmd.get_parameter(31002, 'SYSTEM_PARAMETER_TABLE', 'SerialNum')
+        self.cmd.clear_cache()
+        assert (self.cmd.hits, self.cmd.misses) == (0, 0)
+        assert len(self.cmd._cache) == 0
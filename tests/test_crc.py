@@ -1,7 +1,7 @@
 # -*- coding: UTF-8 -*-
 
 from binascii import a2b_hex as a2b
-from implib2.imp_crc import MaximCRC
+from implib2.imp_crc import MaximCRC, make_table
 
 
 class TestMaximCRC:
@@ -16,3 +16,33 @@ class TestMaximCRC:
     def test_check_crc(self):
         data = a2b('FD15ED09f3')
         assert self.crc.check_crc(data)
+
+    def test_calc(self):
+        assert self.crc.calc(a2b('FD15ED09')) == 0xf3
+
+    def test_calc_Incremental(self):
+        reg = self.crc.calc(a2b('FD15'))
+        assert self.crc.calc(a2b('ED09'), reg) == 0xf3
+
+    def test_calc_Memoryview(self):
+        data = bytearray(a2b('00FD15ED0900'))
+        assert self.crc.calc(memoryview(data)[1:5]) == 0xf3
+
+    def test_calc_Empty(self):
+        assert self.crc.calc(b'') == 0
+        assert self.crc.calc_crc(b'') == a2b('00')
+
+    def test_calc_MatchesTable(self):
+        table = make_table()
+        for byte in range(256):
+            assert self.crc.calc(bytearray([byte])) == self.crc.table[byte] == table[byte]
+
+    def test_table_Shared(self):
+        assert MaximCRC().table is self.crc.table
+
+    def test_check_crc_Faulty(self):
+        assert not self.crc.check_crc(a2b('FD15ED09f4'))
+        assert not self.crc.check_crc(a2b('FD15ED19f3'))
+
+    def test_check_crc_Empty(self):
+        assert not self.crc.check_crc(b'')
@@ -33,3 +33,29 @@ class TestDataTypes:
     def test_lookup_NonExistentKey(self):
         with pytest.raises(KeyError):
             self.dts.lookup(0x08)
+
+    def test_codec(self):
+        codec = self.dts.codec(0x02, 3)
+        assert codec.format in ('<3H', b'<3H')
+        assert codec.size == 6
+        assert codec.pack(1, 2, 3) == b'\x01\x00\x02\x00\x03\x00'
+
+    def test_codec_Cached(self):
+        assert self.dts.codec(0x06, 2) is self.dts.codec(0x06, 2)
+        assert self.dts.codec(0x06) is self.dts.codec(0x06, 1)
+        assert self.dts.codec(0x06, 2) is not self.dts.codec(0x06, 3)
+
+    def test_codec_PackIntoUnpackFrom(self):
+        codec = self.dts.codec(0x06, 2)
+        buf = bytearray(10)
+        codec.pack_into(buf, 2, 1.5, -2.0)
+        assert codec.unpack_from(buf, 2) == (1.5, -2.0)
+
+    def test_codec_NonExistentKey(self):
+        with pytest.raises(KeyError):
+            self.dts.codec(0x08)
+
+    def test_size(self):
+        sizes = {0x00: 1, 0x01: 1, 0x02: 2, 0x03: 2, 0x04: 4, 0x05: 4, 0x06: 4, 0x07: 8}
+        for d_nr, size in sizes.items():
+            assert self.dts.size(d_nr) == size
@@ -144,3 +144,100 @@ class TestPackage:
         assert self.dev.read() == empty_string
         self.ser.read.assert_called_once_with(1)
         self.ser.flushInput.assert_called_once_with()
+
+    def test_read_pkg_WithTimeout(self):
+        header = a2b('000a05bb8100aa')
+        data = a2b('bb810000cc')
+        self.ser.read.side_effect = [header, data]
+        self.dev.is_open = True
+
+        assert self.dev.read_pkg(timeout=0.5) == header + data
+        assert self.ser.read.call_args_list == [call(7), call(5)]
+        assert self.ser.timeout == self.dev.timeout
+
+    def test_read_bytes_WithDeadlineTimeout(self):
+        pkg = a2b('ff')
+        self.ser.read.side_effect = [pkg]
+        self.dev.is_open = True
+
+        assert self.dev.read_bytes(1, timeout=0.5) == pkg
+        assert self.ser.timeout == self.dev.timeout
+
+    def test_read_WithLinger(self):
+        pkg = a2b('ff')
+        self.ser.read.return_value = pkg
+        self.dev.is_open = True
+
+        with patch('implib2.imp_device.time.sleep') as sleep:
+            assert self.dev.read(timeout=0.5, linger=0.02) == pkg
+        sleep.assert_called_once_with(0.02)
+        self.ser.flushInput.assert_called_once_with()
+
+    def test_set_baudrate(self):
+        self.dev.is_open = True
+        self.dev.set_baudrate(2400)
+        assert self.ser.baudrate == 2400
+        assert self.dev.baudrate == 2400
+        self.ser.open.assert_not_called()
+        self.ser.close.assert_not_called()
+
+    def test_set_baudrate_OpensClosedDevice(self):
+        self.dev.set_baudrate(2400)
+        self.ser.open.assert_called_once_with()
+        assert self.dev.is_open is True
+
+    def test_drain(self):
+        self.dev.drain()
+        self.ser.flush.assert_called_once_with()
+
+    def fake_readinto(self, *chunks):
+        chunks = list(chunks)
+
+        def readinto(view):
+            data = chunks.pop(0)
+            view[:len(data)] = data
+            return len(data)
+
+        self.ser.readinto.side_effect = readinto
+
+    def test_read_frame(self):
+        header = a2b('000a05bb8100aa')
+        data = a2b('bb810000cc')
+        self.fake_readinto(header, data)
+        self.dev.is_open = True
+
+        frame = self.dev.read_frame()
+        assert isinstance(frame, memoryview)
+        assert frame.tobytes() == header + data
+        self.ser.read.assert_not_called()
+
+    def test_read_frame_ReusesBuffer(self):
+        self.fake_readinto(a2b('fd0200bb81002d'), a2b('0002001a7900a7'))
+        self.dev.is_open = True
+
+        first = self.dev.read_frame()
+        second = self.dev.read_frame()
+        assert second.tobytes() == a2b('0002001a7900a7')
+        # both are views of the receive buffer, the first one got overwritten
+        assert first.tobytes() == second.tobytes() == bytes(self.dev._buffer[:7])
+
+    def test_read_frame_OnlyHeaderWithTimeout(self):
+        self.fake_readinto(a2b('000a05'))
+        with pytest.raises(DeviceError, message='Timeout reading header!'):
+            self.dev.is_open = True
+            self.dev.read_frame()
+
+    def test_read_frame_HeaderAndDataWithTimeout(self):
+        self.fake_readinto(a2b('000a05bb8100aa'), a2b('bb'))
+        with pytest.raises(DeviceError, message='Timeout reading data!'):
+            self.dev.is_open = True
+            self.dev.read_frame()
+
+    def test_read_pkg_ZeroCopy(self):
+        header = a2b('000a05bb8100aa')
+        data = a2b('bb810000cc')
+        self.fake_readinto(header, data)
+        self.dev.is_open = True
+        self.dev.zero_copy = True
+
+        assert self.dev.read_pkg().tobytes() == header + data
@@ -0,0 +1,132 @@
+# -*- coding: UTF-8 -*-
+
+import struct
+
+from binascii import a2b_hex as a2b
+
+import pytest
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from implib2.imp_bus import Bus
+from implib2.imp_tables import Tables
+from implib2.imp_packages import Package
+from implib2.imp_datatypes import DataTypes
+from implib2.imp_commands import Command
+from implib2.imp_device import Device
+from implib2.imp_modules import Module
+from implib2.imp_emulator import Emulator, EmulatorError, VirtualProbe
+
+
+class TestEmulator:
+
+    def setup(self):
+        self.emu = Emulator([31002, 33211])
+
+    def test_lookup(self):
+        assert Emulator.lookup(self.emu.name) is self.emu
+
+    def test_lookup_Unknown(self):
+        with pytest.raises(EmulatorError, match="Unknown emulator: nope!"):
+            Emulator.lookup('nope')
+
+    def test_transact_long_ack(self):
+        assert self.emu.transact(a2b('fd02001a79009f')) == a2b('0002001a7900a7')
+
+    def test_transact_short_ack(self):
+        assert self.emu.transact(a2b('fd04001a790003')) == a2b('24')
+
+    def test_transact_short_ack_UnknownProbe(self):
+        assert self.emu.transact(a2b('fd0400197900e7')) == b''
+
+    def test_transact_range_ack(self):
+        # 0xf00000 addresses 0xe00000 - 0xffffff, which is empty
+        assert self.emu.transact(a2b('fd06000000f0d0')) == b''
+
+    def test_transact_range_ack_SingleProbe(self):
+        # 0x7a00 addresses 0x7800 - 0x7bff, which holds only 31002
+        pkg = Command(Tables(), Package(), DataTypes()).get_range_ack(0x7a00)
+        assert self.emu.transact(pkg) == a2b('24')
+
+    def test_transact_range_ack_Collision(self):
+        pkg = Command(Tables(), Package(), DataTypes()).get_range_ack(0x800000)
+        assert self.emu.transact(pkg) == struct.pack('<B', 0x24 & 0x96)
+
+    def test_transact_FaultyCRC(self):
+        assert self.emu.transact(a2b('fd02001a790000')) == b''
+
+    def test_transact_get_parameter(self):
+        pkg = self.emu.transact(a2b('fd0a031a7900290100c4'))
+        assert pkg == a2b('000a051a7900181a79000042')
+
+    def test_transact_OtherBaudrate(self):
+        assert self.emu.transact(a2b('fd02001a79009f'), baudrate=1200) == b''
+
+    def test_transact_negative_ack(self):
+        emu = Emulator([31002])
+        pkg = emu.transact(a2b('fd0800ffffff60'))
+        assert pkg == a2b('000805ffffffd91a79000042')
+
+    def test_transact_negative_ack_Collision(self):
+        assert self.emu.transact(a2b('fd0800ffffff60')) == b''
+
+
+class TestEmulatedBus:
+
+    def setup(self):
+        self.emu = Emulator([10010, 10011, 33211, 1234567])
+        self.bus = Bus(self.emu.url, event_driven=True)
+        self.bus.cycle_wait = 0
+        self.bus.range_wait = 0
+        self.bus.dev.open_device()
+
+    def test_scan(self):
+        assert self.bus.scan() == (10010, 10011, 33211, 1234567)
+
+    def test_scan_WithinRange(self):
+        assert self.bus.scan(10000, 20000) == (10010, 10011)
+
+    def test_get(self):
+        table = 'SYSTEM_PARAMETER_TABLE'
+        assert self.bus.get(33211, table, 'SerialNum') == (33211,)
+
+    def test_set(self):
+        table = 'DEVICE_CONFIGURATION_PARAMETER_TABLE'
+        assert self.bus.set(33211, table, 'MeasMode', [2])
+        assert self.bus.get(33211, table, 'MeasMode') == (2,)
+
+    def test_eeprom_page(self):
+        page = b'\x11\x2f\xc4\x4e'
+        assert self.bus.set_eeprom_page(10010, 3, page)
+        assert self.bus.get_eeprom_page(10010, 3) == [17, 47, 196, 78]
+
+    def test_fast_sync(self):
+        self.emu.add_probe(VirtualProbe(20000, baudrate=1200))
+        with patch('implib2.imp_bus.time.sleep'):
+            assert self.bus.fast_sync(2400)
+        assert set(p.baudrate for p in self.emu.probes.values()) == set([2400])
+        assert self.bus.scan(19999, 20001) == (20000,)
+
+    def test_sync_KeepsState(self):
+        with patch('implib2.imp_bus.time.sleep'), patch('implib2.imp_device.time.sleep'):
+            assert self.bus.sync(4800)
+        assert self.bus.probe_module_long(10011)
+
+    def test_module(self):
+        module = Module(self.bus, 10011)
+        assert module.get_hw_version() == '1.14'
+        assert module.get_moisture() == pytest.approx(12.5)
+
+    def test_set_serno(self):
+        module = Module(self.bus, 10011)
+        assert module.set_serno(10012)
+        assert self.bus.scan(10000, 10100) == (10010, 10012)
+
+    def test_device_from_url(self):
+        device = Device('impemu://?probes=5,6')
+        device.open_device()
+        bus = Bus(device, event_driven=True)
+        assert bus.scan(0, 7) == (5, 6)
@@ -3,7 +3,8 @@
 import os
 import json
 import pytest
-from implib2.imp_helper import _normalize, _load_json, _flp2
+from implib2.imp_helper import _normalize, _load_json, _flp2, _load_store, _save_store, \
+    _prefix_cover
 
 TESTS = {
     1: 0b0000000000000000000000001,         # 2**0
@@ -72,3 +73,30 @@ def test_load_json():
 def test_flp2(test):
     number, floor = test
     assert _flp2(number) == floor
+
+
+def test_load_store_WithMissingFile(tmpdir):
+    assert _load_store(str(tmpdir.join('missing.json'))) == {}
+
+
+def test_save_store(tmpdir):
+    filename = str(tmpdir.join('store.json'))
+    _save_store(filename, {'/dev/ttyUSB0': {'trans_wait': 0.001}})
+    assert _load_store(filename) == {'/dev/ttyUSB0': {'trans_wait': 0.001}}
+    assert tmpdir.listdir() == [tmpdir.join('store.json')]
+
+
+def test_prefix_cover():
+    assert _prefix_cover(1, 10) == [(1, 0), (2, 1), (4, 2), (8, 1), (10, 0)]
+    assert _prefix_cover(0, 16777215) == [(0, 8388608)]
+    assert _prefix_cover(0x7fffff, 0x800000) == [(0x7fffff, 0), (0x800000, 0)]
+    assert _prefix_cover(5, 4) == []
+
+
+@pytest.mark.parametrize("rng", [(0, 0), (3, 17), (33000, 34000), (12345, 999999)])
+def test_prefix_cover_IsExact(rng):
+    low, high = rng
+    sernos = list()
+    for address, marker in _prefix_cover(low, high):
+        sernos.extend(range(address, address + max(2 * marker, 1)))
+    assert sernos == list(range(low, high + 1))
@@ -0,0 +1,89 @@
+# -*- coding: UTF-8 -*-
+
+import time
+
+try:
+    from unittest.mock import patch, call, MagicMock
+except ImportError:
+    from mock import patch, call, MagicMock
+
+from implib2.imp_manager import BusManager
+from implib2.imp_device import DeviceError
+
+
+class TestBusManager:
+
+    def setup(self):
+        self.patcher = patch('implib2.imp_manager.Bus')
+        self.bus_class = self.patcher.start()
+        self.bus_class.side_effect = lambda port, **kwargs: MagicMock()
+        self.ports = ['/dev/ttyUSB0', '/dev/ttyUSB1']
+        self.manager = BusManager(self.ports)
+        self.bus0 = self.manager.buses['/dev/ttyUSB0']
+        self.bus1 = self.manager.buses['/dev/ttyUSB1']
+
+    def teardown(self):
+        self.patcher.stop()
+
+    def test___init__(self):
+        assert self.bus_class.call_args_list == [
+            call('/dev/ttyUSB0', rs485=False, event_driven=False),
+            call('/dev/ttyUSB1', rs485=False, event_driven=False)]
+
+    def test_sync(self):
+        self.bus0.sync.return_value = True
+        self.bus1.sync.return_value = True
+        assert self.manager.sync(4800) == {'/dev/ttyUSB0': True, '/dev/ttyUSB1': True}
+        self.bus0.sync.assert_called_once_with(4800)
+        self.bus1.sync.assert_called_once_with(4800)
+
+    def test_scan(self):
+        self.bus0.scan.return_value = (10010, 10011)
+        self.bus1.scan.return_value = (10020,)
+
+        results = {'/dev/ttyUSB0': (10010, 10011), '/dev/ttyUSB1': (10020,)}
+        assert self.manager.scan() == results
+        assert self.manager.probes == results
+        self.bus0.scan.assert_called_once_with(0, 16777215)
+
+    def test_scan_WithFailingPort(self):
+        error = DeviceError("Couldn't write packet, device is closed!")
+        self.bus0.scan.side_effect = error
+        self.bus1.scan.return_value = (10020,)
+
+        assert self.manager.scan() == {'/dev/ttyUSB1': (10020,)}
+        assert self.manager.errors == {'/dev/ttyUSB0': error}
+
+    def test_scan_RunsConcurrently(self):
+        def scan(minserial, maxserial):
+            time.sleep(0.2)
+            return (10010,)
+
+        self.bus0.scan.side_effect = scan
+        self.bus1.scan.side_effect = scan
+        tic = time.time()
+        self.manager.scan()
+        assert time.time() - tic < 0.35
+
+    def test_poll(self):
+        self.manager.probes = {'/dev/ttyUSB0': (10010, 10011)}
+        self.bus0.get.side_effect = lambda serno, table, param: (serno / 1000.0,)
+        self.bus1.get.side_effect = AssertionError('No probes on this port!')
+
+        assert self.manager.poll('MEASURE_PARAMETER_TABLE', 'Moist') == {
+            '/dev/ttyUSB0': {10010: 10.01, 10011: 10.011},
+            '/dev/ttyUSB1': {}}
+
+    def test_poll_WithFailingProbe(self):
+        def get(serno, table, param):
+            if serno == 10011:
+                raise DeviceError('Timeout reading header!')
+            return (1.5,)
+
+        self.manager.probes = {'/dev/ttyUSB0': (10010, 10011)}
+        self.bus0.get.side_effect = get
+
+        assert self.manager.poll('MEASURE_PARAMETER_TABLE', 'Moist') == {
+            '/dev/ttyUSB0': {10010: 1.5},
+            '/dev/ttyUSB1': {}}
+        assert list(self.manager.errors) == [('/dev/ttyUSB0', 10011)]
@@ -0,0 +1,134 @@
+# -*- coding: UTF-8 -*-
+
+import pytest
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from implib2.imp_bus import Bus
+from implib2.imp_device import DeviceError
+from implib2.imp_pacing import Pacer
+from implib2.imp_emulator import Emulator
+from implib2.imp_monitor import Monitor
+
+from tests.fakes import FakeClock, BlockingSerial
+
+
+class TestMonitor:
+
+    def setup(self):
+        self.emu = Emulator([10010, 10100])
+        self.clock = FakeClock()
+        self.patcher = patch('implib2.imp_pacing.time.sleep', self.clock.sleep)
+        self.patcher.start()
+
+        self.bus = Bus(self.emu.url)
+        self.bus.pacer = Pacer(clock=self.clock)
+        self.bus.dev.open_device()
+
+        self.appeared = list()
+        self.disappeared = list()
+        self.monitor = Monitor(self.bus, [10010, 10100], ranges=[(10000, 10255)],
+                               on_appear=self.appeared.append,
+                               on_disappear=self.disappeared.append)
+
+    def teardown(self):
+        self.bus.dev.close_device()
+        self.patcher.stop()
+
+    def run_rounds(self, rounds):
+        target = self.monitor.rounds + rounds
+        while self.monitor.rounds < target:
+            self.monitor.step()
+
+    def test_idle_KeepsDeadline(self):
+        for _ in range(20):
+            deadline = self.clock.now + 1.0
+            steps = self.monitor.idle(deadline)
+            assert steps > 0
+            assert self.clock.now <= deadline
+            assert self.bus.pacer.free_at <= deadline
+            self.clock.sleep(deadline - self.clock.now)
+
+    def test_idle_SlotTooShort(self):
+        assert self.monitor.idle(self.clock.now + 0.05) == 0
+        assert self.bus.pacer.transactions == 0
+
+    def test_idle_PollsNotDelayed(self):
+        start = self.clock.now + 1.0
+        for idx in range(10):
+            due = start + 0.75 * idx
+            self.monitor.idle(due)
+            self.clock.sleep(due - self.clock.now)
+            assert self.bus.pacer.start() == pytest.approx(due, abs=0.0001)
+            self.bus.pacer.finish(self.bus.cycle_wait)
+        assert self.monitor.rounds > 0
+
+    def test_cost(self):
+        self.monitor.scanner.queue = [(10010, 1)]
+        pair = self.monitor.cost()
+        self.monitor.scanner.queue = [(10010, 0)]
+        assert self.monitor.cost() == pytest.approx(pair / 3)
+        assert self.monitor.cost() == pytest.approx(
+            self.bus._timeout(7, 1) + self.bus.cycle_wait + 0.1)
+
+    def test_cost_EventDriven(self):
+        self.bus.event_driven = True
+        self.monitor.scanner.queue = [(10010, 0)]
+        short = self.monitor.cost()
+        assert short == pytest.approx(self.bus._timeout(7, 1) + self.bus.cycle_wait)
+        self.monitor.scanner.queue = [(10010, 1)]
+        assert self.monitor.cost() == pytest.approx(3 * short + self.bus.range_wait)
+
+    @pytest.mark.parametrize('event_driven', [False, True])
+    def test_idle_BlockingRead(self, event_driven):
+        self.bus.dev.ser = BlockingSerial(self.bus.dev.ser, self.clock)
+        self.bus.event_driven = event_driven
+        for _ in range(10):
+            deadline = self.clock.now + 1.0
+            assert self.monitor.idle(deadline) > 0
+            assert self.clock.now <= deadline
+            assert self.bus.pacer.free_at <= deadline
+            self.clock.sleep(deadline - self.clock.now)
+
+    def test_appear(self):
+        self.run_rounds(1)
+        assert self.appeared == []
+
+        self.emu.add_probe(10200)
+        self.run_rounds(1)
+        assert self.appeared == [10200]
+        assert self.monitor.probes == set([10010, 10100, 10200])
+
+    def test_appear_OutOfRange(self):
+        self.emu.add_probe(20000)
+        self.run_rounds(2)
+        assert self.appeared == []
+
+    def test_disappear(self):
+        self.emu.remove_probe(10100)
+        self.run_rounds(1)
+        assert self.disappeared == []
+        assert 10100 in self.monitor.probes
+
+        self.run_rounds(1)
+        assert self.disappeared == [10100]
+        assert self.monitor.probes == set([10010])
+
+    def test_disappear_MissedOnce(self):
+        probe = self.emu.remove_probe(10100)
+        self.run_rounds(1)
+        self.emu.add_probe(probe)
+        self.run_rounds(2)
+        assert self.disappeared == []
+        assert self.appeared == []
+        assert self.monitor.missed == {}
+
+    def test_step_Error(self):
+        node = self.monitor.scanner.queue[-1]
+        with patch.object(self.bus, 'probe_module_short', side_effect=DeviceError('Timeout')):
+            assert not self.monitor.step()
+        assert self.monitor.errors == 1
+        assert self.monitor.scanner.queue[-1] == node
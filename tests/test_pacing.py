@@ -0,0 +1,77 @@
+# -*- coding: UTF-8 -*-
+
+import pytest
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from implib2.imp_pacing import Pacer
+
+from tests.fakes import FakeClock
+
+
+class TestPacer:
+
+    def setup(self):
+        self.clock = FakeClock(tick=0.0001)
+        self.patcher = patch('implib2.imp_pacing.time.sleep', self.clock.sleep)
+        self.patcher.start()
+        self.pacer = Pacer(spin=0.002, clock=self.clock)
+
+    def teardown(self):
+        self.patcher.stop()
+
+    def test_start_FirstTransaction(self):
+        assert self.pacer.start() == pytest.approx(100.0001)
+        assert self.clock.sleeps == []
+        assert self.pacer.transactions == 1
+
+    def test_wait(self):
+        start = self.pacer.start()
+        self.pacer.wait(0.010)
+        # sleeps up to the spin window, then spins to the deadline
+        assert self.clock.sleeps == [pytest.approx(0.008, abs=0.0002)]
+        assert self.clock.now == pytest.approx(start + 0.010, abs=0.0002)
+        assert self.clock.now >= start + 0.010
+
+    def test_wait_ShortGapSpinsOnly(self):
+        start = self.pacer.start()
+        self.pacer.wait(0.001)
+        assert self.clock.sleeps == []
+        assert self.clock.now >= start + 0.001
+
+    def test_wait_DeadlinePassed(self):
+        self.pacer.start()
+        self.clock.now += 1.0
+        self.pacer.wait(0.010)
+        assert self.clock.sleeps == []
+
+    def test_start_WaitsForFreeBus(self):
+        self.pacer.start()
+        self.pacer.finish(0.005)
+        free_at = self.pacer.free_at
+        assert self.pacer.start() >= free_at
+        assert self.pacer.idle_time == 0.0
+        assert self.pacer.wait_time > 0.0
+
+    def test_start_CountsIdleTime(self):
+        self.pacer.start()
+        self.pacer.finish(0.001)
+        self.clock.now += 0.5
+        self.pacer.start()
+        assert self.pacer.idle_time == pytest.approx(0.499, abs=0.001)
+        assert self.clock.sleeps == []
+
+    def test_reset(self):
+        self.pacer.start()
+        self.pacer.wait(0.010)
+        self.pacer.reset()
+        assert self.pacer.transactions == 0
+        assert self.pacer.wait_time == 0.0
+        assert self.pacer.idle_time == 0.0
+
+    def test_default_clock_is_monotonic(self):
+        pacer = Pacer()
+        assert pacer.clock() <= pacer.clock()
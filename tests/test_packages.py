@@ -5,7 +5,7 @@ from binascii import a2b_hex as a2b
 import pytest
 
 from implib2.imp_crc import MaximCRC
-from implib2.imp_packages import Package, PackageError
+from implib2.imp_packages import Package, PackageError, Frame
 
 
 class TestPackage:
@@ -44,17 +44,39 @@ class TestPackage:
 
     def test__unpack_head(self):
         # e.g. responce to probe_module_long(33211)
-        data = {'header': {'state': 0, 'cmd': 11, 'length': 0,
-                           'serno': 33211}, 'data': None}
         pkg = a2b('000b00bb8100e6')
-        assert self.pkg.unpack(pkg) == data
+        frame = self.pkg.unpack(pkg)
+        assert frame == Frame(state=0, cmd=11, length=0, serno=33211, package=pkg)
+        assert frame.header == {'state': 0, 'cmd': 11, 'length': 0, 'serno': 33211}
+        assert frame.data is None
 
     def test__unpack_head_AndData(self):
         # e.g. responce to get_serial(33211)
-        data = {'header': {'state': 0, 'cmd': 10, 'length': 5,
-                           'serno': 33211}, 'data': b'\xbb\x81\x00\x00'}
         pkg = a2b('000a05bb8100aabb810000cc')
-        assert self.pkg.unpack(pkg) == data
+        frame = self.pkg.unpack(pkg)
+        assert frame.header == {'state': 0, 'cmd': 10, 'length': 5, 'serno': 33211}
+        assert frame.data == b'\xbb\x81\x00\x00'
+
+    def test__unpack_head_AndData_FromMemoryview(self):
+        # e.g. responce to get_serial(33211), read by Device.read_frame
+        pkg = memoryview(bytearray(a2b('000a05bb8100aabb810000cc')))
+        frame = self.pkg.unpack(pkg)
+        assert (frame.state, frame.cmd, frame.length, frame.serno) == (0, 10, 5, 33211)
+        assert frame.data == b'\xbb\x81\x00\x00'
+
+    def test_unpack_head_SkipsData(self):
+        pkg = a2b('000a05bb8100aabb810000ff')
+        frame = self.pkg.unpack_head(pkg)
+        assert frame.serno == 33211
+        with pytest.raises(PackageError, match="faulty data CRC"):
+            frame.data
+
+    def test_frame_Immutable(self):
+        frame = self.pkg.unpack(a2b('000b00bb8100e6'))
+        with pytest.raises(AttributeError):
+            frame.serno = 1
+        with pytest.raises(AttributeError):
+            frame.extra = 1
 
     def test__unpack_data_ToLong(self):
         data = b'\xff' * 253
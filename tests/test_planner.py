@@ -0,0 +1,136 @@
+# -*- coding: UTF-8 -*-
+
+import random
+import pytest
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from implib2.imp_bus import Bus
+from implib2.imp_pacing import Pacer
+from implib2.imp_emulator import Emulator
+from implib2.imp_planner import Planner, PlannerError
+
+from tests.fakes import FakeClock, BlockingSerial
+
+
+class TestPlanner:
+
+    def setup(self):
+        self.sernos = [10010, 10011, 12345, 17000, 19999]
+        self.emu = Emulator(self.sernos)
+        self.clock = FakeClock()
+        self.patcher = patch('implib2.imp_pacing.time.sleep', self.clock.sleep)
+        self.patcher.start()
+        self.planner = Planner(ranges=[(10000, 19999)])
+
+    def teardown(self):
+        self.patcher.stop()
+
+    def scan(self, **kwargs):
+        bus = Bus(self.emu.url, **kwargs)
+        bus.pacer = Pacer(clock=self.clock)
+        bus.dev.open_device()
+        bus.dev.ser = BlockingSerial(bus.dev.ser, self.clock)
+        try:
+            short = bus.probe_module_short
+            with patch.object(bus, 'probe_range', wraps=bus.probe_range) as ranges, \
+                    patch.object(bus, 'probe_module_short', wraps=short) as shorts:
+                start = self.clock.now
+                assert bus.scan(ranges=self.planner.ranges) == tuple(self.sernos)
+                return ranges.call_count, shorts.call_count, self.clock.now - start, bus
+        finally:
+            bus.dev.close_device()
+
+    def test_count_MatchesScan(self):
+        range_probes, short_probes, _, _ = self.scan()
+        assert self.planner.count(self.sernos)[:2] == (range_probes, short_probes)
+
+    def test_count_IgnoresOtherSernos(self):
+        assert self.planner.count(self.sernos + [5, 20000]) == self.planner.count(self.sernos)
+
+    def test_seconds_MatchesScan(self):
+        range_probes, short_probes, seconds, _ = self.scan()
+        counts = self.planner.count(self.sernos)
+        estimate = self.planner.seconds(*counts, probes=len(self.sernos))
+        assert range_probes + short_probes == counts[0] + counts[1]
+        assert estimate == pytest.approx(seconds, rel=0.01)
+
+    def test_seconds_MatchesScanRs485(self):
+        _, _, seconds, _ = self.scan(rs485=True)
+        counts = self.planner.count(self.sernos)
+        estimate = self.planner.seconds(*counts, probes=len(self.sernos), rs485=True)
+        assert estimate == pytest.approx(seconds, rel=0.01)
+
+    def test_seconds_MatchesScanEventDriven(self):
+        _, _, seconds, bus = self.scan(event_driven=True)
+        counts = self.planner.count(self.sernos)
+        estimate = self.planner.seconds(*counts, probes=len(self.sernos), event_driven=True)
+        # the emulator replies without any wire time
+        hits = counts[2] + len(self.sernos)
+        assert estimate == pytest.approx(seconds + hits * bus._transit(8), rel=0.01)
+
+    def test_seconds_ReadTimeout(self):
+        assert self.planner.seconds(1, 0, 0, 0) == pytest.approx(
+            self.planner.seconds(1, 0, 0, 0, event_driven=True) + 0.1)
+        assert self.planner.seconds(1, 0, 1, 0) == pytest.approx(
+            self.planner.seconds(1, 0, 0, 0, event_driven=True))
+
+    def test_seconds_FromBus(self):
+        bus = self.scan()[3]
+        bus.cycle_wait = 0.010
+        bus.baudrate = 19200
+        counts = self.planner.count(self.sernos)
+        faster = self.planner.seconds(*counts, probes=len(self.sernos), bus=bus)
+        assert faster == pytest.approx(self.planner.seconds(
+            *counts, probes=len(self.sernos), baudrate=19200) + 0.009 * (counts[0] + counts[1]))
+
+    def test_seconds_EventDriven(self):
+        counts = self.planner.count(self.sernos)
+        assert self.planner.seconds(*counts, probes=len(self.sernos), event_driven=True) < \
+            self.planner.seconds(*counts, probes=len(self.sernos))
+
+    def test_expect_MatchesMeanOfScans(self):
+        rng = random.Random(4711)
+        samples = [self.planner.count(rng.sample(range(10000, 20000), 20)) for _ in range(500)]
+        mean = [sum(values) / float(len(samples)) for values in zip(*samples)]
+        for expected, value in zip(self.planner.expect(20), mean):
+            assert expected == pytest.approx(value, rel=0.02)
+
+    def test_expect_NoProbes(self):
+        planner = Planner()
+        assert planner.expect(0) == (1.0, 0.0, 0.0)
+        assert planner.estimate(0)['worst'].range_probes == 1
+
+    @pytest.mark.parametrize('distribution', ['uniform', 'sequential'])
+    def test_estimate_Bounds(self, distribution):
+        estimate = self.planner.estimate(20, distribution)
+        for field in ('range_probes', 'short_probes', 'seconds'):
+            best, expected, worst = (getattr(estimate[bound], field)
+                                     for bound in ('best', 'expected', 'worst'))
+            assert best <= expected <= worst
+
+    def test_estimate_WorstIsSpread(self):
+        worst = self.planner.estimate(20)['worst']
+        sernos = [10000 + 500 * idx for idx in range(20)]
+        assert (worst.range_probes, worst.short_probes) == self.planner.count(sernos)[:2]
+
+    def test_estimate_ShortProbesOfSingleSernos(self):
+        estimate = Planner(5, 5).estimate(1)
+        assert estimate['expected'].range_probes == 0
+        assert estimate['expected'].short_probes == 1
+
+    def test_estimate_UnknownDistribution(self):
+        with pytest.raises(PlannerError, match='Unknown distribution'):
+            self.planner.estimate(20, 'gaussian')
+
+    def test_estimate_TooManyProbes(self):
+        with pytest.raises(PlannerError, match="don't fit"):
+            self.planner.estimate(10001)
+
+    def test_plan(self):
+        plan = self.planner.plan(20)
+        assert plan['rs232']['expected'].range_probes == plan['rs485']['expected'].range_probes
+        assert plan['rs232']['expected'].seconds < plan['rs485']['expected'].seconds
@@ -0,0 +1,68 @@
+# -*- coding: UTF-8 -*-
+
+import pytest
+
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from implib2.imp_bus import Bus
+from implib2.imp_emulator import Emulator
+from implib2.imp_registry import Registry, RegistryError
+
+
+class TestRegistry:
+
+    def setup(self):
+        self.emu = Emulator([10010, 10011])
+        self.bus = Bus(self.emu.url, event_driven=True)
+        self.bus.dev.open_device()
+
+    def teardown(self):
+        self.bus.dev.close_device()
+
+    def test_refresh(self, tmpdir):
+        registry = Registry(str(tmpdir.join('probes.json')))
+        assert registry.expired(self.bus.port)
+        assert registry.refresh(self.bus) == (10010, 10011)
+        assert not registry.expired(self.bus.port)
+        assert registry.baudrate(self.bus.port) == 9600
+
+        facts = registry.facts(self.bus.port, 10010)
+        assert facts['HWVersion'] == '1.14'
+        assert facts['FWVersion'] == '1.140301'
+        assert facts['ModuleName'] == 'TRIME-PICO'
+        assert facts['last_seen'] > 0
+
+    def test_refresh_ColdStart(self, tmpdir):
+        filename = str(tmpdir.join('probes.json'))
+        Registry(filename).refresh(self.bus)
+
+        bus = MagicMock()
+        bus.port = self.bus.port
+        registry = Registry(filename)
+        assert registry.refresh(bus) == (10010, 10011)
+        assert registry.facts(self.bus.port, 10011)['ModuleName'] == 'TRIME-PICO'
+        assert bus.mock_calls == []
+
+    def test_refresh_Expired(self, tmpdir):
+        registry = Registry(str(tmpdir.join('probes.json')), ttl=0.0)
+        registry.refresh(self.bus)
+        self.emu.remove_probe(10011)
+        self.emu.add_probe(20020)
+
+        self.bus.scan = MagicMock()
+        self.bus.get = MagicMock(wraps=self.bus.get)
+        assert registry.refresh(self.bus) == (10010, 20020)
+        assert not self.bus.scan.called
+        # only the new probe is asked for its facts
+        assert set(c[0][0] for c in self.bus.get.call_args_list) == set([20020])
+        with pytest.raises(RegistryError, match='Unknown probe: 10011!'):
+            registry.facts(self.bus.port, 10011)
+
+    def test_facts_UnknownPort(self, tmpdir):
+        registry = Registry(str(tmpdir.join('probes.json')))
+        assert registry.probes('/dev/ttyUSB7') == ()
+        with pytest.raises(RegistryError, match='Unknown port'):
+            registry.facts('/dev/ttyUSB7', 10010)
@@ -41,6 +41,12 @@ class TestResponce:
         pkg = a2b('')
         assert not self.res.get_range_ack(pkg)
 
+    def test_get_range_crc(self):
+        assert self.res.get_range_crc(a2b('24')) == 0x24
+
+    def test_get_range_crc_NoResponce(self):
+        assert self.res.get_range_crc(a2b('')) is None
+
     def test_get_negative_ack(self):
         pkg = a2b('000805ffffffd91a79000042')
         assert self.res.get_negative_ack(pkg) == 31002
@@ -78,6 +84,12 @@ class TestResponce:
         dat = self.res.do_tdr_scan(pkg)
         assert (dat[0], dat[1]) == (point0, point1)
 
+    def test_do_tdr_scan_ZeroCopy(self):
+        pkg = memoryview(bytearray(a2b('001e0b1a79006e112fc44e3702f3e7fb3dc5')))
+        dat = self.res.do_tdr_scan(pkg)
+        assert dat[0] == {'tdr': 17, 'time': 1.232423437613761e-05}
+        assert dat[1] == {'tdr': 2, 'time': 0.12300100177526474}
+
     def test_do_tdr_scan_StrangeLength(self):
         pkg = a2b('001e0c1a7900e811112fc44e3702f3e7fb3df5')
         with pytest.raises(ResponceError, message="Responce package has strange length!"):
@@ -88,6 +100,11 @@ class TestResponce:
         page = [17, 47, 196, 78, 55, 2, 243, 231, 251, 61]
         assert self.res.get_epr_page(pkg) == page
 
+    def test_get_epr_page_ZeroCopy(self):
+        pkg = memoryview(bytearray(a2b('003c0b1a790015112fc44e3702f3e7fb3dc5')))
+        page = [17, 47, 196, 78, 55, 2, 243, 231, 251, 61]
+        assert self.res.get_epr_page(pkg) == page
+
     def test_set_epr_page(self):
         pkg = a2b('003d001a79004c')
         assert self.res.set_epr_page(pkg)
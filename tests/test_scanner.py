@@ -0,0 +1,301 @@
+# -*- coding: UTF-8 -*-
+
+import os
+import random
+import pytest
+
+try:
+    from unittest.mock import call, MagicMock
+except ImportError:
+    from mock import call, MagicMock
+
+from implib2.imp_bus import Bus
+from implib2.imp_emulator import Emulator
+from implib2.imp_scanner import Scanner, ScannerError, ScanReport, serno_crc, crc_index
+from implib2.imp_device import DeviceError
+from implib2.imp_packages import PackageError
+
+
+def check_range(probes):
+    def probe_range(bcast):
+        marker = bcast & -bcast
+        return any(bcast - marker <= x < bcast + marker for x in probes)
+    return probe_range
+
+
+def check_range_crc(probes):
+    def probe_range_crc(bcast):
+        marker = bcast & -bcast
+        byte = None
+        for serno in probes:
+            if bcast - marker <= serno < bcast + marker:
+                # colliding replies are ANDed, like on the emulator
+                byte = serno_crc(serno) & (0xff if byte is None else byte)
+        return byte
+    return probe_range_crc
+
+
+def test_serno_crc():
+    assert serno_crc(31002) == 0x24
+
+
+def test_crc_index():
+    index = crc_index(8)
+    assert sorted(sum(index.values(), [])) == list(range(256))
+    # the crc is linear, so the index serves any aligned range
+    for offset in index[0x24 ^ serno_crc(30976)]:
+        assert serno_crc(30976 | offset) == 0x24
+
+
+class TestScanner:
+
+    def setup(self):
+        self.probes = (33010, 33011, 33500)
+        self.bus = MagicMock()
+        self.bus.probe_range.side_effect = check_range(self.probes)
+        self.bus.probe_module_short.side_effect = lambda serno: serno in self.probes
+
+    def test_run(self):
+        scanner = Scanner(self.bus, 33000, 34000)
+        assert scanner.run() == self.probes
+        assert scanner.pending == 0
+
+    def test_run_SingleSerial(self):
+        assert Scanner(self.bus, 33500, 33500).run() == (33500,)
+        assert self.bus.probe_range.call_count == 0
+        assert Scanner(self.bus, 33501, 33501).run() == ()
+
+    def test_run_RetriesTransientErrors(self):
+        probe_range = check_range(self.probes)
+        errors = [DeviceError('Timeout reading header!'), PackageError('Package with faulty CRC!')]
+
+        def flaky(bcast):
+            if errors and bcast == 33536:
+                raise errors.pop()
+            return probe_range(bcast)
+
+        self.bus.probe_range.side_effect = flaky
+        scanner = Scanner(self.bus, 33000, 34000)
+        assert scanner.run() == self.probes
+        assert scanner.retried == 2
+
+    def test_run_GivesUpAndResumes(self, tmpdir):
+        checkpoint = str(tmpdir.join('scan.json'))
+        probe_range = check_range(self.probes)
+
+        def broken(bcast):
+            if bcast == 33016:
+                raise DeviceError('Timeout reading header!')
+            return probe_range(bcast)
+
+        self.bus.probe_range.side_effect = broken
+        scanner = Scanner(self.bus, 33000, 34000, retries=1, checkpoint=checkpoint)
+        with pytest.raises(ScannerError, match='Scan aborted'):
+            scanner.run()
+        assert os.path.exists(checkpoint)
+        assert 33500 in scanner.found
+        calls = self.bus.probe_range.call_count
+
+        # the new scanner starts with the failed node
+        self.bus.probe_range.side_effect = check_range(self.probes)
+        scanner = Scanner(self.bus, 33000, 34000, checkpoint=checkpoint)
+        assert scanner.queue[-1] == (33008, 8)
+        assert scanner.run() == self.probes
+        assert self.bus.probe_range.call_count - calls < 20
+        assert not os.path.exists(checkpoint)
+
+    def test_load_IgnoresOtherRange(self, tmpdir):
+        checkpoint = str(tmpdir.join('scan.json'))
+        Scanner(self.bus, 0, 1000).save(checkpoint)
+        assert not Scanner(self.bus, 33000, 34000).load(checkpoint)
+
+    def test_step(self):
+        scanner = Scanner(self.bus, 33000, 34000)
+        assert scanner.queue == [(33000, 4), (33008, 8), (33024, 128), (33280, 256),
+                                 (33792, 64), (33920, 32), (33984, 8), (34000, 0)]
+        assert scanner.step()
+        assert scanner.queue[-1] == (33984, 8)
+
+    def test_run_Incremental(self):
+        scanner = Scanner(self.bus, 33000, 34000, known=(33010, 33011, 33500, 40000))
+        assert scanner.run() == self.probes
+        # the known probes, 33501 (the other half of the pair of 33500)
+        # and 34000, the single serial number at the end of the range
+        assert self.bus.probe_module_short.call_count == 5
+        # the range probes never hit a known probe
+        for args, _ in self.bus.probe_range.call_args_list:
+            marker = args[0] & -args[0]
+            assert not any(args[0] - marker <= x < args[0] + marker for x in self.probes)
+
+    def test_run_IncrementalFindsNewAndLostProbes(self):
+        scanner = Scanner(self.bus, 33000, 34000, known=(33010, 33600))
+        assert scanner.run() == self.probes
+        assert 33600 in [c[0][0] for c in self.bus.probe_module_short.call_args_list]
+
+    def test_run_IncrementalWithoutDiscover(self):
+        scanner = Scanner(self.bus, 33000, 34000, known=self.probes, discover=False)
+        assert scanner.run() == self.probes
+        assert self.bus.probe_module_short.call_count == 3
+        assert self.bus.probe_range.call_count == 0
+
+    def test_run_IncrementalCoversWholeRange(self):
+        # a probe next to a known one and one far away are found as well
+        self.probes = (33000, 33010, 33011, 34000)
+        self.bus.probe_range.side_effect = check_range(self.probes)
+        scanner = Scanner(self.bus, 33000, 34000, known=(33010,))
+        assert scanner.run() == self.probes
+
+    def test_run_UseCRC(self):
+        self.bus.probe_range_crc.side_effect = check_range_crc(self.probes)
+        scanner = Scanner(self.bus, 33000, 34000, use_crc=True)
+        assert scanner.run() == self.probes
+        transactions = (self.bus.probe_range.call_count +
+                        self.bus.probe_range_crc.call_count +
+                        self.bus.probe_module_short.call_count)
+
+        full = MagicMock()
+        full.probe_range.side_effect = check_range(self.probes)
+        full.probe_module_short.side_effect = lambda serno: serno in self.probes
+        Scanner(full, 33000, 34000).run()
+        assert transactions < full.probe_range.call_count + full.probe_module_short.call_count
+
+    def test_run_UseCRCWithCollisions(self):
+        # probes whose crcs AND to the crc of one of them
+        self.probes = tuple(sorted(x for x in range(33024, 33280)
+                                   if serno_crc(x) & 0x24 == 0x24)[:6])
+        self.bus.probe_range.side_effect = check_range(self.probes)
+        self.bus.probe_range_crc.side_effect = check_range_crc(self.probes)
+        assert Scanner(self.bus, 33000, 34000, use_crc=True).run() == self.probes
+
+    def test_run_WithRanges(self):
+        scanner = Scanner(self.bus, ranges=[(33400, 33600), (33000, 33010)])
+        assert scanner.run() == (33010, 33500)
+        assert scanner.minserial == 33000
+        assert scanner.maxserial == 33600
+
+    def test_iter_YieldsWhileSearching(self):
+        scanner = Scanner(self.bus, 33000, 34000)
+        sernos = iter(scanner)
+        assert next(sernos) == 33500
+        assert scanner.pending > 0
+        assert sorted([33500] + list(sernos)) == list(self.probes)
+        assert scanner.pending == 0
+
+    def test_iter_StoppedEarly(self, tmpdir):
+        checkpoint = str(tmpdir.join('scan.json'))
+        sernos = iter(Scanner(self.bus, 33000, 34000, checkpoint=checkpoint))
+        assert next(sernos) == 33500
+        sernos.close()
+
+        # the resumed scan yields the probes found so far first
+        scanner = Scanner(self.bus, 33000, 34000, checkpoint=checkpoint)
+        assert list(scanner) == [33500, 33011, 33010]
+
+    def test_run_WithCallback(self):
+        callback = MagicMock()
+        assert Scanner(self.bus, 33000, 34000).run(callback) == self.probes
+        assert callback.call_args_list == [call(33500), call(33011), call(33010)]
+
+    def test_report(self):
+        probe_range = check_range(self.probes)
+        errors = [DeviceError('Timeout reading header!')]
+
+        def flaky(bcast):
+            if errors and bcast == 33536:
+                raise errors.pop()
+            return probe_range(bcast)
+
+        self.bus.probe_range.side_effect = flaky
+        scanner = Scanner(self.bus, 33000, 34000)
+        scanner.run()
+
+        report = scanner.report
+        assert report.range_probes == self.bus.probe_range.call_count - 1
+        assert report.short_acks == self.bus.probe_module_short.call_count
+        assert report.short_hits == 3
+        assert report.errors == {'DeviceError': 1}
+        assert report.retries == 1
+        # 33280-33791 (depth 15) is the largest block of the cover
+        assert min(report.ranges) == 15
+        assert report.ranges[15] == [1, 0]
+        assert report.ranges[23] == [2, 2]
+        assert 0.0 < report.positive_ratio < 1.0
+        assert report.wall_time > 0.0
+        assert 'range probes: {0}'.format(report.range_probes) in str(report)
+
+
+class TestScanReport:
+
+    def setup(self):
+        self.emu = Emulator([10010, 10011, 33211])
+        self.bus = Bus(self.emu.url, event_driven=True)
+        self.bus.dev.open_device()
+
+    def teardown(self):
+        self.bus.dev.close_device()
+
+    def test_report_WithPacer(self):
+        report = ScanReport()
+        assert self.bus.scan(report=report) == (10010, 10011, 33211)
+        assert report.transactions == report.range_probes + report.short_acks
+        assert report.wire_time == pytest.approx(report.transactions * 8 * 12 / 9600.0)
+        assert report.wall_time >= report.wait_time
+
+
+class TestRobustScanner:
+
+    def setup(self):
+        self.probes = (33010, 33011, 33500, 33777)
+        self.bus = MagicMock()
+
+    def lossy(self, loss, seed):
+        rnd = random.Random(seed)
+        probe_range = check_range(self.probes)
+        self.bus.probe_range.side_effect = lambda bcast: probe_range(bcast) and rnd.random() > loss
+        self.bus.probe_module_short.side_effect = \
+            lambda serno: serno in self.probes and rnd.random() > loss
+
+    def test_run_Clean(self):
+        self.lossy(0.0, 0)
+        scanner = Scanner(self.bus, 33000, 34000, robust=True)
+        assert scanner.run() == self.probes
+        assert scanner.report.answer_rate == dict.fromkeys(self.probes, 1.0)
+        assert scanner.report.loss_rate <= 0.01
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_run_Lossy(self, seed):
+        self.lossy(0.1, seed)
+        scanner = Scanner(self.bus, 33000, 34000, robust=True, target=1e-4)
+        assert scanner.run() == self.probes
+        assert scanner.report.miss_probability < 0.01
+
+    def test_run_FirstReplyLost(self):
+        probe_range = check_range(self.probes)
+
+        def lose_first(probe):
+            asked = set()
+
+            def wrapped(address):
+                if address in asked:
+                    return probe(address)
+                asked.add(address)
+                return False
+            return wrapped
+
+        self.bus.probe_range.side_effect = lose_first(probe_range)
+        self.bus.probe_module_short.side_effect = lose_first(lambda serno: serno in self.probes)
+
+        scanner = Scanner(self.bus, 33000, 34000, robust=True)
+        assert scanner.run() == self.probes
+        assert scanner.report.answer_rate == dict.fromkeys(self.probes, 0.5)
+        assert scanner.report.repeats > 0
+        assert scanner.report.loss_rate > 0.4
+
+    def test_repeats_AdaptToLossRate(self):
+        scanner = Scanner(self.bus, robust=True, target=0.001, max_repeats=5)
+        assert scanner._repeats() == 2
+        scanner.samples, scanner.losses = 1000, 0
+        assert scanner._repeats() == 0
+        scanner.samples, scanner.losses = 1000, 200
+        assert scanner._repeats() == 4
+        assert Scanner(self.bus)._repeats() == 0
@@ -60,3 +60,59 @@ class TestTables:
     def test_lookup_value_has_set(self, table, param):
         row = self.t.lookup(table, param)
         assert 'Set' in row
+
+    def test_lookup_DoesNotMutate(self, table, param):
+        self.t.lookup(table, param)
+        assert self.t._tables == self.j
+
+    def test_lookup_value_matches_json(self, table, param):
+        row = self.t.lookup(table, param)
+        for key, value in self.j[table][param].items():
+            assert row[key] == value
+        assert row['Get'] == self.j[table]['Table']['Get']
+        assert row['Set'] == self.j[table]['Table']['Set']
+
+    def test_lookup_Immutable(self):
+        row = self.t.lookup('MEASURE_PARAMETER_TABLE', 'Moist')
+        with pytest.raises(AttributeError, match='read-only'):
+            row.no = 11
+        with pytest.raises(TypeError):
+            row['No'] = 11
+
+    def test_lookup_Param(self):
+        row = self.t.lookup('MEASURE_PARAMETER_TABLE', 'Moist')
+        assert (row.table, row.name, row.no, row.get, row.set) == \
+            ('MEASURE_PARAMETER_TABLE', 'Moist', 10, 22, 23)
+        assert (row.dtype, row.length, row.writable) == (0x06, 4, True)
+        assert row.codec.unpack(b'\x00\x00\x48\x41') == (12.5,)
+
+    def test_lookup_ArrayParam(self):
+        row = self.t.lookup('SYSTEM_PARAMETER_TABLE', 'ModuleName')
+        assert (row.type, row.dtype, row.writable) == (0x80, 0x00, False)
+        assert row.codec.size == 16
+
+    def test_table(self):
+        table = self.t.table('MEASURE_PARAMETER_TABLE')
+        assert (table.get, table.set) == (22, 23)
+        assert table.params['Moist'] is self.t.lookup('MEASURE_PARAMETER_TABLE', 'Moist')
+        assert self.t.lookup('MEASURE_PARAMETER_TABLE', 'Table') is table
+
+    def test_table_Unknown(self):
+        with pytest.raises(TablesError, match='UNKNOWN_TABLE'):
+            self.t.table('UNKNOWN_TABLE')
+
+    def test_by_number(self, table, param):
+        if param == 'Table':
+            return
+        row = self.t.by_number(table, self.j[table][param]['No'])
+        assert row.no == self.j[table][param]['No']
+        assert row.table == table
+
+    def test_by_number_Unknown(self):
+        with pytest.raises(TablesError, match='200'):
+            self.t.by_number('MEASURE_PARAMETER_TABLE', 200)
+
+    def test_commands(self):
+        for name, rows in self.j.items():
+            assert self.t.commands[rows['Table']['Get']].name == name
+            assert self.t.commands[rows['Table']['Set']].name == name